@@ -0,0 +1,631 @@
+#!/usr/bin/env python3
+"""
+Micro benchmarks for the scraper library.
+Run a single benchmark by name, e.g. `python benchmark.py pool https://ncode.syosetu.com/n2267be/`.
+"""
+
+import sys
+import os
+import logging
+import random
+import re
+import shutil
+import time
+import threading
+import tracemalloc
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Add the src directory to the Python path so the flat module imports resolve
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from bs4 import BeautifulSoup as Soup
+
+from scrape_util import scrape_util
+from threading_utils import BatchProcessor, WorkQueueProcessor
+from response import Response
+from text_pipeline import Normalizer, BoilerplateStripper
+from chinese_converter import ChineseConverter, load_dictionary, default_dictionary_dir
+from interfaces import NovelScraper
+from coordinator import NovelScraperCoordinator
+from checkpoint_journal import CheckpointJournal, journal_path
+from novel_index import NovelIndex
+from adapters.text_file_adapter import TextFileAdapter
+from scrapers.scraper_syosetu import ScraperSyosetu
+from scrapers.scraper_quanben import ScraperQuanben
+from test_scrape_util import reference_html_to_text
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_syosetu_novel.txt")
+
+
+def load_fixture_text() -> str:
+    """Return the bundled Syosetu novel text"""
+    with open(FIXTURE_PATH, encoding="utf-8") as file:
+        return file.read()
+
+
+def fixture_html(head: str = "") -> str:
+    """Return the fixture text as a Syosetu-like chapter page"""
+    return "<html><head>{}</head><body><div id=\"novel_honbun\">{}</div></body></html>".format(
+        head, "".join(f"<p>{line}</p>" for line in load_fixture_text().splitlines())
+    )
+
+
+def start_fixture_server(head: str = "") -> str:
+    """Serve the fixture text as an HTML page on localhost, returns its URL"""
+    body = fixture_html(head).encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def bench_pool(url: str = "", requests_count: int = 200, threads: int = 16):
+    """Compare pooled and unpooled fetch throughput against the same URL"""
+    requests_count, threads = int(requests_count), int(threads)
+    if not url:
+        url = start_fixture_server()
+    urls = [url] * requests_count
+
+    for pooled in (False, True):
+        scrape_util.configure_transport(pool_size=threads, pooled=pooled)
+        start = time.perf_counter()
+        BatchProcessor().process_in_parallel(urls, lambda u, i: scrape_util.scrape_url(u), max_threads=threads)
+        elapsed = time.perf_counter() - start
+        label = "pooled" if pooled else "unpooled"
+        print(f"{label:>9}: {requests_count} requests in {elapsed:.2f}s ({requests_count / elapsed:.1f} req/s)")
+
+
+def bench_charset(repeat: int = 10):
+    """Compare parsing raw bytes (BeautifulSoup guesses the charset) with the decode-first fast path"""
+    repeat = int(repeat)
+    cases = [
+        ("GBK, Content-Type charset", "", {"Content-Type": "text/html; charset=gbk"}, None),
+        ("GBK, <meta charset>", "<meta charset=\"gbk\">", {"Content-Type": "text/html"}, None),
+        ("GBK, scraper default", "", {"Content-Type": "text/html"}, "gbk"),
+        ("UTF-8, Content-Type charset", "", {"Content-Type": "text/html; charset=utf-8"}, None),
+    ]
+    for label, head, headers, default_encoding in cases:
+        encoding = "utf-8" if label.startswith("UTF-8") else "gbk"
+        content = fixture_html(head).encode(encoding, errors="xmlcharrefreplace")
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            guessed = Soup(content, features="lxml")
+        detect = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            decoded = Response("", 200, headers, content, default_encoding=default_encoding).soup()
+        fast = (time.perf_counter() - start) / repeat
+
+        guessed_text = guessed.select_one("#novel_honbun")
+        same = guessed_text is not None and guessed_text.text == decoded.select_one("#novel_honbun").text
+        print(f"{label:>30}: detect {detect * 1000:.1f} ms, decode first {fast * 1000:.1f} ms "
+              f"({detect / fast:.1f}x){'' if same else ', detection garbled the text'}")
+
+
+def bench_parse(repeat: int = 50, threads: int = 16):
+    """Compare chapter extraction through BeautifulSoup with the lxml engine Syosetu uses"""
+    repeat, threads = int(repeat), int(threads)
+    content = fixture_html("<title>Novel - Chapter 1</title>").replace(
+        "<body>", "<body><p class=\"novel_subtitle\">Chapter 1</p>"
+    ).encode("utf-8")
+    headers = {"Content-Type": "text/html; charset=utf-8"}
+    scraper = ScraperSyosetu()
+
+    def with_soup(_, __=None):
+        page = Response("", 200, headers, content).soup()
+        return scrape_util.html_to_text(page.select("#novel_honbun")[0])
+
+    def with_lxml(_, __=None):
+        page = Response("", 200, headers, content).tree()
+        return scraper._parse_chapter_content(page, "")["content"]
+
+    assert with_soup(None) == with_lxml(None)
+    for label, extract in (("BeautifulSoup", with_soup), ("lxml engine", with_lxml)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            extract(None)
+        single = (time.perf_counter() - start) / repeat
+
+        start = time.perf_counter()
+        BatchProcessor().process_in_parallel(list(range(repeat)), extract, max_threads=threads)
+        elapsed = time.perf_counter() - start
+        print(f"{label:>13}: {single * 1000:.2f} ms per chapter, {repeat / elapsed:.0f} chapters/s on {threads} threads")
+
+
+def bench_html_to_text(repeat: int = 20, scale: int = 2):
+    """Compare the old concatenating html_to_text with the list/join one on fixture-sized chapters"""
+    repeat, scale = int(repeat), int(scale)
+    page = fixture_html().replace("</p>", "<br/></p>" * 1)
+    body = page[page.index("<div"):page.rindex("</div>") + 6]
+    page = "<html><body>{}</body></html>".format(body.replace("</div>", "") * scale + "</div>" * scale)
+    soup_body = Soup(page, features="lxml").select_one("#novel_honbun")
+    lxml_body = Response("", 200, {}, page.encode("utf-8")).tree().get_element_by_id("novel_honbun")
+    expected = reference_html_to_text(soup_body)
+    print(f"{len(expected.encode('utf-8')) / 1024:.0f} KB of text")
+
+    for label, convert, elem in (("concatenation", reference_html_to_text, soup_body),
+                                 ("list/join", scrape_util.html_to_text, soup_body),
+                                 ("lxml", scrape_util.html_to_text, lxml_body)):
+        assert convert(elem) == expected
+        start = time.perf_counter()
+        for _ in range(repeat):
+            convert(elem)
+        elapsed = (time.perf_counter() - start) / repeat
+        print(f"{label:>13}: {elapsed * 1000:.2f} ms")
+
+
+def bench_parse_only(repeat: int = 30):
+    """Compare full parses with parse_only ones on a chapter page wrapped in navigation and comments"""
+    repeat = int(repeat)
+    boilerplate = "".join(
+        f"<div class=\"nav\"><a href=\"/novel/{i}\">Link {i}</a><span class=\"ad\">Ad {i}</span></div>"
+        f"<div class=\"comment\"><p>Comment {i}</p><p>{'reply ' * 10}</p></div>"
+        for i in range(300)
+    )
+    # A Quanben-like chapter page
+    content = fixture_html().replace(
+        "<body><div id=\"novel_honbun\">", f"<body>{boilerplate}<h1 class=\"headline\">Chapter 1</h1><div class=\"articlebody\">"
+    ).replace("</body>", f"{boilerplate}</body>").encode("utf-8")
+    headers = {"Content-Type": "text/html; charset=utf-8"}
+    scraper = ScraperQuanben()
+
+    def parse_full():
+        return scraper._parse_chapter_content(Response("", 200, headers, content).soup(), "")
+
+    def parse_partial():
+        return scraper._parse_chapter_content(Response("", 200, headers, content).soup("lxml", scraper.parse_only), "")
+
+    assert parse_full() == parse_partial()
+    cases = (
+        ("full soup", lambda: Response("", 200, headers, content).soup(), parse_full),
+        ("parse_only soup", lambda: Response("", 200, headers, content).soup("lxml", scraper.parse_only), parse_partial),
+    )
+    for label, parse, extract in cases:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            extract()
+        elapsed = (time.perf_counter() - start) / repeat
+
+        tracemalloc.start()
+        page = parse()
+        retained = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del page
+        print(f"{label:>16}: {elapsed * 1000:.2f} ms per chapter, {retained / 1024:.0f} KB per soup")
+
+
+def bench_index_stream(chapters: int = 2000, kbps: int = 2000):
+    """Compare waiting for a whole Syosetu-like index page with parsing it while it downloads"""
+    chapters, kbps = int(chapters), int(kbps)
+    entries = "".join(
+        f"<dl class=\"novel_sublist2\"><dd class=\"subtitle\"><a href=\"/n0/{i}/\">Chapter {i}</a></dd>"
+        f"<dt class=\"long_update\">2024/01/01 00:00</dt></dl>"
+        for i in range(chapters)
+    )
+    body = f"<html><body><div class=\"index_box\">{entries}</div></body></html>".encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            # Throttle to kbps KB/s so the transfer takes as long as on a slow site
+            for i in range(0, len(body), 16 * 1024):
+                self.wfile.write(body[i:i + 16 * 1024])
+                self.wfile.flush()
+                time.sleep(16 / kbps)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    scraper = ScraperSyosetu()
+    scraper.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    url = f"{scraper.base_url}/n0/"
+
+    start = time.perf_counter()
+    tree = scrape_util.scrape_tree(url)
+    links = scraper.engine.select(tree, "div.index_box dl.novel_sublist2 a")
+    elapsed = time.perf_counter() - start
+    print(f"   whole page: first of {len(links)} chapters after {elapsed * 1000:.0f} ms, all after {elapsed * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for _ in scraper.iter_index_structure(url):
+        count += 1
+        if first is None:
+            first = time.perf_counter() - start
+    elapsed = time.perf_counter() - start
+    print(f"  incremental: first of {count} chapters after {first * 1000:.0f} ms, all after {elapsed * 1000:.0f} ms")
+    server.shutdown()
+
+
+def bench_parse_pool(requests_count: int = 200, threads: int = 16, workers: int = 0):
+    """Compare parsing Syosetu chapters in the fetching threads with parsing them in a process pool"""
+    requests_count, threads = int(requests_count), int(threads)
+    workers = int(workers) or os.cpu_count()
+    url = start_fixture_server("<title>Novel - Chapter 1</title>")
+    scraper = ScraperSyosetu()
+
+    for pool_workers in (0, workers):
+        scrape_util.configure_parse_pool(pool_workers)
+        # Start the workers before timing
+        scraper.get_chapter_content(url)
+        start = time.perf_counter()
+        BatchProcessor().process_in_parallel([url] * requests_count, lambda u, i: scraper.get_chapter_content(u),
+                                             max_threads=threads)
+        elapsed = time.perf_counter() - start
+        label = f"{pool_workers} processes" if pool_workers else "threads only"
+        print(f"{label:>13}: {requests_count} chapters in {elapsed:.2f}s ({requests_count / elapsed:.1f} chapters/s)")
+    scrape_util.configure_parse_pool(0)
+
+
+def bench_normalize(repeat: int = 20, scale: int = 4):
+    """Compare a chain of str.replace/re.sub calls with the compiled Normalizer stage"""
+    repeat, scale = int(repeat), int(scale)
+    lines = load_fixture_text().splitlines() * scale
+    # Dress the text up the way the Chinese sites serve it
+    text = "\r\n\r\n\r\n".join(
+        f"\u3000\u3000{line}\u200b  第１２章 ＡＢＣ  " if i % 3 == 0 else line for i, line in enumerate(lines)
+    )
+    size = len(text.encode("utf-8")) / 1024 / 1024
+
+    def chained(text: str) -> str:
+        for code in range(0xFF01, 0xFF5F):
+            if chr(code - 0xFEE0).isalnum():
+                text = text.replace(chr(code), chr(code - 0xFEE0))
+        for char in "\u200b\u200c\u200d\u2060\ufeff\u00ad":
+            text = text.replace(char, "")
+        for char in "\t\u00a0\u2002\u2003\u3000":
+            text = text.replace(char, " ")
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        text = re.sub(r" {2,}", " ", text)
+        text = re.sub(r"(?m)^ +| +$", "", text)
+        text = re.sub(r"\n{3,}", "\n\n", text)
+        return text.strip("\n")
+
+    normalizer = Normalizer()
+    assert chained(text) == normalizer.apply(text)
+    for label, normalize in (("chained", chained), ("Normalizer", normalizer.apply)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            normalize(text)
+        elapsed = (time.perf_counter() - start) / repeat
+        print(f"{label:>10}: {elapsed * 1000:.2f} ms for {size:.2f} MB ({size / elapsed:.0f} MB/s)")
+
+
+def bench_boilerplate(repeat: int = 10, scale: int = 4):
+    """Compare one regex scan per pattern with BoilerplateStripper's single scan, for growing pattern counts"""
+    repeat, scale = int(repeat), int(scale)
+    lines = load_fixture_text().splitlines() * scale
+    rng = random.Random(0)
+    common = "".join(sorted(set("".join(lines))))
+    openers = ("69书吧", "请记住本站", "ｗｗｗ．", "www.", "天才一秒", "手机版", "最新章节", "全本小说")
+    size = len("\n".join(lines).encode("utf-8")) / 1024 / 1024
+
+    for count in (10, 100, 500):
+        # Watermark variants the way sites write them: a few openers (site names,
+        # "remember our domain", ...) followed by the text's own characters
+        patterns = sorted({
+            rng.choice(openers) + "".join(rng.choice(common) for _ in range(rng.randint(4, 10)))
+            for _ in range(count)
+        })
+        # One in every 20 lines carries a watermark
+        text = "\n".join(
+            line + rng.choice(patterns) if i % 20 == 0 else line for i, line in enumerate(lines)
+        )
+        compiled = [re.compile(re.escape(pattern)) for pattern in patterns]
+
+        def per_pattern(text: str) -> str:
+            for regex in compiled:
+                text = regex.sub("", text)
+            return text
+
+        stripper = BoilerplateStripper(patterns)
+        assert per_pattern(text) == stripper.apply(text)
+        for label, strip in (("per pattern", per_pattern), ("stripper", stripper.apply)):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                strip(text)
+            elapsed = (time.perf_counter() - start) / repeat
+            print(f"{count:>4} patterns, {label:>11}: {elapsed * 1000:.2f} ms ({size / elapsed:.0f} MB/s)")
+
+
+def bench_convert(dictionary_dir: str = "", repeat: int = 5, size: int = 60000):
+    """Compare longest match at every position over the full OpenCC dictionaries with ChineseConverter, exact and windowed"""
+    dictionary_dir = dictionary_dir or default_dictionary_dir()
+    if dictionary_dir is None:
+        print("Pass a directory with OpenCC's STCharacters.txt and STPhrases.txt, or install opencc-python-reimplemented")
+        return
+    repeat, size = int(repeat), int(size)
+    characters = load_dictionary(os.path.join(dictionary_dir, "STCharacters.txt"))
+    phrases = load_dictionary(os.path.join(dictionary_dir, "STPhrases.txt"))
+    # Common characters with dictionary words mixed in, in 40-character lines
+    rng = random.Random(0)
+    words = sorted(phrases)
+    common = [chr(code) for code in range(0x4E00, 0x4E00 + 2500)]
+    text = "".join(rng.choice(words) if rng.random() < 0.08 else rng.choice(common) for _ in range(size))
+    text = "\n".join(text[i:i + 40] for i in range(0, len(text), 40))
+    megabytes = len(text.encode("utf-8")) / 1024 / 1024
+
+    table = {ord(key): value for key, value in characters.items() if len(key) == 1}
+    longest = max(map(len, phrases))
+
+    def every_position(text: str) -> str:
+        pieces = []
+        i = 0
+        while i < len(text):
+            for length in range(min(longest, len(text) - i), 1, -1):
+                value = phrases.get(text[i:i + length])
+                if value is not None:
+                    pieces.append(value)
+                    i += length
+                    break
+            else:
+                pieces.append(text[i].translate(table))
+                i += 1
+        return "".join(pieces)
+
+    converter = ChineseConverter(dictionary_dir)
+    windowed = ChineseConverter(dictionary_dir, windowed=True)
+    start = time.perf_counter()
+    converted = converter.apply(text)
+    print(f"Dictionaries loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+    reference = every_position(text)
+    assert converted == reference
+    differences = sum(a != b for a, b in zip(reference, windowed.apply(text)))
+    print(f"Windowed: {differences} of {len(text)} characters differ from the full-dictionary conversion")
+    for label, convert in (("every position", every_position), ("converter", converter.apply),
+                           ("windowed", windowed.apply)):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            convert(text)
+        elapsed = (time.perf_counter() - start) / repeat
+        print(f"{label:>14}: {elapsed * 1000:.1f} ms for {megabytes:.2f} MB ({megabytes / elapsed:.1f} MB/s)")
+
+
+def bench_work_queue(items: int = 300, threads: int = 8, slow_every: int = 25):
+    """Compare BatchProcessor's chunk barrier with WorkQueueProcessor when some fetches are slow"""
+    items, threads, slow_every = int(items), int(threads), int(slow_every)
+    rng = random.Random(0)
+    # Simulated fetches: 10-30 ms, one in slow_every takes 300 ms
+    latencies = [0.3 if i % slow_every == slow_every - 1 else rng.uniform(0.01, 0.03) for i in range(items)]
+
+    for label, manager in (("BatchProcessor", BatchProcessor()), ("WorkQueueProcessor", WorkQueueProcessor())):
+        finished = {}
+        waits = []
+
+        def fetch(index: int, _: int) -> int:
+            time.sleep(latencies[index])
+            finished[index] = time.perf_counter()
+            return index
+
+        def chunk_handler(chunk_start: int, chunk: list, results: dict) -> list:
+            # How long each result waited for the items before it
+            now = time.perf_counter()
+            waits.extend(now - finished[chunk_start + i] for i in range(len(chunk)))
+            return [results[chunk_start + i] for i in range(len(chunk))]
+
+        start = time.perf_counter()
+        assert manager.process_in_parallel(list(range(items)), fetch, chunk_handler, threads) == list(range(items))
+        elapsed = time.perf_counter() - start
+        waits.sort()
+        print(f"{label:>18}: {elapsed:.2f} s ({items / elapsed:.0f} items/s), results waited "
+              f"{waits[len(waits) // 2] * 1000:.0f} ms (p50) / {waits[len(waits) * 95 // 100] * 1000:.0f} ms (p95)")
+
+
+class SimulatedScraper(NovelScraper):
+    """Novel of numbered chapters with the same body, each taking latency seconds to fetch"""
+
+    def __init__(self, chapters: int, body: str, latency: float = 0.005, fail_after: int = None):
+        super().__init__()
+        self.chapters = chapters
+        self.body = body
+        self.latency = latency
+        # Fetches after this many raise, like a run that dies
+        self.fail_after = fail_after
+        self.fetched = 0
+        self._lock = threading.Lock()
+
+    def get_source_info(self):
+        return {}
+
+    def get_novel_info(self, url):
+        return {"title": "Benchmark", "author": "Nobody"}
+
+    def get_index_pages(self, url):
+        return []
+
+    def get_chapter_urls(self, index_url):
+        return []
+
+    def get_index_structure(self, url):
+        return [{"type": "chapter", "url": f"{url}/{i}", "title": f"Chapter {i}"} for i in range(self.chapters)]
+
+    def get_chapter_content(self, chapter_url):
+        with self._lock:
+            self.fetched += 1
+            if self.fail_after is not None and self.fetched > self.fail_after:
+                raise ConnectionError("simulated crash")
+        time.sleep(self.latency)
+        # A fresh copy, as a parsed page would be
+        return {"title": chapter_url, "content": self.body + chapter_url, "url": chapter_url}
+
+
+def bench_stream(chapters: int = 300, threads: int = 8, kb: int = 30):
+    """Compare collecting every chapter before writing with streaming them to the adapter"""
+    chapters, threads, kb = int(chapters), int(threads), int(kb)
+    body = load_fixture_text()[:kb * 1024 // 3]
+
+    class CollectingAdapter(TextFileAdapter):
+        def process_novel_stream(self, novel_info, items):
+            return self.process_novel(novel_info, list(items))
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_stream.txt")
+    try:
+        for label, adapter_class in (("collected", CollectingAdapter), ("streamed", TextFileAdapter)):
+            scraper = SimulatedScraper(chapters, body)
+            coordinator = NovelScraperCoordinator(scraper, adapter_class({"file_path": path}), max_threads=threads)
+            tracemalloc.start()
+            start = time.perf_counter()
+            result = coordinator.scrape_novel("novel")
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            assert result["chapters_saved"] == chapters, result
+            print(f"{label:>9}: {elapsed:.2f} s, peak memory {peak / 1024 / 1024:.1f} MB")
+    finally:
+        for leftover in (path, path + ".manifest.json"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+
+def bench_resume(chapters: int = 1000, threads: int = 8, kb: int = 30):
+    """Cost of the checkpoint journal on a full run, and of a run resumed after dying at 90%"""
+    chapters, threads, kb = int(chapters), int(threads), int(kb)
+    body = load_fixture_text()[:kb * 1024 // 3]
+    directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_journal")
+    path = os.path.join(directory, "novel.txt")
+    journal_file = journal_path(directory, "novel")
+
+    def run(label: str, scraper: SimulatedScraper, journal: CheckpointJournal = None) -> None:
+        coordinator = NovelScraperCoordinator(scraper, TextFileAdapter({"file_path": path}),
+                                              max_threads=threads, journal=journal)
+        start = time.perf_counter()
+        result = coordinator.scrape_novel("novel")
+        elapsed = time.perf_counter() - start
+        print(f"{label:>20}: {elapsed:.2f} s, {scraper.fetched} chapters downloaded, "
+              f"{result.get('chapters_saved', 0)} saved")
+
+    # The failures of the interrupted run are expected
+    logging.getLogger("threading_utils").setLevel(logging.CRITICAL)
+    os.makedirs(directory, exist_ok=True)
+    try:
+        run("without journal", SimulatedScraper(chapters, body))
+        run("with journal", SimulatedScraper(chapters, body), CheckpointJournal(journal_file, resume=False))
+        # Every fetch after 90% fails, the run ends incomplete and keeps its journal
+        run("dies at 90%", SimulatedScraper(chapters, body, fail_after=chapters * 9 // 10),
+            CheckpointJournal(journal_file, resume=False))
+        run("resumed", SimulatedScraper(chapters, body), CheckpointJournal(journal_file, resume=True))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_update(chapters: int = 2000, new: int = 5, threads: int = 8, kb: int = 30):
+    """Refresh a saved novel that gained a few chapters: downloading it again against --update"""
+    chapters, new, threads, kb = int(chapters), int(new), int(threads), int(kb)
+    body = load_fixture_text()[:kb * 1024 // 3]
+    directory = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_update")
+    path = os.path.join(directory, "novel.txt")
+
+    def run(label: str, total: int, update: bool) -> bytes:
+        scraper = SimulatedScraper(total, body)
+        coordinator = NovelScraperCoordinator(scraper, TextFileAdapter({"file_path": path, "update": update}),
+                                              max_threads=threads)
+        start = time.perf_counter()
+        result = coordinator.scrape_novel("novel")
+        elapsed = time.perf_counter() - start
+        assert result["chapters_saved"] == total, result
+        print(f"{label:>17}: {elapsed:.2f} s, {scraper.fetched} chapters downloaded")
+        with open(path, "rb") as file:
+            return file.read()
+
+    os.makedirs(directory, exist_ok=True)
+    try:
+        run("first run", chapters, False)
+        shutil.copy(path, path + ".saved")
+        shutil.copy(path + ".manifest.json", path + ".manifest.saved")
+        downloaded = run("download again", chapters + new, False)
+        shutil.copy(path + ".saved", path)
+        shutil.copy(path + ".manifest.saved", path + ".manifest.json")
+        updated = run("--update", chapters + new, True)
+        assert updated == downloaded
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_index(chapters: int = 10000, volumes: int = 100, repeat: int = 3):
+    """Compare selecting a range and merging contents by URL with NovelIndex, on a long web novel"""
+    chapters, volumes, repeat = int(chapters), int(volumes), int(repeat)
+    per_volume = chapters // volumes
+    structure = []
+    for number in range(chapters):
+        if number % per_volume == 0:
+            structure.append({"type": "volume", "title": f"Volume {number // per_volume + 1}"})
+        structure.append({"type": "chapter", "url": f"https://example.com/{number}.html", "title": f"Chapter {number}"})
+    start, end = chapters // 10, chapters * 9 // 10
+
+    def by_url() -> list:
+        # Selection and merging as the coordinator did them: URL membership in a list, then a dict by URL
+        chapter_urls = [item["url"] for item in structure if item["type"] == "chapter"]
+        selected_urls = chapter_urls[start:end]
+        selected = []
+        current_part = None
+        for item in structure:
+            if item["type"] in ("volume", "part"):
+                current_part = item
+            elif item["url"] in selected_urls:
+                if current_part:
+                    selected.append(current_part)
+                    current_part = None
+                selected.append(item)
+        contents = {url: {"content": url} for url in selected_urls}
+        return [{**item, **contents[item["url"]]} if item["type"] == "chapter" else item for item in selected]
+
+    def by_position() -> list:
+        index = NovelIndex(structure).select(start, end)
+        return index.merge([{"content": url} for url in index.chapter_urls()])
+
+    assert by_url() == by_position()
+    for label, select in (("by URL", by_url), ("NovelIndex", by_position)):
+        timings = []
+        for _ in range(repeat):
+            begin = time.perf_counter()
+            select()
+            timings.append(time.perf_counter() - begin)
+        elapsed = min(timings)
+        print(f"{label:>10}: {elapsed * 1000:.1f} ms to select and merge {end - start} of {chapters} chapters")
+
+
+if __name__ == "__main__":
+    benchmarks = {
+        "pool": bench_pool,
+        "charset": bench_charset,
+        "parse": bench_parse,
+        "html_to_text": bench_html_to_text,
+        "parse_only": bench_parse_only,
+        "index_stream": bench_index_stream,
+        "parse_pool": bench_parse_pool,
+        "normalize": bench_normalize,
+        "boilerplate": bench_boilerplate,
+        "convert": bench_convert,
+        "work_queue": bench_work_queue,
+        "stream": bench_stream,
+        "resume": bench_resume,
+        "update": bench_update,
+        "index": bench_index,
+    }
+    if len(sys.argv) > 1 and sys.argv[1] in benchmarks:
+        benchmarks[sys.argv[1]](*sys.argv[2:])
+    else:
+        print(f"Available benchmarks: {', '.join(benchmarks)}")
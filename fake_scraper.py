@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for a novel site, shared by the tests.
+"""
+
+import sys
+import os
+
+# Add the src directory to the Python path so the flat module imports resolve
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from interfaces import NovelScraper
+
+
+def chapter(i):
+    """Index item of chapter i"""
+    return {"type": "chapter", "url": f"u{i}", "title": f"c{i}"}
+
+
+class FakeScraper(NovelScraper):
+    """Serves a given index structure, recording which chapters are downloaded"""
+
+    def __init__(self, structure, failing=()):
+        self.structure = structure
+        # URLs of the chapters whose download fails
+        self.failing = set(failing)
+        self.fetched = []
+
+    @staticmethod
+    def content(url):
+        """Chapter the site serves for url"""
+        return {"title": f"Title {url}", "content": f"中文正文 {url}", "url": url}
+
+    def get_source_info(self):
+        return {}
+
+    def get_novel_info(self, url):
+        return {"title": "Title", "author": "Author"}
+
+    def get_index_pages(self, url):
+        return []
+
+    def get_chapter_urls(self, url):
+        return []
+
+    def get_index_structure(self, url):
+        return [dict(item) for item in self.structure]
+
+    def get_chapter_content(self, url):
+        if url in self.failing:
+            raise ValueError(f"Chapter {url} is unavailable")
+        self.fetched.append(url)
+        return self.content(url)
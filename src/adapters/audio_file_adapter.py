@@ -1,4 +1,4 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, List, Any, Optional, Set
 import os
 import shutil
 import sys
@@ -8,6 +8,7 @@ sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__f
 
 from interfaces import Adapter
 from scrape_util import scrape_util
+from novel_manifest import NovelManifest
 
 class AudioFileAdapter(Adapter):
     """Adapter for saving audio novel files"""
@@ -20,11 +21,14 @@ class AudioFileAdapter(Adapter):
             folder_path: Target folder path
             file_extension: Audio file extension (default: "mp3")
             cookies: Authentication cookies for file download
+            update: Keep the files already in the folder and only download the new
+                chapters (default: False)
         """
         super().__init__(config)
         self.folder_path = self.config.get("folder_path", "")
         self.file_extension = self.config.get("file_extension", "mp3")
         self.cookies = self.config.get("cookies", {})
+        self.update = self.config.get("update", False)
     
     def process_novel(self, novel_info: Dict[str, Any], chapters: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -34,26 +38,49 @@ class AudioFileAdapter(Adapter):
             novel_info: Dictionary with novel metadata
             chapters: List of dictionaries with chapter data including audio URLs
             
+        Returns:
+            Dictionary with processing results
+        """
+        return self.process_novel_stream(novel_info, chapters)
+    
+    def process_novel_stream(self, novel_info: Dict[str, Any], chapters: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Save audio novel files, downloading each one as its chapter arrives.
+        
+        A manifest of the downloaded files is saved in the folder; chapters
+        marked "saved" are already there and are left alone. A file that
+        cannot be downloaded is counted in failed_downloads and skipped.
+        
+        Args:
+            novel_info: Dictionary with novel metadata
+            chapters: Iterable of dictionaries with chapter data including audio URLs, in order
+            
         Returns:
             Dictionary with processing results
         """
         title = novel_info.get("title", "Unknown Title")
         author = novel_info.get("author", "Unknown Author")
-        
-        # Create folder path if not provided
-        if not self.folder_path:
-            self.folder_path = f"{title} - {author}"
+        self._resolve_folder_path(title, author)
+        previous = self._load_manifest() if self.update else None
+        manifest = NovelManifest(title=title, author=author)
+        successful_downloads = 0
+        failed_downloads = 0
+        kept_files = 0
+        total_chapters = 0
             
         try:
             # Create folder if it doesn't exist
             if not os.path.exists(self.folder_path):
                 os.makedirs(self.folder_path)
             
-            successful_downloads = 0
-            failed_downloads = 0
-            
             # Download each audio file
             for i, chapter in enumerate(chapters):
+                total_chapters += 1
+                entry = previous.chapters.get(chapter.get("url")) if previous is not None and chapter.get("saved") else None
+                if entry is not None:
+                    manifest.add(entry)
+                    kept_files += 1
+                    continue
                 chapter_title = chapter.get("title", f"Chapter_{i+1}")
                 audio_url = chapter.get("audio_url", "")
                 
@@ -76,25 +103,62 @@ class AudioFileAdapter(Adapter):
                     target_path=target_path
                 ):
                     successful_downloads += 1
+                    manifest.add({"url": chapter.get("url"), "title": chapter_title, "file": os.path.basename(target_path)})
                 else:
                     failed_downloads += 1
+            
+            manifest.save(self.manifest_path)
                     
             return {
                 "status": "success",
                 "folder_path": os.path.abspath(self.folder_path),
                 "successful_downloads": successful_downloads,
                 "failed_downloads": failed_downloads,
-                "total_chapters": len(chapters)
+                "kept_files": kept_files,
+                "total_chapters": total_chapters
             }
             
         except Exception as e:
-            # Clean up on failure
-            self.cleanup()
+            # Keep the files saved so far, listed for an --update run; only a
+            # folder holding nothing, not even an earlier run's files, is removed
+            if successful_downloads or kept_files:
+                manifest.save(self.manifest_path)
+            elif not self.update:
+                self.cleanup()
             return {
                 "status": "error",
                 "error": str(e)
             }
     
+    def saved_chapter_urls(self, novel_info: Dict[str, Any]) -> Set[str]:
+        """URLs of the chapters whose files are in the folder, per its manifest; none unless updating"""
+        if not self.update:
+            return set()
+        self._resolve_folder_path(novel_info.get("title", "Unknown Title"), novel_info.get("author", "Unknown Author"))
+        previous = self._load_manifest()
+        return set(previous.chapters) if previous is not None else set()
+    
+    @property
+    def manifest_path(self) -> str:
+        """Path of the manifest saved in the folder"""
+        return os.path.join(self.folder_path, "manifest.json")
+    
+    def _resolve_folder_path(self, title: str, author: str) -> None:
+        """Derive the folder path from the title and author if none was configured"""
+        if not self.folder_path:
+            self.folder_path = f"{title} - {author}"
+    
+    def _load_manifest(self) -> Optional[NovelManifest]:
+        """The manifest of the folder, without the chapters whose file has gone"""
+        manifest = NovelManifest.load(self.manifest_path)
+        if manifest is None:
+            return None
+        return NovelManifest(
+            [entry for entry in manifest.chapters.values()
+             if os.path.exists(os.path.join(self.folder_path, entry.get("file", "")))],
+            **manifest.fields
+        )
+    
     def cleanup(self) -> None:
         """Remove the folder if it exists but is incomplete"""
         if os.path.exists(self.folder_path):
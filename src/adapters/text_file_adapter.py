@@ -1,11 +1,13 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, List, Any, Optional, Set
 import os
+import shutil
 import sys
 
 # Add correct path for imports
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from interfaces import Adapter
+from novel_manifest import NovelManifest
 
 class TextFileAdapter(Adapter):
     """Adapter for saving novels as text files"""
@@ -17,10 +19,13 @@ class TextFileAdapter(Adapter):
         Config options:
             file_path: Target file path (without extension)
             include_metadata: Whether to include metadata in the file (default: True)
+            update: Keep the chapters already in the file and only add the new ones,
+                rewriting the TOC (default: False)
         """
         super().__init__(config)
         self.file_path = self.config.get("file_path", "")
         self.include_metadata = self.config.get("include_metadata", True)
+        self.update = self.config.get("update", False)
     
     def process_novel(self, novel_info: Dict[str, Any], chapters: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -30,76 +35,207 @@ class TextFileAdapter(Adapter):
             novel_info: Dictionary with novel metadata
             chapters: List of dictionaries with chapter/structural data
             
+        Returns:
+            Dictionary with processing results including file path
+        """
+        return self._write_novel(novel_info, chapters)
+    
+    def process_novel_stream(self, novel_info: Dict[str, Any], chapters: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Save novel as a text file, writing each chapter as it arrives.
+        
+        Args:
+            novel_info: Dictionary with novel metadata
+            chapters: Iterable of dictionaries with chapter/structural data, in order
+            
+        Returns:
+            Dictionary with processing results including file path
+        """
+        return self._write_novel(novel_info, chapters)
+    
+    def _write_novel(self, novel_info: Dict[str, Any], chapters: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Write the file, one item at a time.
+        
+        The TOC at the top of the file needs every chapter title, so the
+        chapters go to a ".part" file next to the target first and are
+        copied after the header once the last one has arrived; the target
+        is then replaced in one step. A manifest of where each chapter sits
+        in the file is saved next to it. Chapters marked "saved" are copied
+        from the previous file, as the manifest locates them.
+        
+        Args:
+            novel_info: Dictionary with novel metadata
+            chapters: Iterable of dictionaries with chapter/structural data, in order
+            
         Returns:
             Dictionary with processing results including file path
         """
         title = novel_info.get("title", "Unknown Title")
         author = novel_info.get("author", "Unknown Author")
+        self._resolve_file_path(title, author)
+        previous = self._load_manifest() if self.update else None
+        body_path = f"{self.file_path}.part"
+        temp_path = f"{self.file_path}.tmp"
         
-        # Create file path if not provided
-        if not self.file_path:
-            filename = f"{title} - {author}.txt"
-            # Sanitize filename: replace illegal characters with underscore
-            # Especially for Linux where '/' is not allowed in filenames
-            illegal_chars = ['/', '\\', '*', '?', ':', '"', '<', '>', '|']
-            for char in illegal_chars:
-                filename = filename.replace(char, '_')
-            self.file_path = filename
-        elif not self.file_path.endswith(".txt"):
-            self.file_path = f"{self.file_path}.txt"
-            
         try:
-            # Create the file and write metadata
-            with open(self.file_path, "w", encoding="utf-8") as file:
-                # Write title and author
+            toc_lines = []
+            manifest = NovelManifest(title=title, author=author)
+            chapters_saved = 0
+            chapters_added = 0
+            with open(body_path, "w", encoding="utf-8") as body:
+                source = open(self.file_path, "rb") if previous is not None else None
+                try:
+                    # Saved chapters that follow each other are copied in one go
+                    copy_start = copy_length = 0
+                    position = 0
+                    for item in chapters:
+                        entry = previous.chapters.get(item.get("url")) if previous is not None and item.get("saved") else None
+                        if entry is not None:
+                            start = previous.fields["body_offset"] + entry["offset"]
+                            if copy_length and copy_start + copy_length != start:
+                                _copy_span(source, body, copy_start, copy_length)
+                                copy_length = 0
+                            if not copy_length:
+                                copy_start = start
+                            copy_length += entry["length"]
+                            item = {**item, "title": entry["title"]}
+                            manifest.add({**entry, "offset": position})
+                            position += entry["length"]
+                        else:
+                            if copy_length:
+                                _copy_span(source, body, copy_start, copy_length)
+                                copy_length = 0
+                            self._write_item(body, item)
+                            end = body.tell()
+                            if item.get("type") == "chapter":
+                                chapters_added += 1
+                                # A chapter without content is downloaded again by the next update
+                                if item.get("content"):
+                                    manifest.add({"url": item.get("url"), "title": item.get("title", ""),
+                                                  "offset": position, "length": end - position})
+                            position = end
+                        if item.get("type") == "chapter":
+                            chapters_saved += 1
+                        toc_line = self._toc_line(item)
+                        if toc_line is not None:
+                            toc_lines.append(toc_line)
+                    if copy_length:
+                        _copy_span(source, body, copy_start, copy_length)
+                finally:
+                    if source is not None:
+                        source.close()
+            
+            with open(temp_path, "w", encoding="utf-8") as file, open(body_path, "rb") as body:
                 if self.include_metadata:
-                    file.write(f"{title}\n\n\n{author}\n\n\n")
-                    
-                    # Generate and write TOC
-                    toc = self._generate_toc(chapters)
-                    if toc:
-                        file.write("TOC\n\n")
-                        file.write(toc)
-                        file.write("\n\n\n\n\n\n\n")
-                
-                # Write each item (chapter or volume/part)
-                for item in chapters:
-                    if item.get("type") in ("volume", "part"):
-                        volume_title = item.get("title", "")
-                        file.write(f"{volume_title}\n\n\n")
-                    else:
-                        chapter_title = item.get("title", "")
-                        chapter_content = item.get("content", "")
-                        if chapter_content: # Only write if we have content
-                            file.write(f"{chapter_title}\n\n\n{chapter_content}\n\n\n\n\n\n")
-                    
+                    self._write_header(file, title, author, "\n".join(toc_lines))
+                # The body is already encoded, copy its bytes
+                file.flush()
+                manifest.fields["body_offset"] = file.buffer.tell()
+                shutil.copyfileobj(body, file.buffer)
+            os.replace(temp_path, self.file_path)
+            os.remove(body_path)
+            manifest.fields["size"] = os.path.getsize(self.file_path)
+            manifest.save(self.manifest_path)
+            
             return {
                 "status": "success",
                 "file_path": os.path.abspath(self.file_path),
-                "chapters_saved": sum(1 for item in chapters if item.get("type") == "chapter")
+                "chapters_saved": chapters_saved,
+                "chapters_added": chapters_added
             }
             
         except Exception as e:
-            # Clean up on failure
-            self.cleanup()
+            # The previous file, if any, is only replaced once the new one is complete
+            for path in (body_path, temp_path):
+                if os.path.exists(path):
+                    os.remove(path)
             return {
                 "status": "error",
                 "error": str(e)
             }
     
-    def _generate_toc(self, items: List[Dict[str, Any]]) -> str:
-        """Generate a Table of Contents string from items"""
-        toc_lines = []
-        for item in items:
-            if item.get("type") in ("volume", "part"):
-                toc_lines.append(item.get("title", ""))
-            elif item.get("type") == "chapter":
-                title = item.get("title", "")
-                if title:
-                    toc_lines.append(f"  {title}")
-        return "\n".join(toc_lines)
+    def saved_chapter_urls(self, novel_info: Dict[str, Any]) -> Set[str]:
+        """URLs of the chapters in the file, per its manifest; none unless updating"""
+        if not self.update:
+            return set()
+        self._resolve_file_path(novel_info.get("title", "Unknown Title"), novel_info.get("author", "Unknown Author"))
+        previous = self._load_manifest()
+        return set(previous.chapters) if previous is not None else set()
+    
+    @property
+    def manifest_path(self) -> str:
+        """Path of the manifest saved next to the file"""
+        return f"{self.file_path}.manifest.json"
+    
+    def _load_manifest(self) -> Optional[NovelManifest]:
+        """The manifest of the file, None if either is missing or they do not match"""
+        manifest = NovelManifest.load(self.manifest_path)
+        # A file written after its manifest, or by hand, has moved its chapters
+        if manifest is None or "body_offset" not in manifest.fields or not os.path.exists(self.file_path) \
+                or manifest.fields.get("size") != os.path.getsize(self.file_path):
+            return None
+        return manifest
+    
+    def _resolve_file_path(self, title: str, author: str) -> None:
+        """Derive the file path from the title and author if none was configured"""
+        # Create file path if not provided
+        if not self.file_path:
+            filename = f"{title} - {author}.txt"
+            # Sanitize filename: replace illegal characters with underscore
+            # Especially for Linux where '/' is not allowed in filenames
+            illegal_chars = ['/', '\\', '*', '?', ':', '"', '<', '>', '|']
+            for char in illegal_chars:
+                filename = filename.replace(char, '_')
+            self.file_path = filename
+        elif not self.file_path.endswith(".txt"):
+            self.file_path = f"{self.file_path}.txt"
+    
+    def _write_header(self, file, title: str, author: str, toc: str) -> None:
+        """Write title, author and TOC"""
+        # Write title and author
+        file.write(f"{title}\n\n\n{author}\n\n\n")
+        
+        # Write TOC
+        if toc:
+            file.write("TOC\n\n")
+            file.write(toc)
+            file.write("\n\n\n\n\n\n\n")
+    
+    def _write_item(self, file, item: Dict[str, Any]) -> None:
+        """Write a chapter or volume/part"""
+        if item.get("type") in ("volume", "part"):
+            volume_title = item.get("title", "")
+            file.write(f"{volume_title}\n\n\n")
+        else:
+            chapter_title = item.get("title", "")
+            chapter_content = item.get("content", "")
+            if chapter_content: # Only write if we have content
+                file.write(f"{chapter_title}\n\n\n{chapter_content}\n\n\n\n\n\n")
+    
+    def _toc_line(self, item: Dict[str, Any]) -> Optional[str]:
+        """TOC line of an item, None if it has none"""
+        if item.get("type") in ("volume", "part"):
+            return item.get("title", "")
+        if item.get("type") == "chapter":
+            title = item.get("title", "")
+            if title:
+                return f"  {title}"
+        return None
 
     def cleanup(self) -> None:
         """Remove the file if it exists but is incomplete"""
         if os.path.exists(self.file_path):
-            os.remove(self.file_path)
\ No newline at end of file
+            os.remove(self.file_path)
+
+
+def _copy_span(source, target, start: int, length: int) -> None:
+    """Copy length bytes of the binary file source, from start, to the end of the text file target"""
+    target.flush()
+    source.seek(start)
+    while length > 0:
+        chunk = source.read(min(length, 1024 * 1024))
+        if not chunk:
+            raise ValueError("Previous file is shorter than its manifest")
+        target.buffer.write(chunk)
+        length -= len(chunk)
@@ -0,0 +1,200 @@
+"""
+Asyncio Novel Scraper Coordinator
+
+Drop-in alternative to NovelScraperCoordinator that drives chapter downloads
+from a single event loop instead of one OS thread per chapter, so hundreds of
+requests (possibly across several novels) can be in flight at once.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Any, Iterable, Optional
+import sys
+import os
+
+# Add correct path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from interfaces import NovelScraper, Adapter, ProgressReporter
+from coordinator import NovelScraperCoordinator
+from async_transport import AsyncHttpTransport, use_async_transport, reset_async_transport
+from scrape_util import scrape_util
+from text_pipeline import TextPipeline
+from checkpoint_journal import CheckpointJournal
+from novel_index import NovelIndex
+
+logger = logging.getLogger("novel_coordinator")
+
+class AsyncNovelScraperCoordinator(NovelScraperCoordinator):
+    """Coordinator that scrapes chapters concurrently on an asyncio event loop"""
+
+    def __init__(self,
+                 scraper: NovelScraper,
+                 adapter: Adapter,
+                 progress_reporter: Optional[ProgressReporter] = None,
+                 max_threads: int = 6,
+                 delay_between_requests: Optional[float] = None,
+                 pooled_connections: bool = True,
+                 rate: Optional[float] = None,
+                 burst: int = 1,
+                 max_concurrency: int = 64,
+                 transport: Optional[AsyncHttpTransport] = None,
+                 http2_hosts: Optional[Iterable[str]] = None,
+                 text_pipeline: Optional[TextPipeline] = None,
+                 journal: Optional[CheckpointJournal] = None):
+        """
+        Initialize the coordinator.
+
+        Args:
+            scraper: The novel scraper implementation
+            adapter: The adapter for processing/saving the scraped data
+            progress_reporter: Optional progress reporter
+            max_threads: Per-host concurrency limit (and size of the sync fallback pool)
+            delay_between_requests: Deprecated, use rate
+            pooled_connections: Reuse kept-alive connections in the sync fallback transport
+            rate: Maximum requests per second per host, None for no limit
+            burst: Number of requests per host that may be sent back to back
+            max_concurrency: Maximum number of chapters in flight for this novel
+            transport: Optional transport shared with other coordinators, so that
+                several novels running on one loop share per-host limits
+            http2_hosts: Hosts fetched over one multiplexed HTTP/2 connection (needs httpx[http2])
+            text_pipeline: Optional stages run on each chapter's content before it reaches the adapter
+            journal: Optional journal of downloaded chapters, for resuming an interrupted run
+        """
+        super().__init__(scraper, adapter, progress_reporter, max_threads, delay_between_requests, pooled_connections, rate, burst, http2_hosts, text_pipeline, journal)
+        self.max_concurrency = max(1, max_concurrency)
+        self.transport = transport
+
+    def scrape_novel(self,
+                    novel_url: str,
+                    max_chapters: Optional[int] = None,
+                    chapter_range: Optional[str] = None,
+                    range_callback: Optional[Any] = None) -> Dict[str, Any]:
+        """Run scrape_novel_async on a new event loop; same arguments and result as the sync coordinator"""
+        return asyncio.run(self.scrape_novel_async(novel_url, max_chapters, chapter_range, range_callback))
+
+    async def scrape_novel_async(self,
+                                 novel_url: str,
+                                 max_chapters: Optional[int] = None,
+                                 chapter_range: Optional[str] = None,
+                                 range_callback: Optional[Any] = None) -> Dict[str, Any]:
+        """
+        Scrape a novel and process it with the adapter.
+
+        Args:
+            novel_url: URL of the novel to scrape
+            max_chapters: Optional limit on number of chapters to scrape
+            chapter_range: Optional range of chapters to scrape (e.g., '1-10')
+            range_callback: Optional callback to request range after getting total count
+
+        Returns:
+            Dictionary with results from the adapter
+        """
+        owns_transport = self.transport is None
+        transport = self.transport or AsyncHttpTransport(per_host_limit=self.max_threads)
+        token = use_async_transport(transport)
+        # Share pages fetched more than once during this run
+        memo = scrape_util.acquire_page_memo()
+        try:
+            # Report start
+            if self.progress_reporter:
+                self.progress_reporter.print(f"Starting novel scraping from URL: {novel_url}")
+
+            # Get novel information
+            novel_info = await self.scraper.get_novel_info_async(novel_url)
+            if self.progress_reporter:
+                title = novel_info.get("title", "Unknown")
+                author = novel_info.get("author", "Unknown")
+                self.progress_reporter.print(f"Novel: '{title}' by {author}")
+                self.progress_reporter.print("Retrieving index structure...")
+
+            # Chapters the adapter's output already has are not downloaded again
+            saved = await asyncio.to_thread(self.adapter.saved_chapter_urls, novel_info)
+            if self.progress_reporter and saved:
+                self.progress_reporter.print(f"{len(saved)} chapters already saved, downloading new chapters only")
+
+            index = NovelIndex(await self.scraper.get_index_structure_async(novel_url))
+
+            if self.progress_reporter:
+                self.progress_reporter.print(f"Found {len(index)} chapters and {index.part_count()} parts")
+
+            # The range callback may prompt the user, keep it off the event loop
+            index = await asyncio.to_thread(
+                self._select_chapters, index, max_chapters, chapter_range, range_callback
+            )
+
+            # Content of each chapter by number; saved ones are taken from the adapter's output
+            contents = [{"saved": True} if url in saved else None for url in index.chapter_urls()]
+            numbers = [number for number, content in enumerate(contents) if content is None]
+
+            if self.progress_reporter:
+                self.progress_reporter.print(f"Scraping {len(numbers)} chapters...")
+                self.progress_reporter.initialize_progress(len(numbers))
+
+            finished = 0
+            failed = 0
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def process_chapter(number: int) -> None:
+                nonlocal finished, failed
+                chapter_url = index.chapter(number)["url"]
+                try:
+                    # The journal reads and writes files, keep them off the event loop
+                    chapter = await asyncio.to_thread(self.journal.get, chapter_url) if self.journal is not None else None
+                    if chapter is None:
+                        async with semaphore:
+                            chapter = await self.scraper.get_chapter_content_async(chapter_url)
+                        if self.journal is not None:
+                            await asyncio.to_thread(self.journal.record, number, chapter_url, chapter)
+                    contents[number] = self._postprocess(chapter)
+                except Exception:
+                    # Like the sync coordinator: the chapter is left out and the novel goes on
+                    logger.exception(f"Chapter {chapter_url} failed")
+                    failed += 1
+                finished += 1
+                if self.progress_reporter:
+                    self.progress_reporter.update_progress(1)
+                    self.progress_reporter.set_description(
+                        f"Scraping {finished}/{len(numbers)} chapters"
+                    )
+
+            tasks = [asyncio.ensure_future(process_chapter(number)) for number in numbers]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                # Do not leave the remaining chapters running against a closed transport
+                for task in tasks:
+                    task.cancel()
+                raise
+            self.failed_chapters = failed
+
+            final_chapters_with_structure = index.merge(contents)
+
+            if self.progress_reporter:
+                self.progress_reporter.print("Processing scraped content...")
+
+            # Adapters do blocking file and network I/O
+            result = await asyncio.to_thread(self.adapter.process_novel, novel_info, final_chapters_with_structure)
+            self._report_result(result)
+            self._report_memo(memo)
+            self._finish_journal(result)
+
+            return result
+
+        except Exception as e:
+            logger.error(f"Error scraping novel: {str(e)}")
+            if self.progress_reporter:
+                self.progress_reporter.print(f"Error: {str(e)}")
+            result = {
+                "status": "error",
+                "error": str(e)
+            }
+            self._finish_journal(result)
+            return result
+        finally:
+            scrape_util.release_page_memo()
+            reset_async_transport(token)
+            if owns_transport:
+                await transport.close()
+            if self.progress_reporter and hasattr(self.progress_reporter, "close"):
+                self.progress_reporter.close()
@@ -0,0 +1,248 @@
+"""
+Asyncio HTTP transport.
+
+Keeps hundreds of requests in flight from a single thread. Concurrency is
+bounded per host with a semaphore so that a large novel cannot open an
+unbounded number of connections to one site. aiohttp is used when it is
+installed; otherwise requests are run through the pooled sync transport in
+worker threads, which keeps the API usable at reduced scale. Hosts that use
+HTTP/2 in the sync transport are multiplexed over one async HTTP/2
+connection as well.
+"""
+
+import asyncio
+import contextvars
+from collections import namedtuple
+from typing import Dict, Any, Optional
+from urllib.parse import urlsplit
+
+from transport import CHUNK_SIZE, DEFAULT_HEADERS, DEFAULT_TIMEOUT, RETRY_EXCEPTIONS, get_transport
+from rate_limiter import get_rate_limiter
+from retry_policy import run_with_retries_async
+from http_cache import get_cache
+from page_memo import get_active_memo
+from content_encoding import StreamDecoder, transfer_stats, with_accept_encoding
+from http2_transport import HTTP2_RETRY_EXCEPTIONS
+from response import Response
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+if aiohttp is not None:
+    ASYNC_RETRY_EXCEPTIONS = (aiohttp.ClientError, asyncio.TimeoutError) + HTTP2_RETRY_EXCEPTIONS
+else:
+    ASYNC_RETRY_EXCEPTIONS = RETRY_EXCEPTIONS
+
+# What one attempt returns: enough for the retry policy to classify it
+_AttemptResult = namedtuple("_AttemptResult", ["status_code", "headers", "content"])
+
+
+class AsyncHttpTransport:
+    """Asyncio transport with per-host concurrency limits"""
+
+    def __init__(self, per_host_limit: int = 16, timeout: float = DEFAULT_TIMEOUT):
+        """
+        Initialize the transport.
+
+        Args:
+            per_host_limit: Maximum number of concurrent requests per host
+            timeout: Total request timeout in seconds
+        """
+        self.per_host_limit = max(1, per_host_limit)
+        self.timeout = timeout
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._session = None
+        self._http2_client = None
+
+    async def __aenter__(self) -> "AsyncHttpTransport":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        """Return the semaphore that bounds concurrency for the URL's host"""
+        host = urlsplit(url).netloc
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return semaphore
+
+    def _get_session(self):
+        """Create the aiohttp session lazily, inside the running event loop"""
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=0, limit_per_host=self.per_host_limit)
+            # Bodies are decoded by _read_body, which also supports zstd
+            self._session = aiohttp.ClientSession(connector=connector, auto_decompress=False)
+        return self._session
+
+    def _get_http2_client(self, backend):
+        """Create the async HTTP/2 client lazily, inside the running event loop"""
+        if self._http2_client is None:
+            self._http2_client = backend.make_async_client()
+        return self._http2_client
+
+    async def request(self,
+                      method: str,
+                      url: str,
+                      headers: Optional[Dict[str, str]] = None,
+                      cookies: Optional[Dict[str, str]] = None,
+                      **kwargs: Any) -> bytes:
+        """Send a request and return the response body; see fetch"""
+        response = await self.fetch(method, url, headers=headers, cookies=cookies, **kwargs)
+        return response.content
+
+    async def fetch(self,
+                    method: str,
+                    url: str,
+                    headers: Optional[Dict[str, str]] = None,
+                    cookies: Optional[Dict[str, str]] = None,
+                    **kwargs: Any) -> Response:
+        """
+        Send a request and return its status, headers and body.
+
+        Args:
+            method: HTTP method
+            url: Target URL
+            headers: Request headers, the default User-Agent is used if empty
+            cookies: Request cookies
+            **kwargs: Passed through to the underlying client (json, params, ...)
+
+        Returns:
+            The Response, whose soup and JSON views are built on demand
+
+        Raises:
+            RetryError: If the request still fails after the policy's attempt budget
+        """
+        memo = get_active_memo()
+        if memo is not None and method == "GET":
+            response = await memo.get_async(
+                memo.key_for(url, cookies),
+                lambda: self._fetch(method, url, headers, cookies, **kwargs)
+            )
+            # Every caller gets its own soup to modify
+            return response.copy()
+        return await self._fetch(method, url, headers, cookies, **kwargs)
+
+    async def _fetch(self, method, url, headers, cookies, **kwargs) -> Response:
+        """Fetch through the disk cache (if enabled) under the retry policy"""
+        if not headers:
+            headers = DEFAULT_HEADERS
+
+        # Same cache protocol as the sync transport: serve fresh entries, revalidate stale ones
+        cache = get_cache() if method == "GET" else None
+        entry = None
+        if cache is not None:
+            key = cache.key_for(url, headers, cookies)
+            entry = cache.lookup(key)
+            if entry is not None and entry.is_fresh(cache.ttl):
+                cache.count("hits")
+                return self._cached_response(entry)
+            if entry is not None:
+                headers = cache.conditional_headers(entry, headers)
+
+        async def send_once() -> _AttemptResult:
+            # Wait for the host's rate limit before taking a concurrency slot
+            await get_rate_limiter().acquire_async(url)
+            async with self._host_semaphore(url):
+                http2 = get_transport().http2_backend(url)
+                if http2 is not None:
+                    status, response_headers, body = await http2.request_async(
+                        self._get_http2_client(http2), method, url, with_accept_encoding(headers),
+                        cookies=cookies, timeout=self.timeout, read_body=self._decode_body, **kwargs
+                    )
+                    return _AttemptResult(status, response_headers, body)
+                if aiohttp is None:
+                    response = await asyncio.to_thread(
+                        get_transport().send, method, url,
+                        headers=headers, cookies=cookies, timeout=self.timeout, **kwargs
+                    )
+                    return _AttemptResult(response.status_code, response.headers, response.content)
+                session = self._get_session()
+                try:
+                    async with session.request(method, url,
+                                               headers=with_accept_encoding(headers),
+                                               cookies=cookies,
+                                               timeout=aiohttp.ClientTimeout(total=self.timeout),
+                                               **kwargs) as response:
+                        body = await self._decode_body(response.content.iter_chunked(CHUNK_SIZE),
+                                                       response.headers.get("Content-Encoding"))
+                        return _AttemptResult(response.status, response.headers, body)
+                except aiohttp.InvalidURL as e:
+                    # A ClientError, but retrying will never make the URL valid
+                    raise ValueError(f"Invalid URL: {url}") from e
+
+        result = await run_with_retries_async(url, send_once, ASYNC_RETRY_EXCEPTIONS)
+        if cache is not None:
+            if result.status_code == 304 and entry is not None:
+                cache.count("revalidated")
+                cache.refresh(entry)
+                return self._cached_response(entry)
+            cache.count("misses")
+            if result.status_code == 200:
+                cache.store(key, url, result.status_code, dict(result.headers), result.content)
+        return Response(url, result.status_code, result.headers, result.content)
+
+    @staticmethod
+    def _cached_response(entry) -> Response:
+        return Response(entry.meta["url"], entry.meta["status"], entry.meta["headers"], entry.read_body(),
+                        from_cache=True)
+
+    @staticmethod
+    async def _decode_body(raw_chunks, content_encoding: Optional[str]) -> bytes:
+        """Read a response body from an async chunk iterator, decompressing chunks as they arrive"""
+        decoder = StreamDecoder(content_encoding)
+        chunks = []
+        wire = 0
+        async for chunk in raw_chunks:
+            wire += len(chunk)
+            chunks.append(decoder.decompress(chunk))
+        chunks.append(decoder.flush())
+        body = b"".join(chunks)
+        transfer_stats.add(wire, len(body))
+        return body
+
+    async def get(self, url: str, **kwargs: Any) -> bytes:
+        """Send a GET request"""
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> bytes:
+        """Send a POST request"""
+        return await self.request("POST", url, **kwargs)
+
+    async def close(self) -> None:
+        """Close the underlying sessions"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._http2_client is not None:
+            await self._http2_client.aclose()
+            self._http2_client = None
+
+
+# The transport used by scrape_util's async helpers in the current task.
+# Coordinators set it for the duration of a run; child tasks inherit it.
+_current_transport: contextvars.ContextVar[Optional[AsyncHttpTransport]] = contextvars.ContextVar(
+    "async_transport", default=None
+)
+
+
+def get_async_transport() -> AsyncHttpTransport:
+    """Return the transport of the current run, creating a standalone one if none is set"""
+    transport = _current_transport.get()
+    if transport is None:
+        transport = AsyncHttpTransport()
+        _current_transport.set(transport)
+    return transport
+
+
+def use_async_transport(transport: AsyncHttpTransport) -> contextvars.Token:
+    """Make a transport current for this task and the tasks it spawns"""
+    return _current_transport.set(transport)
+
+
+def reset_async_transport(token: contextvars.Token) -> None:
+    """Restore the transport that was current before use_async_transport"""
+    _current_transport.reset(token)
@@ -0,0 +1,176 @@
+"""
+Byte-level detection of block, challenge and throttling pages.
+
+Sites behind Cloudflare, and sites that throttle on their own, answer an
+aggressive scraper with a normal-looking HTML page (often with status 200
+or 403) instead of the content. Parsed as a chapter it fails much later
+with a confusing extraction error. The retry loop checks every fully read
+HTML response against a few byte signatures first; a blocked response
+counts as a failure, pauses its host on the circuit breaker and halves the
+host's request rate, and is retried once the pause is over. The rate comes
+back once the host has gone a while without serving another block page.
+
+Site signatures are phrases a chapter may well contain too, so they are
+only looked for in the page title, or anywhere in a body too short to be
+a chapter.
+"""
+
+import re
+import threading
+import time
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from rate_limiter import get_rate_limiter
+
+# Signatures are searched for in this many leading bytes of the body
+BLOCK_SNIFF_BYTES = 16 * 1024
+
+# Bodies up to this size are searched whole for site signatures
+SHORT_PAGE_BYTES = 2 * 1024
+
+_TITLE = re.compile(rb"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+Signature = Tuple[str, bytes]
+
+
+def _phrases(label: str, *texts: str, encodings: Sequence[str] = ("utf-8", "gbk")) -> Tuple[Signature, ...]:
+    """Signatures for text phrases, in every encoding the sites serve them in"""
+    return tuple((label, text.encode(encoding)) for text in texts for encoding in encodings)
+
+
+# Pages any site may serve in place of the content
+COMMON_SIGNATURES: Tuple[Signature, ...] = (
+    ("Cloudflare challenge", b"/cdn-cgi/challenge-platform/"),
+    ("Cloudflare challenge", b"<title>Just a moment...</title>"),
+    ("Cloudflare block", b"<title>Attention Required! | Cloudflare</title>"),
+    ("too many requests page", b"<title>429 Too Many Requests</title>"),
+    ("too many requests page", b"<title>Too Many Requests</title>"),
+)
+
+# Throttling notices of specific sites, by host name, matched in the title or a short body
+SITE_SIGNATURES: Dict[str, Tuple[Signature, ...]] = {
+    "69shu.net": _phrases("69shu throttling notice", "访问过于频繁", "请求过于频繁"),
+    "www.quanben.io": _phrases("Quanben throttling notice", "访问过于频繁", "请求过于频繁"),
+}
+
+
+class BlockDetector:
+    """Classifies responses as block pages and slows their hosts down"""
+
+    def __init__(self,
+                 signatures: Iterable[Signature] = COMMON_SIGNATURES,
+                 site_signatures: Optional[Dict[str, Iterable[Signature]]] = None,
+                 slowdown: float = 0.5,
+                 blocked_rate: float = 1.0,
+                 slowdown_interval: float = 30.0,
+                 restore_after: float = 300.0):
+        """
+        Initialize the detector.
+
+        Args:
+            signatures: (label, bytes) pairs checked for every host
+            site_signatures: Extra {host name: signatures}, SITE_SIGNATURES by default
+            slowdown: Factor applied to a limited host's rate when it serves a block page
+            blocked_rate: Rate (requests per second) given to an unlimited host that serves one
+            slowdown_interval: Seconds during which further block pages do not slow a host again
+            restore_after: Seconds without a block page after which a slowed host gets
+                its own rate and burst back
+        """
+        self.signatures = tuple(signatures)
+        self.site_signatures = {
+            host: tuple(site) for host, site in (SITE_SIGNATURES if site_signatures is None else site_signatures).items()
+        }
+        self.slowdown = slowdown
+        self.blocked_rate = blocked_rate
+        self.slowdown_interval = slowdown_interval
+        self.restore_after = restore_after
+        self.blocked: Dict[str, int] = {}
+        self._slowed_at: Dict[str, float] = {}
+        # Host limits from before the first slowdown, (None, 1) for unlimited, and when
+        # each slowed host last served a block page
+        self._limits: Dict[str, Tuple[Optional[float], int]] = {}
+        self._blocked_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def detect(self, url: str, headers, content: Optional[bytes]) -> Optional[str]:
+        """
+        Return the label of the signature an HTML body matches, or None.
+
+        Args:
+            url: URL of the response, selects the site signatures
+            headers: Response headers
+            content: Decoded body, None when it has not been read
+        """
+        if not content:
+            return None
+        content_type = headers.get("Content-Type", "")
+        if content_type and "html" not in content_type.lower():
+            return None
+        head = content[:BLOCK_SNIFF_BYTES]
+        for label, signature in self.signatures:
+            if signature in head:
+                return label
+        site_signatures = self.site_signatures.get(urlsplit(url).hostname)
+        if site_signatures:
+            if len(content) <= SHORT_PAGE_BYTES:
+                text = content
+            else:
+                title = _TITLE.search(head)
+                text = title.group(1) if title else b""
+            for label, signature in site_signatures:
+                if signature in text:
+                    return label
+        return None
+
+    def record_block(self, url: str) -> None:
+        """Count a block page and lower its host's request rate"""
+        host = urlsplit(url).netloc
+        now = time.monotonic()
+        limiter = get_rate_limiter()
+        with self._lock:
+            self.blocked[host] = self.blocked.get(host, 0) + 1
+            self._blocked_at[host] = now
+            # Workers that were blocked together slow the host down once
+            if now - self._slowed_at.get(host, -self.slowdown_interval) < self.slowdown_interval:
+                return
+            self._slowed_at[host] = now
+            bucket = limiter.bucket(url)
+            limit = (bucket.rate, bucket.burst) if bucket is not None else (None, 1)
+            self._limits.setdefault(host, limit)
+        if bucket is not None:
+            limiter.set_host_limit(host, bucket.rate * self.slowdown, bucket.burst)
+        else:
+            limiter.set_host_limit(host, self.blocked_rate)
+
+    def record_clean(self, url: str) -> None:
+        """Give a slowed host its limit back once it has not blocked for restore_after seconds"""
+        host = urlsplit(url).netloc
+        if host not in self._limits:
+            return
+        with self._lock:
+            if host not in self._limits or time.monotonic() - self._blocked_at[host] < self.restore_after:
+                return
+            rate, burst = self._limits.pop(host)
+            self._slowed_at.pop(host, None)
+        get_rate_limiter().set_host_limit(host, rate, burst)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of block pages received, by host"""
+        with self._lock:
+            return dict(self.blocked)
+
+
+_block_detector: Optional[BlockDetector] = BlockDetector()
+
+
+def get_block_detector() -> Optional[BlockDetector]:
+    """Return the process-wide block detector, or None if detection is disabled"""
+    return _block_detector
+
+
+def configure_block_detection(detector: Optional[BlockDetector]) -> Optional[BlockDetector]:
+    """Replace the process-wide block detector; None disables detection"""
+    global _block_detector
+    _block_detector = detector
+    return _block_detector
@@ -0,0 +1,135 @@
+"""
+Crash-safe journal of downloaded chapters, for resuming interrupted runs.
+
+Every chapter is appended to a per-novel JSON Lines file as soon as it has
+been downloaded: its URL, its number among the run's chapters (parts are
+not counted, whichever coordinator ran), a SHA-256 of the chapter and the
+chapter itself, as the scraper returned it. The text pipeline has
+not run on journaled chapters: on resume it runs on them like on the
+downloaded ones, once, with the options of the resumed run. A run that dies
+leaves the journal behind; the next run opened with resume=True serves the
+journaled chapters from disk and only downloads the missing ones. Only the
+offset of each line is kept in memory, so resuming a long novel does not
+hold it in memory.
+
+A crash can cut the last line short; it is dropped when the journal is
+opened again. The hash covers the chapter's bytes as written, and entries
+whose hash does not match are downloaded again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+# Directory of the journals when --resume is given without --journal-dir
+DEFAULT_JOURNAL_DIR = ".scraper_journal"
+
+
+def journal_path(directory: str, novel_url: str) -> str:
+    """Path of the journal of a novel in directory"""
+    return os.path.join(directory, hashlib.sha1(novel_url.encode("utf-8")).hexdigest()[:16] + ".jsonl")
+
+
+# The chapter is the last field of a line, and its bytes are what the digest covers
+_CHAPTER_KEY = b', "chapter": '
+
+
+class CheckpointJournal:
+    """Append-only record of a novel's downloaded chapters, by URL"""
+
+    def __init__(self, path: str, resume: bool = True, fsync: bool = False):
+        """
+        Open the journal.
+
+        Args:
+            path: Journal file, created with its directory if needed
+            resume: Keep the chapters of an existing journal; False starts it over
+            fsync: Sync every entry to disk, which also survives a power loss
+                rather than only the process dying
+        """
+        self.path = path
+        self.fsync = fsync
+        self.resumed = 0
+        self.recorded = 0
+        # URL -> (offset of its line, digest of its chapter)
+        self._entries: Dict[str, Tuple[int, str]] = {}
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if resume and os.path.exists(path):
+            self._load()
+        else:
+            open(path, "wb").close()
+        self._file = open(path, "ab")
+
+    def _load(self) -> None:
+        """Index the journal's lines, dropping a last line cut short by a crash"""
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                    self._entries[entry["url"]] = (offset, entry["sha256"])
+                except (ValueError, KeyError, TypeError):
+                    break
+                offset += len(line)
+        if offset != os.path.getsize(self.path):
+            os.truncate(self.path, offset)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._entries
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the journaled chapter of url, None if it is missing or damaged"""
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        offset, digest = entry
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            line = f.readline()
+        # A JSON string cannot hold an unescaped quote, so the first match is the key
+        start = line.find(_CHAPTER_KEY)
+        if start < 0 or not line.endswith(b"}\n"):
+            return None
+        payload = line[start + len(_CHAPTER_KEY):-2]
+        if hashlib.sha256(payload).hexdigest() != digest:
+            return None
+        with self._lock:
+            self.resumed += 1
+        return json.loads(payload)
+
+    def record(self, index: Optional[int], url: str, chapter: Dict[str, Any]) -> None:
+        """Append a downloaded chapter; it is on disk when this returns"""
+        payload = json.dumps(chapter, ensure_ascii=False).encode("utf-8")
+        digest = hashlib.sha256(payload).hexdigest()
+        head = json.dumps({"index": index, "url": url, "sha256": digest}, ensure_ascii=False).encode("utf-8")
+        line = head[:-1] + _CHAPTER_KEY + payload + b"}\n"
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._entries[url] = (offset, digest)
+            self.recorded += 1
+
+    def close(self) -> None:
+        """Close the journal, keeping it for a later resume"""
+        with self._lock:
+            self._file.close()
+
+    def discard(self) -> None:
+        """Close and delete the journal, once its run has completed"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
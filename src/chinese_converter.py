@@ -0,0 +1,172 @@
+"""
+Simplified to traditional Chinese conversion of chapter text.
+
+ChineseConverter is a TextStage that converts each chapter as it is
+scraped, using OpenCC's dictionaries: STCharacters.txt maps single
+characters and STPhrases.txt maps the words whose characters convert
+differently in context (发 is 發 in 发现 but 髮 in 头发). Characters are
+converted with a str.translate table, phrases by longest match against a
+trie, scanning forward like OpenCC does.
+
+The dictionaries are read the first time a chapter is converted and are
+shared by every converter, and thread, using the same files.
+"""
+
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from text_pipeline import TextStage
+
+
+def default_dictionary_dir() -> Optional[str]:
+    """Dictionary directory of the opencc-python-reimplemented package, None if it is not installed"""
+    try:
+        import opencc
+    except ImportError:
+        return None
+    directory = os.path.join(os.path.dirname(opencc.__file__), "dictionary")
+    return directory if os.path.isfile(os.path.join(directory, "STCharacters.txt")) else None
+
+
+def load_dictionary(path: str) -> Dict[str, str]:
+    """Read an OpenCC text dictionary ("key<TAB>candidate candidate ..." lines), keeping the first candidate"""
+    entries = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            key, _, candidates = line.rstrip("\n").partition("\t")
+            if key and candidates and not key.startswith("#"):
+                entries[key] = candidates.split(" ")[0]
+    return entries
+
+
+class _Tables:
+    """Compiled dictionaries: the character table and the phrase trie"""
+
+    def __init__(self, characters: Dict[str, str], phrases: Dict[str, str], windowed: bool = False):
+        self.table = {ord(key): value for key, value in characters.items() if len(key) == 1}
+        if windowed:
+            # Phrases that convert the same way their characters do change nothing
+            phrases = {key: value for key, value in phrases.items() if key.translate(self.table) != value}
+        self.trie: Dict[str, Any] = {}
+        # For each character a phrase converts differently from the table, the
+        # farthest it sits from the start of such a phrase
+        self.reach: Dict[str, int] = {}
+        for key, value in phrases.items():
+            node = self.trie
+            for char in key:
+                node = node.setdefault(char, {})
+            node[""] = value
+            if windowed:
+                offsets = [offset for offset, (by_table, by_phrase) in enumerate(zip(key.translate(self.table), value))
+                           if by_table != by_phrase]
+                # A phrase that only differs in length is found from its first character
+                for offset in offsets or [0]:
+                    self.reach[key[offset]] = max(self.reach.get(key[offset], 0), offset)
+        # Exact matching looks up the positions a phrase starts at, windowed
+        # matching the windows before each character a phrase converts differently
+        characters = self.reach if windowed else self.trie
+        self.triggers = re.compile("[" + "".join(map(re.escape, sorted(characters))) + "]") if characters else None
+
+
+_tables: Dict[Tuple[str, str, bool], _Tables] = {}
+_tables_lock = threading.Lock()
+
+
+class ChineseConverter(TextStage):
+    """
+    Converts chapter text with a pair of OpenCC dictionaries, simplified to
+    traditional by default.
+
+    By default the result is OpenCC's: the longest phrase is matched at
+    every position a phrase starts at, which a regex over the phrases'
+    first characters finds, and the text in between goes through
+    str.translate in bulk. With windowed=True, phrases that convert like
+    their characters are left out and only the few positions a regex finds
+    near characters a phrase converts differently are looked up; that is
+    faster but can segment a rare run of text differently from OpenCC.
+    """
+
+    name = "convert"
+
+    def __init__(self,
+                 dictionary_dir: Optional[str] = None,
+                 characters: str = "STCharacters.txt",
+                 phrases: str = "STPhrases.txt",
+                 windowed: bool = False):
+        """
+        Initialize the converter; the dictionaries are read on first use.
+
+        Args:
+            dictionary_dir: Directory holding the dictionaries, by default the one
+                of the opencc-python-reimplemented package
+            characters: Character dictionary file, TSCharacters.txt for the reverse
+            phrases: Phrase dictionary file, TSPhrases.txt for the reverse
+            windowed: Match phrases only near the characters they convert differently,
+                an approximation of OpenCC's segmentation
+        """
+        dictionary_dir = dictionary_dir or default_dictionary_dir()
+        if dictionary_dir is None:
+            raise ValueError("No OpenCC dictionary directory given and opencc-python-reimplemented is not installed")
+        self.paths = (os.path.join(dictionary_dir, characters), os.path.join(dictionary_dir, phrases))
+        self.windowed = windowed
+        for path in self.paths:
+            if not os.path.isfile(path):
+                raise ValueError(f"OpenCC dictionary not found: {path}")
+
+    @property
+    def tables(self) -> _Tables:
+        """The compiled dictionaries, read and shared on first use"""
+        key = (*self.paths, self.windowed)
+        tables = _tables.get(key)
+        if tables is None:
+            with _tables_lock:
+                tables = _tables.get(key)
+                if tables is None:
+                    tables = _tables[key] = _Tables(*map(load_dictionary, self.paths), self.windowed)
+        return tables
+
+    def apply(self, text: str) -> str:
+        tables = self.tables
+        table, trie = tables.table, tables.trie
+        if tables.triggers is None:
+            return text.translate(table)
+
+        # Positions a phrase may start at: (first, last) windows before each
+        # trigger, the trigger itself when matching exactly
+        if self.windowed:
+            reach = tables.reach
+            windows = sorted((match.start() - reach[match.group()], match.start())
+                             for match in tables.triggers.finditer(text))
+        else:
+            windows = ((match.start(), match.start()) for match in tables.triggers.finditer(text))
+        pieces: List[str] = []
+        converted = 0
+        position = 0
+        length = len(text)
+        for first, last in windows:
+            if last < position:
+                continue
+            position = max(position, first)
+            while position <= last:
+                # Longest phrase starting here
+                node = trie.get(text[position])
+                end = position + 1
+                found = None
+                while node is not None:
+                    value = node.get("")
+                    if value is not None:
+                        found = (end, value)
+                    if end >= length:
+                        break
+                    node = node.get(text[end])
+                    end += 1
+                if found is None:
+                    position += 1
+                    continue
+                pieces.append(text[converted:position].translate(table))
+                pieces.append(found[1])
+                position = converted = found[0]
+        pieces.append(text[converted:].translate(table))
+        return "".join(pieces)
@@ -0,0 +1,201 @@
+"""
+Compressed transfer negotiation and streaming decompression.
+
+The transports advertise every content coding that can be decoded here
+(zstd and brotli when their optional packages are installed, gzip and
+deflate always) and decode response bodies chunk by chunk as they arrive,
+instead of letting the HTTP client buffer and decode the whole body. The
+number of bytes received on the wire and after decoding is tracked so the
+saving can be reported.
+"""
+
+import threading
+import zlib
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def available_encodings() -> List[str]:
+    """Return the content codings that can be decoded, most compact first"""
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings += ["gzip", "deflate"]
+    return encodings
+
+
+ACCEPT_ENCODING = ", ".join(available_encodings())
+
+
+def with_accept_encoding(headers: Dict[str, str]) -> Dict[str, str]:
+    """Return headers with Accept-Encoding advertising every decodable coding, unless already set"""
+    if any(name.lower() == "accept-encoding" for name in headers):
+        return headers
+    headers = dict(headers)
+    headers["Accept-Encoding"] = ACCEPT_ENCODING
+    return headers
+
+
+class _DeflateDecoder:
+    """Decodes zlib-wrapped deflate, falling back to raw deflate as some servers send"""
+
+    def __init__(self):
+        self._first = True
+        self._obj = zlib.decompressobj()
+
+    def decompress(self, data: bytes) -> bytes:
+        if not self._first:
+            return self._obj.decompress(data)
+        self._first = False
+        try:
+            return self._obj.decompress(data)
+        except zlib.error:
+            self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+            return self._obj.decompress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class _GzipDecoder:
+    """Decodes gzip, including bodies made of several gzip members"""
+
+    def __init__(self):
+        self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def decompress(self, data: bytes) -> bytes:
+        output = self._obj.decompress(data)
+        while self._obj.unused_data:
+            data = self._obj.unused_data
+            self._obj = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            output += self._obj.decompress(data)
+        return output
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BrotliDecoder:
+    def __init__(self):
+        self._obj = brotli.Decompressor()
+        # brotli names it process(), brotlicffi decompress()
+        self._decompress = getattr(self._obj, "process", None) or self._obj.decompress
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompress(data)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _ZstdDecoder:
+    def __init__(self):
+        self._obj = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._obj.decompress(data)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+_DECODERS = {
+    "gzip": _GzipDecoder,
+    "x-gzip": _GzipDecoder,
+    "deflate": _DeflateDecoder,
+}
+if brotli is not None:
+    _DECODERS["br"] = _BrotliDecoder
+if zstandard is not None:
+    _DECODERS["zstd"] = _ZstdDecoder
+
+
+class StreamDecoder:
+    """Incrementally decodes a body sent with the given Content-Encoding"""
+
+    def __init__(self, content_encoding: Optional[str]):
+        """
+        Args:
+            content_encoding: Value of the Content-Encoding header; codings
+                are listed in the order they were applied
+        """
+        codings = [c.strip().lower() for c in (content_encoding or "").split(",")]
+        # Undo the codings in reverse order of application
+        self._decoders = [_DECODERS[c]() for c in reversed(codings) if c in _DECODERS]
+
+    def decompress(self, data: bytes) -> bytes:
+        for decoder in self._decoders:
+            data = decoder.decompress(data)
+        return data
+
+    def flush(self) -> bytes:
+        data = b""
+        for decoder in self._decoders:
+            if data:
+                data = decoder.decompress(data)
+            data += decoder.flush()
+        return data
+
+
+class TransferStats:
+    """Counts bytes received on the wire and after decompression"""
+
+    def __init__(self):
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, wire_bytes: int, decoded_bytes: int) -> None:
+        with self._lock:
+            self.wire_bytes += wire_bytes
+            self.decoded_bytes += decoded_bytes
+
+    @property
+    def ratio(self) -> float:
+        """Decoded size divided by wire size"""
+        return self.decoded_bytes / self.wire_bytes if self.wire_bytes else 1.0
+
+
+transfer_stats = TransferStats()
+
+
+def iter_decoded(raw_chunks: Iterable[bytes], content_encoding: Optional[str]) -> Iterator[bytes]:
+    """
+    Decode a stream of raw body chunks, yielding decoded bytes as soon as they are available.
+
+    Args:
+        raw_chunks: Body chunks as received on the wire
+        content_encoding: Value of the response's Content-Encoding header
+
+    Returns:
+        Iterator of decoded chunks
+    """
+    decoder = StreamDecoder(content_encoding)
+    wire = decoded = 0
+    try:
+        for chunk in raw_chunks:
+            wire += len(chunk)
+            data = decoder.decompress(chunk)
+            if data:
+                decoded += len(data)
+                yield data
+        data = decoder.flush()
+        if data:
+            decoded += len(data)
+            yield data
+    finally:
+        transfer_stats.add(wire, decoded)
@@ -6,8 +6,7 @@ using a composition pattern, decoupling the scraping and storage logic.
 """
 
 import logging
-from typing import List, Dict, Any, Optional
-import time
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Set, Tuple
 import sys
 import os
 
@@ -15,8 +14,13 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from interfaces import NovelScraper, AudioNovelScraper, Adapter, ProgressReporter
-from threading_utils import BatchProcessor
+from threading_utils import WorkQueueProcessor, iter_in_background
 from scrape_util import scrape_util
+from page_memo import PageMemo
+from text_pipeline import TextPipeline
+from checkpoint_journal import CheckpointJournal
+from novel_index import NovelIndex
+from rate_limiter import limits_from_delay
 
 # Configure logging
 logging.basicConfig(
@@ -33,7 +37,13 @@ class NovelScraperCoordinator:
                  adapter: Adapter,
                  progress_reporter: Optional[ProgressReporter] = None,
                  max_threads: int = 6,
-                 delay_between_requests: float = 1.0):
+                 delay_between_requests: Optional[float] = None,
+                 pooled_connections: bool = True,
+                 rate: Optional[float] = None,
+                 burst: int = 1,
+                 http2_hosts: Optional[Iterable[str]] = None,
+                 text_pipeline: Optional[TextPipeline] = None,
+                 journal: Optional[CheckpointJournal] = None):
         """
         Initialize the coordinator.
         
@@ -42,14 +52,37 @@ class NovelScraperCoordinator:
             adapter: The adapter for processing/saving the scraped data
             progress_reporter: Optional progress reporter
             max_threads: Maximum number of threads for parallel operations
-            delay_between_requests: Delay between requests to avoid overloading servers
+            delay_between_requests: Deprecated, use rate. Converted to the throughput it
+                used to allow: max_threads / delay requests per second, in bursts of max_threads
+            pooled_connections: Reuse kept-alive connections (one pool of max_threads per host)
+            rate: Maximum requests per second per host, None for no limit
+            burst: Number of requests per host that may be sent back to back
+            http2_hosts: Hosts fetched over one multiplexed HTTP/2 connection
+                instead of the HTTP/1.1 pool (needs httpx[http2])
+            text_pipeline: Optional stages (normalization, ...) run on each chapter's
+                content before it reaches the adapter
+            journal: Optional journal that records each downloaded chapter and serves
+                the chapters of an interrupted run; deleted once a run gets every chapter
         """
         self.scraper = scraper
         self.adapter = adapter
         self.progress_reporter = progress_reporter
         self.max_threads = max_threads
-        self.delay = delay_between_requests
-        self.threading_manager = BatchProcessor()
+        self.threading_manager = WorkQueueProcessor()
+        self.text_pipeline = text_pipeline
+        self.journal = journal
+        # Chapters of the last run that could not be downloaded
+        self.failed_chapters = 0
+        
+        if rate is None and delay_between_requests:
+            rate, burst = limits_from_delay(delay_between_requests, max_threads, burst)
+        self.rate = rate
+        self.burst = burst
+        
+        # Size the shared connection pool so every worker thread can keep its own connection alive
+        scrape_util.configure_transport(pool_size=max_threads, pooled=pooled_connections, http2_hosts=http2_hosts)
+        # Pace requests per host in the transport instead of sleeping in the workers
+        scrape_util.configure_rate_limit(rate=rate, burst=burst)
     
     def scrape_novel(self, 
                     novel_url: str, 
@@ -68,6 +101,8 @@ class NovelScraperCoordinator:
         Returns:
             Dictionary with results from the adapter
         """
+        # Share pages fetched more than once during this run
+        memo = scrape_util.acquire_page_memo()
         try:
             # Report start
             if self.progress_reporter:
@@ -80,180 +115,296 @@ class NovelScraperCoordinator:
                 author = novel_info.get("author", "Unknown")
                 self.progress_reporter.print(f"Novel: '{title}' by {author}")
             
-            # Get index pages
-            if self.progress_reporter:
-                self.progress_reporter.print("Retrieving index structure...")
+            # Chapters the adapter's output already has are not downloaded again
+            saved = self.adapter.saved_chapter_urls(novel_info)
+            if self.progress_reporter and saved:
+                self.progress_reporter.print(f"{len(saved)} chapters already saved, downloading new chapters only")
             
-            # Use get_index_structure instead of get_index_pages + get_chapter_urls
-            full_structure = self.scraper.get_index_structure(novel_url)
+            # The adapter takes chapters as they are downloaded, in order
+            chapters = self.iter_chapters(novel_url, max_chapters, chapter_range, range_callback, saved=saved)
+            try:
+                result = self.adapter.process_novel_stream(novel_info, chapters)
+            finally:
+                # An adapter that stopped early leaves downloads queued; stop them
+                # before the journal is finished
+                chapters.close()
+            self._report_result(result)
+            self._report_memo(memo)
+            self._finish_journal(result)
             
-            # Extract only chapter items for downloading
-            chapter_items = [item for item in full_structure if item["type"] == "chapter"]
-            chapter_urls = [item["url"] for item in chapter_items]
+            return result
             
+        except Exception as e:
+            logger.error(f"Error scraping novel: {str(e)}")
             if self.progress_reporter:
-                total_parts = sum(1 for item in full_structure if item["type"] in ("volume", "part"))
-                self.progress_reporter.print(f"Found {len(chapter_urls)} chapters and {total_parts} parts")
+                self.progress_reporter.print(f"Error: {str(e)}")
+            result = {
+                "status": "error",
+                "error": str(e)
+            }
+            self._finish_journal(result)
+            return result
+        finally:
+            scrape_util.release_page_memo()
+            # Close progress reporter if it has a close method
+            if self.progress_reporter and hasattr(self.progress_reporter, "close"):
+                self.progress_reporter.close()
+
+    def iter_chapters(self,
+                      novel_url: str,
+                      max_chapters: Optional[int] = None,
+                      chapter_range: Optional[str] = None,
+                      range_callback: Optional[Any] = None,
+                      window: Optional[int] = None,
+                      saved: Optional[Set[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the novel's structure items in order, each chapter as soon as it
+        and the chapters before it are downloaded.
+        
+        Volumes and parts are yielded as they are in the index; chapters come
+        with their downloaded content merged in, and chapters that failed are
+        left out, like scrape_novel does. Chapters in saved are not
+        downloaded: they come as their index item with "saved": True, for
+        the adapter to take from its output. Chapters are downloaded on
+        max_threads threads, but no more than window of them ahead of the
+        oldest one not yet yielded: memory stays bounded, and downloads pause
+        while the caller is busy.
+        
+        Args:
+            novel_url: URL of the novel to scrape
+            max_chapters: Optional limit on number of chapters to scrape
+            chapter_range: Optional range of chapters to scrape (e.g., '1-10')
+            range_callback: Optional callback to request range after getting total count
+            window: Most items downloaded ahead of the caller, 4 * max_threads by default
+            saved: URLs of the chapters the adapter already has
             
-            # Handle range selection
-            total_chapters = len(chapter_urls)
-            selected_range = chapter_range
+        Returns:
+            Iterator of structure items
+        """
+        saved = saved or set()
+        # Share pages fetched more than once while the chapters are read
+        scrape_util.acquire_page_memo()
+        try:
+            if self.progress_reporter:
+                self.progress_reporter.print("Retrieving index structure...")
             
-            # If range_callback is provided and no range was explicitly given, use it
-            if range_callback and not selected_range:
-                selected_range = range_callback(total_chapters)
+            structure = self.scraper.iter_index_structure(novel_url)
             
-            # Apply range if specified
-            if selected_range:
-                start, end = scrape_util.parse_range(selected_range, total_chapters)
-                selected_chapter_urls = chapter_urls[start:end]
-                
-                # Rebuild full_structure to only include selected chapters and their preceding parts
-                new_structure = []
-                current_part = None
-                for item in full_structure:
-                    if item["type"] in ("volume", "part"):
-                        current_part = item
-                    elif item["type"] == "chapter":
-                        if item["url"] in selected_chapter_urls:
-                            if current_part:
-                                new_structure.append(current_part)
-                                current_part = None # Clear so we don't add it again for the next chapter
-                            new_structure.append(item)
-                
-                full_structure = new_structure
-                chapter_urls = selected_chapter_urls
-                
-                if self.progress_reporter:
-                    self.progress_reporter.print(
-                        f"Selected range {selected_range}: downloading chapters {start+1} to {end} (Total: {len(chapter_urls)})"
-                    )
-            # Apply chapter limit if specified and no range was used
-            elif max_chapters and max_chapters < total_chapters:
-                selected_chapter_urls = chapter_urls[:max_chapters]
-                
-                new_structure = []
-                current_part = None
-                for item in full_structure:
-                    if item["type"] in ("volume", "part"):
-                        current_part = item
-                    elif item["type"] == "chapter":
-                        if item["url"] in selected_chapter_urls:
-                            if current_part:
-                                new_structure.append(current_part)
-                                current_part = None
-                            new_structure.append(item)
+            if chapter_range or range_callback:
+                # A range is resolved against the chapter count, so the whole index is needed first
+                index = NovelIndex(structure)
+                self._report_structure(index.items)
                 
-                full_structure = new_structure
-                chapter_urls = selected_chapter_urls
-                
-                if self.progress_reporter:
-                    self.progress_reporter.print(
-                        f"Limiting to {max_chapters} chapters (out of {total_chapters} available)"
-                    )
+                index = self._select_chapters(index, max_chapters, chapter_range, range_callback)
+                items = index.items
+                total_chapters = sum(1 for url in index.chapter_urls() if url not in saved)
+            else:
+                # Nothing needs the chapter count: download chapters as the index
+                # arrives, reading the rest of it in the background meanwhile
+                taken = []
+                items = iter_in_background(self._take_items(structure, taken, max_chapters))
+                total_chapters = None
             
-            # Prepare to scrape chapters
+            # Prepare to scrape chapters (a progress total of 0 means not known yet)
             if self.progress_reporter:
-                self.progress_reporter.print(f"Scraping {len(chapter_urls)} chapters...")
-                self.progress_reporter.initialize_progress(len(chapter_urls))
+                if total_chapters is None:
+                    self.progress_reporter.print("Scraping chapters as the index arrives...")
+                else:
+                    self.progress_reporter.print(f"Scraping {total_chapters} chapters...")
+                self.progress_reporter.initialize_progress(total_chapters or 0)
             
-            # Mapping from URL to downloaded content
-            downloaded_chapters = {}
+            # Parts and saved chapters go through the workers too, so they keep
+            # their place in the order, but are not counted as downloads
+            uncounted_indices = set()
             
-            # Use threading for chapters if there are enough of them
-            if len(chapter_urls) >= 3 and self.max_threads > 1:
-                # Define the processing function for each chapter
-                def process_chapter(chapter_url: str, index: int) -> Dict[str, Any]:
-                    content = self.scraper.get_chapter_content(chapter_url)
-                    time.sleep(self.delay)  # Be nice to the server
-                    return content
-                
-                # Define the chunk handler to report progress and collect results
-                def chunk_handler(chunk_start: int, chunk: List[str], results: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
-                    chunk_results = []
-                    for i in range(len(chunk)):
-                        index = chunk_start + i
-                        if index in results:
-                            content = results[index]
-                            downloaded_chapters[chunk[i]] = content
-                            chunk_results.append(content)
-                    
-                    # Update progress
-                    if self.progress_reporter:
-                        self.progress_reporter.update_progress(len(chunk))
-                        self.progress_reporter.set_description(
-                            f"Scraping {chunk_start + len(chunk)}/{len(chapter_urls)} chapters"
-                        )
-                    
-                    return chunk_results
-                
-                # Process chapters in parallel
-                self.threading_manager.process_in_parallel(
-                    chapter_urls,
-                    process_chapter,
-                    chunk_handler,
-                    min(self.max_threads, len(chapter_urls))
-                )
-            else:
-                # Sequential processing for a small number of chapters
-                for i, chapter_url in enumerate(chapter_urls):
-                    content = self.scraper.get_chapter_content(chapter_url)
-                    downloaded_chapters[chapter_url] = content
-                    
-                    # Update progress
-                    if self.progress_reporter:
-                        self.progress_reporter.update_progress(1)
-                        self.progress_reporter.set_description(
-                            f"Scraping {i+1}/{len(chapter_urls)} chapters"
-                        )
-                    
-                    time.sleep(self.delay)  # Be nice to the server
+            def numbered(items: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Optional[int], Dict[str, Any]]]:
+                """Pair each item with its chapter number (None for parts), as the journal records it"""
+                number = 0
+                for index, item in enumerate(items):
+                    if item["type"] != "chapter" or item["url"] in saved:
+                        uncounted_indices.add(index)
+                    if item["type"] == "chapter":
+                        yield number, item
+                        number += 1
+                    else:
+                        yield None, item
             
-            # Combine structure with downloaded content
-            final_chapters_with_structure = []
-            for item in full_structure:
-                if item["type"] == "chapter":
-                    if item["url"] in downloaded_chapters:
-                        # Update the structure item with content
-                        chapter_content = downloaded_chapters[item["url"]]
-                        item.update(chapter_content)
-                        final_chapters_with_structure.append(item)
-                else:
-                    final_chapters_with_structure.append(item)
-
-            # Process with the adapter
-            if self.progress_reporter:
-                self.progress_reporter.print("Processing scraped content...")
+            def process_item(entry: Tuple[Optional[int], Dict[str, Any]], index: int) -> Dict[str, Any]:
+                number, item = entry
+                if item["type"] != "chapter":
+                    return item
+                if item["url"] in saved:
+                    return {**item, "saved": True}
+                # Politeness is enforced by the transport's per-host rate limiter
+                return {**item, **self._get_chapter(item["url"], number)}
             
-            result = self.adapter.process_novel(novel_info, final_chapters_with_structure)
+            # Report progress as each chapter finishes, whatever its position
+            finished_chapters = 0
             
-            # Report completion
-            if self.progress_reporter:
-                if result.get("status") == "success":
-                    self.progress_reporter.print("Novel scraping completed successfully!")
-                    
-                    # Show output location
-                    if "file_path" in result:
-                        self.progress_reporter.print(f"Saved to: {result['file_path']}")
-                    elif "folder_path" in result:
-                        self.progress_reporter.print(f"Saved to: {result['folder_path']}")
-                else:
-                    self.progress_reporter.print(f"Processing failed: {result.get('error', 'Unknown error')}")
+            def item_handler(index: int, elapsed: float) -> None:
+                nonlocal finished_chapters
+                if index in uncounted_indices:
+                    uncounted_indices.discard(index)
+                    return
+                finished_chapters += 1
+                if self.progress_reporter:
+                    self.progress_reporter.update_progress(1)
+                    self.progress_reporter.set_description(
+                        self._progress_description(finished_chapters, total_chapters)
+                    )
             
-            return result
+            threads = max(1, min(self.max_threads, total_chapters or self.max_threads))
+            yielded_chapters = 0
+            for _, item in self.threading_manager.iter_in_order(numbered(items), process_item, threads, window, item_handler):
+                if item["type"] == "chapter" and not item.get("saved"):
+                    yielded_chapters += 1
+                yield item
+            self.failed_chapters = finished_chapters - yielded_chapters
             
-        except Exception as e:
-            logger.error(f"Error scraping novel: {str(e)}")
-            if self.progress_reporter:
-                self.progress_reporter.print(f"Error: {str(e)}")
-            return {
-                "status": "error",
-                "error": str(e)
-            }
+            if total_chapters is None:
+                self._report_structure(taken)
         finally:
-            # Close progress reporter if it has a close method
-            if self.progress_reporter and hasattr(self.progress_reporter, "close"):
-                self.progress_reporter.close()
+            scrape_util.release_page_memo()
+    
+    def _get_chapter(self, chapter_url: str, number: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Fetch a chapter, or take it from the journal, and run its content through the text pipeline.
+        
+        The journal holds chapters as the scraper returned them, so the pipeline
+        runs on a journaled chapter exactly once, as it does on a downloaded one.
+        
+        Args:
+            chapter_url: URL of the chapter
+            number: Position of the chapter among the run's chapters, parts not
+                counted, recorded in the journal as the async coordinator does
+        """
+        chapter = self.journal.get(chapter_url) if self.journal is not None else None
+        if chapter is None:
+            chapter = self.scraper.get_chapter_content(chapter_url)
+            if self.journal is not None:
+                self.journal.record(number, chapter_url, chapter)
+        return self._postprocess(chapter)
+    
+    def _postprocess(self, chapter: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a chapter's content through the text pipeline, if any"""
+        if self.text_pipeline is None:
+            return chapter
+        return self.text_pipeline.process(chapter)
+    
+    def _take_items(self,
+                    structure: Iterable[Dict[str, Any]],
+                    taken: List[Dict[str, Any]],
+                    max_chapters: Optional[int]) -> Iterator[Dict[str, Any]]:
+        """
+        Yield structure items as the index arrives, up to max_chapters chapters.
+        
+        The items yielded, also appended to taken, are the ones
+        _select_chapters would keep: a part only once one of its chapters is
+        taken, and trailing parts only when no chapter was left out.
+        """
+        pending_parts = []
+        chapters = 0
+        for item in structure:
+            if item["type"] != "chapter":
+                pending_parts.append(item)
+                continue
+            if max_chapters and chapters >= max_chapters:
+                if self.progress_reporter:
+                    self.progress_reporter.print(f"Limiting to {max_chapters} chapters")
+                return
+            pending_parts.append(item)
+            chapters += 1
+            taken.extend(pending_parts)
+            yield from pending_parts
+            pending_parts = []
+        taken.extend(pending_parts)
+        yield from pending_parts
+    
+    def _report_structure(self, full_structure: List[Dict[str, Any]]) -> None:
+        """Report how many chapters and parts the index has"""
+        if self.progress_reporter:
+            chapter_count = sum(1 for item in full_structure if item["type"] == "chapter")
+            total_parts = sum(1 for item in full_structure if item["type"] in ("volume", "part"))
+            self.progress_reporter.print(f"Found {chapter_count} chapters and {total_parts} parts")
+    
+    @staticmethod
+    def _progress_description(done: int, total: Optional[int]) -> str:
+        if total is None:
+            return f"Scraping {done} chapters"
+        return f"Scraping {done}/{total} chapters"
+    
+    def _select_chapters(self,
+                         index: NovelIndex,
+                         max_chapters: Optional[int],
+                         chapter_range: Optional[str],
+                         range_callback: Optional[Any]) -> NovelIndex:
+        """
+        Apply range or max_chapters selection to the index.
+        
+        Args:
+            index: Full index of the novel
+            max_chapters: Optional limit on number of chapters to scrape
+            chapter_range: Optional range of chapters to scrape (e.g., '1-10')
+            range_callback: Optional callback to request range after getting total count
+            
+        Returns:
+            Index of the selected chapters and the parts heading them
+        """
+        total_chapters = len(index)
+        selected_range = chapter_range
+        
+        # If range_callback is provided and no range was explicitly given, use it
+        if range_callback and not selected_range:
+            selected_range = range_callback(total_chapters)
+        
+        # A range wins over the chapter limit
+        if selected_range:
+            start, end = scrape_util.parse_range(selected_range, total_chapters)
+            message = f"Selected range {selected_range}: downloading chapters {start+1} to {end} (Total: {max(0, end - start)})"
+        elif max_chapters and max_chapters < total_chapters:
+            start, end = 0, max_chapters
+            message = f"Limiting to {max_chapters} chapters (out of {total_chapters} available)"
+        else:
+            return index
+        
+        if self.progress_reporter:
+            self.progress_reporter.print(message)
+        return index.select(start, end)
+    
+    def _report_result(self, result: Dict[str, Any]) -> None:
+        """Report the adapter's result"""
+        if self.progress_reporter:
+            if result.get("status") == "success":
+                self.progress_reporter.print("Novel scraping completed successfully!")
+                
+                # Show output location
+                if "file_path" in result:
+                    self.progress_reporter.print(f"Saved to: {result['file_path']}")
+                elif "folder_path" in result:
+                    self.progress_reporter.print(f"Saved to: {result['folder_path']}")
+            else:
+                self.progress_reporter.print(f"Processing failed: {result.get('error', 'Unknown error')}")
+
+    def _finish_journal(self, result: Dict[str, Any]) -> None:
+        """Report what the journal saved, and delete it once the run has succeeded with every chapter"""
+        if self.journal is None:
+            return
+        if self.progress_reporter and self.journal.resumed:
+            self.progress_reporter.print(f"Resumed {self.journal.resumed} chapters from the journal")
+        if result.get("status") == "success" and not self.failed_chapters:
+            self.journal.discard()
+        elif self.progress_reporter:
+            if self.failed_chapters:
+                self.progress_reporter.print(f"{self.failed_chapters} chapters could not be downloaded")
+            self.progress_reporter.print(f"Downloaded chapters are kept in {self.journal.path} for a resumed run")
+    
+    def _report_memo(self, memo: PageMemo) -> None:
+        """Report how many requests the run's page memo saved"""
+        if self.progress_reporter and memo.saved:
+            self.progress_reporter.print(
+                f"Page memo saved {memo.saved} of {memo.requests} requests "
+                f"({memo.memo_hits} repeated, {memo.coalesced} coalesced while in flight)"
+            )
 
 class AudioNovelScraperCoordinator(NovelScraperCoordinator):
     """Coordinator specifically for audio novels"""
@@ -263,7 +414,13 @@ class AudioNovelScraperCoordinator(NovelScraperCoordinator):
                  adapter: Adapter,
                  progress_reporter: Optional[ProgressReporter] = None,
                  max_threads: int = 6,
-                 delay_between_requests: float = 1.0):
+                 delay_between_requests: Optional[float] = None,
+                 pooled_connections: bool = True,
+                 rate: Optional[float] = None,
+                 burst: int = 1,
+                 http2_hosts: Optional[Iterable[str]] = None,
+                 text_pipeline: Optional[TextPipeline] = None,
+                 journal: Optional[CheckpointJournal] = None):
         """
         Initialize the audio novel coordinator.
         
@@ -272,6 +429,15 @@ class AudioNovelScraperCoordinator(NovelScraperCoordinator):
             adapter: The adapter for processing/saving the scraped data
             progress_reporter: Optional progress reporter
             max_threads: Maximum number of threads for parallel operations
-            delay_between_requests: Delay between requests to avoid overloading servers
+            delay_between_requests: Deprecated, use rate
+            pooled_connections: Reuse kept-alive connections (one pool of max_threads per host)
+            rate: Maximum requests per second per host, None for no limit
+            burst: Number of requests per host that may be sent back to back
+            http2_hosts: Hosts fetched over one multiplexed HTTP/2 connection
+                instead of the HTTP/1.1 pool (needs httpx[http2])
+            text_pipeline: Optional stages (normalization, ...) run on each chapter's
+                content before it reaches the adapter
+            journal: Optional journal that records each downloaded chapter and serves
+                the chapters of an interrupted run; deleted once a run gets every chapter
         """
-        super().__init__(scraper, adapter, progress_reporter, max_threads, delay_between_requests)
\ No newline at end of file
+        super().__init__(scraper, adapter, progress_reporter, max_threads, delay_between_requests, pooled_connections, rate, burst, http2_hosts, text_pipeline, journal)
\ No newline at end of file
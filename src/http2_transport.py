@@ -0,0 +1,176 @@
+"""
+Optional HTTP/2 backend for hosts that support it.
+
+Over HTTP/2 every request to a host is a stream on one shared connection, so
+a coordinator fetching many chapters at once opens a single connection
+instead of one per worker, and a slow chapter does not hold up the requests
+queued behind it. The backend is chosen per host by the transports and
+needs httpx with its http2 extra (h2); without them those hosts fall back to
+the pooled HTTP/1.1 transport.
+"""
+
+import logging
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+try:
+    import httpx
+    import h2  # noqa: F401 - httpx needs it for http2=True
+except ImportError:
+    httpx = None
+
+logger = logging.getLogger("scrape_util")
+
+# Hosts known to serve HTTP/2, used by the CLI's --http2 when no hosts are named
+HTTP2_HOSTS = frozenset({"ncode.syosetu.com", "www.ximalaya.com"})
+
+if httpx is not None:
+    HTTP2_RETRY_EXCEPTIONS: Tuple[type, ...] = (
+        httpx.TimeoutException,
+        httpx.NetworkError,
+        httpx.RemoteProtocolError,
+    )
+else:
+    HTTP2_RETRY_EXCEPTIONS = ()
+
+
+def http2_available() -> bool:
+    """Whether httpx and h2 are installed"""
+    return httpx is not None
+
+
+def _request_headers(headers: Dict[str, str], cookies: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """Send cookies as a header; per-request cookies are deprecated in httpx"""
+    if not cookies:
+        return headers
+    headers = dict(headers)
+    headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in cookies.items())
+    return headers
+
+
+class _RawStream:
+    """
+    Lets a streamed httpx response stand in for urllib3's raw response, so the
+    requests.Response built from it is consumed exactly like an HTTP/1.1 one.
+    """
+
+    def __init__(self, response):
+        self._response = response
+
+    def stream(self, chunk_size: int, decode_content: bool = False) -> Iterator[bytes]:
+        if decode_content:
+            return self._response.iter_bytes(chunk_size)
+        return self._response.iter_raw(chunk_size)
+
+    def read(self, chunk_size: int = -1) -> bytes:
+        return self._response.read()
+
+    def close(self) -> None:
+        self._response.close()
+
+    def release_conn(self) -> None:
+        # Closing a stream frees its slot on the shared connection
+        self._response.close()
+
+
+class Http2Backend:
+    """Multiplexes requests to each host over a single HTTP/2 connection"""
+
+    def __init__(self, max_streams: int = 100):
+        """
+        Initialize the backend.
+
+        Args:
+            max_streams: Maximum number of requests in flight per host; they
+                share one connection as long as the server allows that many
+                concurrent streams
+        """
+        if httpx is None:
+            raise ImportError("HTTP/2 support needs httpx with the http2 extra: pip install 'httpx[http2]'")
+        self.max_streams = max(1, max_streams)
+        self._client = httpx.Client(http2=True, limits=self._limits(), follow_redirects=True)
+
+    def _limits(self):
+        return httpx.Limits(max_connections=self.max_streams, max_keepalive_connections=self.max_streams)
+
+    def open(self,
+             method: str,
+             url: str,
+             headers: Dict[str, str],
+             cookies: Optional[Dict[str, str]] = None,
+             timeout: Optional[float] = None,
+             **kwargs: Any) -> requests.Response:
+        """
+        Send a request and return a requests.Response whose body is still unread.
+
+        The response's raw attribute streams the body from the HTTP/2
+        connection, so HttpTransport.iter_body decodes it like any other.
+        """
+        request = self._client.build_request(method, url, headers=_request_headers(headers, cookies),
+                                             timeout=timeout, **kwargs)
+        http2_response = self._client.send(request, stream=True)
+
+        response = requests.Response()
+        response.status_code = http2_response.status_code
+        response.headers = CaseInsensitiveDict(http2_response.headers.items())
+        response.url = str(http2_response.url)
+        response.reason = http2_response.reason_phrase
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = _RawStream(http2_response)
+        return response
+
+    def make_async_client(self):
+        """Create an async client with the same limits, inside the running event loop"""
+        return httpx.AsyncClient(http2=True, limits=self._limits(), follow_redirects=True)
+
+    @staticmethod
+    async def request_async(client,
+                            method: str,
+                            url: str,
+                            headers: Dict[str, str],
+                            cookies: Optional[Dict[str, str]] = None,
+                            timeout: Optional[float] = None,
+                            read_body=None,
+                            **kwargs: Any):
+        """
+        Send a request with an async client from make_async_client.
+
+        Args:
+            read_body: Coroutine function called with (raw chunk iterator,
+                Content-Encoding) that returns the decoded body
+
+        Returns:
+            Tuple of (status, headers, body)
+        """
+        request = client.build_request(method, url, headers=_request_headers(headers, cookies),
+                                       timeout=timeout, **kwargs)
+        response = await client.send(request, stream=True)
+        try:
+            body = await read_body(response.aiter_raw(), response.headers.get("Content-Encoding"))
+        finally:
+            await response.aclose()
+        return response.status_code, CaseInsensitiveDict(response.headers.items()), body
+
+    def close(self) -> None:
+        """Close the shared connections"""
+        self._client.close()
+
+
+def resolve_http2_hosts(hosts: Optional[Iterable[str]]) -> frozenset:
+    """
+    Return the hosts that will actually use HTTP/2.
+
+    Args:
+        hosts: Requested hosts, None or empty to disable HTTP/2
+
+    Returns:
+        The hosts, or an empty set if httpx/h2 are missing
+    """
+    hosts = frozenset(hosts or ())
+    if hosts and httpx is None:
+        logger.warning("httpx[http2] is not installed, using HTTP/1.1 for " + ", ".join(sorted(hosts)))
+        return frozenset()
+    return hosts
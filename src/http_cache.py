@@ -0,0 +1,259 @@
+"""
+Persistent on-disk HTTP cache for GET requests.
+
+Entries are content-addressed by URL and the request's vary headers (and
+cookies), and stored with their ETag/Last-Modified validators. Inside the
+TTL an entry is served without touching the network; after it, the entry is
+revalidated with If-None-Match/If-Modified-Since so an unchanged page costs a
+304 instead of a full download. The cache is bounded in size and evicts the
+least recently used entries first.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Iterable, Optional, Tuple
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Headers that describe the transfer rather than the content; the stored body is already decoded
+_UNCACHED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive", "set-cookie"}
+
+
+class CacheEntry:
+    """A cached response: metadata plus the path of its body on disk"""
+
+    def __init__(self, key: str, meta: Dict[str, Any], body_path: str):
+        self.key = key
+        self.meta = meta
+        self.body_path = body_path
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.meta["headers"].get("ETag") or self.meta["headers"].get("etag")
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.meta["headers"].get("Last-Modified") or self.meta["headers"].get("last-modified")
+
+    def is_fresh(self, ttl: Optional[float]) -> bool:
+        """Whether the entry may be served without revalidation"""
+        return ttl is not None and time.time() - self.meta["stored_at"] < ttl
+
+    def read_body(self) -> bytes:
+        with open(self.body_path, "rb") as file:
+            return file.read()
+
+    def to_response(self) -> requests.Response:
+        """Rebuild a requests.Response from the entry"""
+        response = requests.Response()
+        response.status_code = self.meta["status"]
+        response.headers = CaseInsensitiveDict(self.meta["headers"])
+        response.url = self.meta["url"]
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = self.read_body()
+        response.from_cache = True
+        return response
+
+
+class HttpCache:
+    """Size-bounded LRU cache of GET responses on disk"""
+
+    def __init__(self,
+                 directory: str,
+                 max_bytes: int = 512 * 1024 * 1024,
+                 ttl: Optional[float] = None,
+                 vary_headers: Iterable[str] = ("Accept", "Accept-Language")):
+        """
+        Initialize the cache.
+
+        Args:
+            directory: Directory holding the cache, created if needed
+            max_bytes: Total body size kept before least recently used entries are evicted
+            ttl: Seconds during which an entry is served without revalidation;
+                None always revalidates
+            vary_headers: Request headers that are part of the cache key
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.vary_headers = tuple(h.lower() for h in vary_headers)
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> (last access time, body size), the LRU order is rebuilt from body mtimes on start
+        self._index: Dict[str, Tuple[float, int]] = {}
+        self._total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".body"):
+                    stat = os.stat(os.path.join(root, name))
+                    self._index[name[:-5]] = (stat.st_mtime, stat.st_size)
+                    self._total_bytes += stat.st_size
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        folder = os.path.join(self.directory, key[:2])
+        return os.path.join(folder, f"{key}.json"), os.path.join(folder, f"{key}.body")
+
+    def key_for(self,
+                url: str,
+                headers: Optional[Dict[str, str]] = None,
+                cookies: Optional[Dict[str, str]] = None) -> str:
+        """Return the cache key for a request"""
+        parts = [url]
+        lowered = {k.lower(): v for k, v in (headers or {}).items()}
+        for name in self.vary_headers:
+            parts.append(f"{name}:{lowered.get(name, '')}")
+        if cookies:
+            parts.append("cookies:" + "&".join(f"{k}={v}" for k, v in sorted(cookies.items())))
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def lookup(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for a key, or None"""
+        meta_path, body_path = self._paths(key)
+        if key not in self._index:
+            return None
+        try:
+            with open(meta_path, encoding="utf-8") as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            self._remove(key)
+            return None
+        if not os.path.exists(body_path):
+            self._remove(key)
+            return None
+        self._touch(key)
+        return CacheEntry(key, meta, body_path)
+
+    def conditional_headers(self, entry: CacheEntry, headers: Optional[Dict[str, str]]) -> Dict[str, str]:
+        """Return the request headers extended with the entry's validators"""
+        headers = dict(headers or {})
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def store(self, key: str, url: str, status: int, headers: Dict[str, str], body: bytes) -> None:
+        """Store a response body with its metadata, evicting old entries if needed"""
+        meta_path, body_path = self._paths(key)
+        meta = {
+            "url": url,
+            "status": status,
+            "headers": {k: v for k, v in headers.items() if k.lower() not in _UNCACHED_HEADERS},
+            "stored_at": time.time(),
+            "size": len(body),
+        }
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        # Write to temporary files first so a crash never leaves a torn entry behind
+        suffix = f".{threading.get_ident()}.tmp"
+        with open(body_path + suffix, "wb") as file:
+            file.write(body)
+        with open(meta_path + suffix, "w", encoding="utf-8") as file:
+            json.dump(meta, file)
+        os.replace(body_path + suffix, body_path)
+        os.replace(meta_path + suffix, meta_path)
+        with self._lock:
+            previous = self._index.get(key)
+            if previous:
+                self._total_bytes -= previous[1]
+            self._index[key] = (time.time(), len(body))
+            self._total_bytes += len(body)
+        self._evict()
+
+    def refresh(self, entry: CacheEntry) -> None:
+        """Mark an entry as freshly validated after a 304"""
+        meta_path, _ = self._paths(entry.key)
+        entry.meta["stored_at"] = time.time()
+        suffix = f".{threading.get_ident()}.tmp"
+        with open(meta_path + suffix, "w", encoding="utf-8") as file:
+            json.dump(entry.meta, file)
+        os.replace(meta_path + suffix, meta_path)
+
+    def _touch(self, key: str) -> None:
+        now = time.time()
+        with self._lock:
+            if key in self._index:
+                self._index[key] = (now, self._index[key][1])
+        try:
+            os.utime(self._paths(key)[1], (now, now))
+        except OSError:
+            pass
+
+    def _remove(self, key: str) -> None:
+        with self._lock:
+            entry = self._index.pop(key, None)
+            if entry:
+                self._total_bytes -= entry[1]
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        with self._lock:
+            if self._total_bytes <= self.max_bytes:
+                return
+            by_age = sorted(self._index.items(), key=lambda item: item[1][0])
+            excess = self._total_bytes - self.max_bytes
+            victims = []
+            for key, (_, size) in by_age:
+                if excess <= 0:
+                    break
+                victims.append(key)
+                excess -= size
+        for key in victims:
+            self._remove(key)
+
+    def count(self, counter: str) -> None:
+        """Increment one of the hits/revalidated/misses counters"""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/revalidation/miss counters and the current size"""
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "entries": len(self._index),
+            "bytes": self._total_bytes,
+        }
+
+
+_cache: Optional[HttpCache] = None
+
+
+def get_cache() -> Optional[HttpCache]:
+    """Return the process-wide cache, or None if caching is disabled"""
+    return _cache
+
+
+def configure_cache(directory: Optional[str],
+                    max_bytes: int = 512 * 1024 * 1024,
+                    ttl: Optional[float] = None) -> Optional[HttpCache]:
+    """
+    Enable the process-wide cache, or disable it with directory=None.
+
+    Args:
+        directory: Cache directory
+        max_bytes: Size bound for the LRU eviction
+        ttl: Seconds an entry is served without revalidation
+
+    Returns:
+        The new cache, or None
+    """
+    global _cache
+    _cache = HttpCache(directory, max_bytes=max_bytes, ttl=ttl) if directory else None
+    return _cache
@@ -1,9 +1,23 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any, Optional, Protocol, runtime_checkable
+import asyncio
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Protocol, Set, runtime_checkable
 
 class Scraper(ABC):
     """Base interface for all scrapers"""
     
+    # Charset the site serves when neither the Content-Type header nor the page
+    # declares one; pass it to scrape_util.scrape_url(..., encoding=self.encoding)
+    encoding: Optional[str] = None
+    
+    # Subtrees of chapter pages the scraper reads (a parse_filter.ParseOnly);
+    # pass it to scrape_util.scrape_url to skip building the rest of the soup
+    parse_only = None
+    
+    # Watermarks and promo strings the site injects into chapter text, removed by
+    # text_pipeline.BoilerplateStripper; the whole line goes for boilerplate_lines
+    boilerplate: tuple = ()
+    boilerplate_lines: tuple = ()
+    
     def __init__(self, **kwargs):
         """Initialize with optional authentication cookies"""
         self.authentication_cookies = kwargs.get("authentication_cookies", {})
@@ -96,6 +110,23 @@ class NovelScraper(Scraper):
         chapter_urls = self.get_chapter_list(url)
         return [{"type": "chapter", "url": url, "title": ""} for url in chapter_urls]
     
+    def iter_index_structure(self, url: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the items of get_index_structure as they become available.
+        
+        Scrapers that parse their index pages while they download (through
+        scrape_util.iter_parse) override this and build get_index_structure
+        from it, so the coordinator can start on the first chapters before
+        the whole index has arrived.
+        
+        Args:
+            url: Main novel URL
+            
+        Returns:
+            Iterator of the same dictionaries get_index_structure returns
+        """
+        yield from self.get_index_structure(url)
+    
     @abstractmethod
     def get_chapter_content(self, chapter_url: str) -> Dict[str, Any]:
         """
@@ -109,6 +140,34 @@ class NovelScraper(Scraper):
         """
         pass
 
+    async def get_novel_info_async(self, url: str) -> Dict[str, Any]:
+        """
+        Async variant of get_novel_info.
+        
+        Falls back to running the sync method in a worker thread; scrapers
+        may override it with a native implementation.
+        """
+        return await asyncio.to_thread(self.get_novel_info, url)
+    
+    async def get_index_structure_async(self, url: str) -> List[Dict[str, Any]]:
+        """
+        Async variant of get_index_structure.
+        
+        Falls back to running the sync method in a worker thread; scrapers
+        may override it with a native implementation.
+        """
+        return await asyncio.to_thread(self.get_index_structure, url)
+    
+    async def get_chapter_content_async(self, chapter_url: str) -> Dict[str, Any]:
+        """
+        Async variant of get_chapter_content.
+        
+        Falls back to running the sync method in a worker thread; scrapers
+        may override it with a native implementation built on
+        scrape_util.scrape_url_async.
+        """
+        return await asyncio.to_thread(self.get_chapter_content, chapter_url)
+
 class AudioNovelScraper(NovelScraper):
     """Interface for audio novel scrapers"""
     
@@ -150,6 +209,41 @@ class Adapter(ABC):
             Dictionary with processing results
         """
         pass
+    
+    def process_novel_stream(self, novel_info: Dict[str, Any], chapters: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Process a novel whose chapters arrive one by one, in order.
+        
+        The coordinator calls this with its iter_chapters iterator. Adapters
+        that can write each chapter as it comes override it; by default the
+        chapters are collected and passed to process_novel.
+        
+        Args:
+            novel_info: Dictionary containing novel metadata
+            chapters: Iterable of dictionaries containing chapter data
+            
+        Returns:
+            Dictionary with processing results
+        """
+        return self.process_novel(novel_info, list(chapters))
+    
+    def saved_chapter_urls(self, novel_info: Dict[str, Any]) -> Set[str]:
+        """
+        URLs of the chapters a previous run saved to this adapter's output.
+        
+        The coordinator does not download these again: it passes them to the
+        adapter as their index items with "saved": True and no content, and
+        the adapter takes them from its previous output. Adapters that can
+        update their output in place override it; by default nothing is
+        kept and every chapter is downloaded.
+        
+        Args:
+            novel_info: Dictionary containing novel metadata
+            
+        Returns:
+            Set of chapter URLs
+        """
+        return set()
 
 class ProgressReporter(ABC):
     """Interface for reporting progress"""
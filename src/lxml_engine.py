@@ -0,0 +1,168 @@
+"""
+lxml-native extraction engine.
+
+Building a BeautifulSoup tree costs several times more than extracting a
+chapter from it. Scrapers that opt in parse pages with lxml.html instead
+(scrape_util.scrape_tree) and query them through an LxmlEngine, which
+compiles each CSS or XPath selector once and reuses it for every page.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from lxml import etree, html
+
+try:
+    from cssselect import HTMLTranslator
+except ImportError:
+    HTMLTranslator = None
+
+if HTMLTranslator is not None:
+    class _MatchTranslator(HTMLTranslator):
+        """
+        Translates CSS into a test on the element itself.
+
+        cssselect turns "A B" into a path down from A, which only finds B
+        when evaluated from above. Here combinators become conditions on B
+        looking back at its ancestors and siblings, so "self::" works.
+        """
+
+        def xpath(self, parsed_selector):
+            expr = super().xpath(parsed_selector)
+            if expr.path == "*/":
+                # The star prefix only scopes searches to one parent
+                expr.path = ""
+            return expr
+
+        def xpath_descendant_combinator(self, left, right):
+            return right.add_condition(f"ancestor::{left}")
+
+        def xpath_child_combinator(self, left, right):
+            return right.add_condition(f"parent::{left}")
+
+        def xpath_direct_adjacent_combinator(self, left, right):
+            return right.add_condition(f"preceding-sibling::*[1]/self::{left}")
+
+        def xpath_indirect_adjacent_combinator(self, left, right):
+            return right.add_condition(f"preceding-sibling::{left}")
+
+# Tags html_to_text turns into a line break, here and in scrape_util.html_to_text
+BREAK_TAGS = frozenset(["br", "p", "h1", "h2", "h3", "h4", "tr", "th"])
+
+# Tags whose text BeautifulSoup's .text leaves out
+_HIDDEN_TAGS = frozenset(["script", "style", "template"])
+
+
+def parse_html(text: str) -> html.HtmlElement:
+    """Parse a decoded page into an lxml.html document"""
+    try:
+        return html.document_fromstring(text)
+    except ValueError:
+        # lxml refuses str input that starts with an XML encoding declaration
+        return html.document_fromstring(text.split("?>", 1)[-1])
+
+
+def is_lxml_element(elem) -> bool:
+    return isinstance(elem, etree._Element)
+
+
+def element_text(elem) -> str:
+    """All text below an element, like BeautifulSoup's .text (which skips comments, scripts and styles)"""
+    parts = []
+    _collect_visible_text(elem, parts)
+    return "".join(parts)
+
+
+def _collect_visible_text(elem, parts: List[str]) -> None:
+    if elem.text:
+        parts.append(elem.text)
+    for child in elem:
+        if isinstance(child.tag, str) and child.tag not in _HIDDEN_TAGS:
+            _collect_visible_text(child, parts)
+        if child.tail:
+            parts.append(child.tail)
+
+
+def html_to_text(elem) -> str:
+    """Same output as scrape_util.html_to_text for an lxml element"""
+    parts = []
+    _collect_text(elem, parts)
+    return "".join(parts)
+
+
+def _collect_text(elem, parts: List[str]) -> None:
+    # Comments are children too: BeautifulSoup counts their text, so do we
+    if elem.text:
+        parts.append(elem.text.strip())
+    for child in elem:
+        if child.tag in BREAK_TAGS:
+            parts.append("\n")
+        elif child.tag == "li":
+            parts.append("\n- ")
+        _collect_text(child, parts)
+        if child.tail:
+            parts.append(child.tail.strip())
+
+
+class LxmlEngine:
+    """
+    Cache of compiled selectors, meant to be shared by all instances of a scraper.
+
+    Selectors starting with "/", "./" or "(" are XPath, anything else is CSS.
+    Compiled selectors are kept per thread, since lxml's XPath evaluators must
+    not be used from several threads at once.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def compile(self, selector: str, prefix: str = "descendant-or-self::") -> etree.XPath:
+        """
+        Return the compiled form of a selector, compiling it on first use in this thread.
+
+        Args:
+            selector: CSS or XPath selector
+            prefix: Axis a CSS selector is evaluated on; "self::" tests the element itself,
+                combinators included
+        """
+        compiled: Dict[tuple, etree.XPath] = getattr(self._local, "compiled", None)
+        if compiled is None:
+            compiled = self._local.compiled = {}
+        xpath = compiled.get((selector, prefix))
+        if xpath is None:
+            if self.is_xpath(selector):
+                xpath = etree.XPath(selector)
+            elif HTMLTranslator is None:
+                raise ImportError("CSS selectors need the cssselect package: pip install cssselect")
+            else:
+                translator = _MatchTranslator() if prefix == "self::" else HTMLTranslator()
+                xpath = etree.XPath(translator.css_to_xpath(selector, prefix=prefix))
+            compiled[(selector, prefix)] = xpath
+        return xpath
+
+    @staticmethod
+    def is_xpath(selector: str) -> bool:
+        return selector.startswith(("/", "./", "("))
+
+    def select(self, tree, selector: str) -> List[etree._Element]:
+        """Return every element matching the selector"""
+        return self.compile(selector)(tree)
+
+    def select_one(self, tree, selector: str) -> Optional[etree._Element]:
+        """Return the first element matching the selector, or None"""
+        matches = self.compile(selector)(tree)
+        return matches[0] if matches else None
+
+    def matches(self, element, selector: str) -> bool:
+        """Whether the element itself matches the selector"""
+        if self.is_xpath(selector):
+            return element in self.select(element.getroottree().getroot(), selector)
+        return bool(self.compile(selector, prefix="self::")(element))
+
+    def select_first(self, tree, selectors: Iterable[str]) -> Optional[etree._Element]:
+        """Return the first match of the first selector that matches anything, or None"""
+        for selector in selectors:
+            match = self.select_one(tree, selector)
+            if match is not None:
+                return match
+        return None
@@ -0,0 +1,107 @@
+"""
+Compact index of a novel's structure, for selecting and merging chapters by position.
+
+get_index_structure returns a flat list of volume, part and chapter items.
+NovelIndex keeps that list as it is and adds two integer arrays: where
+each chapter sits in it, and where the part heading each chapter sits.
+Chapters are then addressed by their number (0-based position among the
+chapters) rather than their URL, so a range is a slice, a chapter's part
+is one lookup, and two chapters that share a URL stay two chapters.
+Selecting and merging are single passes over the selected items, which
+keeps a 10,000-chapter index cheap to cut down.
+"""
+
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+
+class NovelIndex:
+    """A novel's structure items with positional chapter numbers and part boundaries"""
+
+    __slots__ = ("items", "_chapters", "_parts")
+
+    def __init__(self, structure: Iterable[Dict[str, Any]]):
+        """
+        Load a structure.
+
+        Args:
+            structure: Volume, part and chapter items, in order, as get_index_structure returns them
+        """
+        self.items: List[Dict[str, Any]] = list(structure)
+        # Position in items of each chapter, and of the part heading it (-1 for none)
+        self._chapters = array("q")
+        self._parts = array("q")
+        part = -1
+        for position, item in enumerate(self.items):
+            if item["type"] == "chapter":
+                self._chapters.append(position)
+                self._parts.append(part)
+            elif item["type"] in ("volume", "part"):
+                part = position
+
+    def __len__(self) -> int:
+        """Number of chapters"""
+        return len(self._chapters)
+
+    def chapter(self, number: int) -> Dict[str, Any]:
+        """Item of chapter number"""
+        return self.items[self._chapters[number]]
+
+    def chapter_urls(self) -> List[str]:
+        """URLs of the chapters, by number"""
+        items = self.items
+        return [items[position]["url"] for position in self._chapters]
+
+    def part_of(self, number: int) -> Optional[Dict[str, Any]]:
+        """Volume or part item heading chapter number, None if it has none"""
+        part = self._parts[number]
+        return self.items[part] if part >= 0 else None
+
+    def part_count(self) -> int:
+        """Number of volume and part items"""
+        return sum(1 for item in self.items if item["type"] in ("volume", "part"))
+
+    def select(self, start: int, end: int) -> "NovelIndex":
+        """
+        Index of chapters start to end (end excluded), each part heading them
+        placed once before its first selected chapter.
+
+        Args:
+            start: Number of the first chapter kept
+            end: Number of the chapter after the last one kept
+
+        Returns:
+            New index sharing the item dicts
+        """
+        items = self.items
+        selected = []
+        last_part = -1
+        for number in range(max(0, start), min(end, len(self._chapters))):
+            part = self._parts[number]
+            if part != last_part and part >= 0:
+                selected.append(items[part])
+                last_part = part
+            selected.append(items[self._chapters[number]])
+        return NovelIndex(selected)
+
+    def merge(self, contents: Sequence[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Structure items with each chapter's content merged in, by chapter number.
+
+        Args:
+            contents: Content dict of each chapter, None for the chapters to leave out
+
+        Returns:
+            List of items; parts are kept as they are
+        """
+        merged = []
+        number = 0
+        for item in self.items:
+            if item["type"] == "chapter":
+                content = contents[number]
+                number += 1
+                if content is not None:
+                    merged.append({**item, **content})
+            else:
+                merged.append(item)
+        return merged
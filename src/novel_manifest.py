@@ -0,0 +1,62 @@
+"""
+Manifest of a saved novel, for updating its output with new chapters only.
+
+Adapters write a manifest next to their output listing the chapters they
+saved, in order, with what they need to find each one again: the text
+adapter the byte span of the chapter in its file, the audio adapter the
+file name. An update run compares the novel's index with the manifest,
+downloads only the chapters it does not list, and the adapter takes the
+others from the previous output instead of the site, so refreshing an
+ongoing serial costs one request per new chapter plus the index.
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+# Bumped when entries change meaning; older manifests are then ignored
+MANIFEST_VERSION = 1
+
+
+class NovelManifest:
+    """Chapters saved to an output by URL, with fields of the output as a whole"""
+
+    def __init__(self, chapters: Optional[List[Dict[str, Any]]] = None, **fields: Any):
+        """
+        Initialize the manifest.
+
+        Args:
+            chapters: Entries of the saved chapters, in order, each with a "url"
+            **fields: Adapter-specific fields of the whole output (size, ...)
+        """
+        self.chapters: Dict[str, Dict[str, Any]] = {entry["url"]: entry for entry in chapters or ()}
+        self.fields = fields
+
+    def __len__(self) -> int:
+        return len(self.chapters)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.chapters
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        """Add or replace the entry of a chapter"""
+        self.chapters[entry["url"]] = entry
+
+    @classmethod
+    def load(cls, path: str) -> Optional["NovelManifest"]:
+        """Read a manifest, None if there is none or it cannot be used"""
+        try:
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.pop("version", None) != MANIFEST_VERSION:
+            return None
+        return cls(data.pop("chapters", []), **data)
+
+    def save(self, path: str) -> None:
+        """Write the manifest, replacing the previous one atomically"""
+        data = {"version": MANIFEST_VERSION, **self.fields, "chapters": list(self.chapters.values())}
+        with open(path + ".tmp", "w", encoding="utf-8") as file:
+            json.dump(data, file, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
@@ -10,7 +10,7 @@ import argparse
 import sys
 import os
 import logging
-from typing import Dict, Any
+from typing import Any, List, Optional
 
 # Set up logging
 logging.basicConfig(
@@ -27,9 +27,16 @@ from scrapers import get_scraper, SCRAPERS
 from adapters import get_adapter, ADAPTERS
 from components.progress_reporter import ConsoleProgressReporter
 from coordinator import NovelScraperCoordinator, AudioNovelScraperCoordinator
+from async_coordinator import AsyncNovelScraperCoordinator
+from http2_transport import HTTP2_HOSTS
+from scrape_util import scrape_util, RetryPolicy
+from text_pipeline import TextPipeline, Normalizer, BoilerplateStripper
+from chinese_converter import ChineseConverter
+from checkpoint_journal import CheckpointJournal, DEFAULT_JOURNAL_DIR, journal_path
+from rate_limiter import limits_from_delay
 
-def parse_args():
-    """Parse command line arguments"""
+def parse_args(argv: Optional[List[str]] = None):
+    """Parse command line arguments, sys.argv's by default"""
     parser = argparse.ArgumentParser(
         description="Novel Scraper CLI - Download novels from various websites"
     )
@@ -90,15 +97,153 @@ def parse_args():
         help="Maximum number of threads to use (default: 6)"
     )
     
-    # Delay between requests
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=0,
+        help="Parse chapter pages in this many processes instead of the fetching threads (default: 0, no processes)"
+    )
+    
+    # Request rate per host
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=5.0,
+        help="Maximum requests per second per host, 0 for no limit (default: 5.0)"
+    )
+    
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=1,
+        help="Number of requests per host that may be sent back to back (default: 1)"
+    )
+    
+    # Retry policy
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=5,
+        help="Attempts per request before giving up (default: 5)"
+    )
+    
+    parser.add_argument(
+        "--max-backoff",
+        type=float,
+        default=60.0,
+        help="Upper bound in seconds for the exponential backoff between attempts (default: 60)"
+    )
+    
+    # On-disk HTTP cache
+    parser.add_argument(
+        "--cache-dir",
+        help="Cache fetched pages in this directory and revalidate them on later runs"
+    )
+    
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=512,
+        help="Maximum cache size in MB, least recently used pages are evicted first (default: 512)"
+    )
+    
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        help="Serve cached pages younger than this many seconds without contacting the site"
+    )
+    
+    # Checkpoint journal
+    parser.add_argument(
+        "--journal-dir",
+        help="Journal every downloaded chapter in this directory, so an interrupted run can be resumed; "
+             "the journal is deleted once a run gets every chapter (default with --resume: "
+             f"{DEFAULT_JOURNAL_DIR}; without either option no journal is kept)"
+    )
+    
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Journal the run, and take the chapters already in the novel's journal from an interrupted "
+             "run instead of downloading them again; the text options apply to them as well"
+    )
+    
+    # Incremental update of an earlier output
+    parser.add_argument(
+        "--update",
+        action="store_true",
+        help="Only download the chapters that are not in the output yet, per the manifest saved next "
+             "to it by the previous run, and add them (rewriting the text file's TOC); "
+             "not with --max-chapters, --range or --interactive"
+    )
+    
+    # Deprecated delay between requests
     parser.add_argument(
         "--delay", "-d",
         type=float,
-        default=1.0,
-        help="Delay between requests in seconds (default: 1.0)"
+        help="Deprecated, use --rate. Converted to a rate of threads/delay requests per second with bursts of threads"
     )
     
-    return parser.parse_args()
+    # Connection pooling
+    parser.add_argument(
+        "--no-pool",
+        action="store_true",
+        help="Open a new connection for every request instead of reusing pooled ones (for comparison)"
+    )
+    
+    parser.add_argument(
+        "--http2",
+        nargs="*",
+        metavar="HOST",
+        help="Multiplex requests to these hosts over one HTTP/2 connection each; "
+             "without hosts, use the sites known to support it (needs httpx[http2])"
+    )
+    
+    # Text post-processing
+    parser.add_argument(
+        "--normalize",
+        action="store_true",
+        help="Normalize chapter text: fold full-width letters and digits, remove zero-width "
+             "characters, unify newlines and collapse repeated spaces and blank lines"
+    )
+    
+    parser.add_argument(
+        "--strip-boilerplate",
+        action="store_true",
+        help="Remove the watermarks and promo lines the scraper declares for its site from chapter text"
+    )
+    
+    parser.add_argument(
+        "--traditional",
+        nargs="?",
+        const="",
+        metavar="DICTIONARY_DIR",
+        help="Convert chapter text from simplified to traditional Chinese with OpenCC's STCharacters.txt "
+             "and STPhrases.txt from DICTIONARY_DIR, by default those of opencc-python-reimplemented"
+    )
+    
+    # Asyncio engine
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Scrape chapters on an asyncio event loop instead of worker threads"
+    )
+    
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=64,
+        help="Maximum number of chapters in flight with --async (default: 64)"
+    )
+    
+    args = parser.parse_args(argv)
+    # The output is rewritten with the selected chapters, so a selection would
+    # drop the saved chapters outside it
+    if args.update and (args.max_chapters is not None or args.range or args.interactive):
+        parser.error("--update keeps every saved chapter and cannot be combined with "
+                     "--max-chapters, --range or --interactive")
+    return args
 
 def create_adapter(adapter_name: str, args: argparse.Namespace) -> Any:
     """Create and configure an adapter based on CLI arguments"""
@@ -109,7 +254,7 @@ def create_adapter(adapter_name: str, args: argparse.Namespace) -> Any:
         sys.exit(1)
     
     # Configure adapter based on type
-    config = {}
+    config = {"update": args.update}
     
     if adapter_name == "text_file":
         if args.output:
@@ -127,6 +272,26 @@ def create_adapter(adapter_name: str, args: argparse.Namespace) -> Any:
     
     return adapter_class(config)
 
+def create_text_pipeline(args: argparse.Namespace, scraper: Any) -> Optional[TextPipeline]:
+    """Build the text stages selected on the command line, None if there are none"""
+    stages = []
+    # Patterns are matched on the text as the site serves it, before normalization
+    if args.strip_boilerplate:
+        stages.append(BoilerplateStripper.for_scraper(scraper))
+    if args.normalize:
+        stages.append(Normalizer())
+    if args.traditional is not None:
+        stages.append(ChineseConverter(args.traditional or None))
+    return TextPipeline(*stages) if stages else None
+
+def create_journal(args: argparse.Namespace) -> Optional[CheckpointJournal]:
+    """Open the novel's checkpoint journal with --resume or --journal-dir, None otherwise"""
+    if not args.resume and not args.journal_dir:
+        return None
+    # Without --resume an old journal is started over
+    directory = args.journal_dir or DEFAULT_JOURNAL_DIR
+    return CheckpointJournal(journal_path(directory, args.url), resume=args.resume)
+
 def main():
     """Main entry point"""
     args = parse_args()
@@ -144,6 +309,9 @@ def main():
         # Create adapter instance
         adapter = create_adapter(args.adapter, args)
         
+        # Create text post-processing stages
+        text_pipeline = create_text_pipeline(args, scraper)
+        
         # Create progress reporter
         progress_reporter = ConsoleProgressReporter()
         
@@ -156,6 +324,30 @@ def main():
                 return choice if choice else "all"
             range_callback = interactive_range_callback
         
+        # Bound retries for every request made during the run
+        scrape_util.configure_retries(RetryPolicy(max_attempts=args.max_attempts, max_delay=args.max_backoff))
+        
+        if args.parse_workers:
+            scrape_util.configure_parse_pool(args.parse_workers)
+        
+        if args.cache_dir:
+            scrape_util.configure_cache(args.cache_dir, max_bytes=args.cache_size * 1024 * 1024, ttl=args.cache_ttl)
+        
+        # Convert the deprecated --delay to the rate it used to allow
+        rate, burst = args.rate or None, args.burst
+        if args.delay:
+            rate, burst = limits_from_delay(args.delay, args.threads, args.burst)
+        
+        # A bare --http2 selects the sites known to support HTTP/2
+        http2_hosts = args.http2
+        if http2_hosts is not None and not http2_hosts:
+            http2_hosts = HTTP2_HOSTS
+        
+        # Record chapters as they finish, if asked to
+        journal = create_journal(args)
+        if journal is not None and args.resume:
+            logger.info(f"Resuming with {len(journal)} chapters from {journal.path}")
+        
         # Create appropriate coordinator based on scraper type
         if hasattr(scraper, "get_audio_content"):
             coordinator = AudioNovelScraperCoordinator(
@@ -163,7 +355,26 @@ def main():
                 adapter=adapter,
                 progress_reporter=progress_reporter,
                 max_threads=args.threads,
-                delay_between_requests=args.delay
+                pooled_connections=not args.no_pool,
+                rate=rate,
+                burst=burst,
+                http2_hosts=http2_hosts,
+                text_pipeline=text_pipeline,
+                journal=journal
+            )
+        elif args.use_async:
+            coordinator = AsyncNovelScraperCoordinator(
+                scraper=scraper,
+                adapter=adapter,
+                progress_reporter=progress_reporter,
+                max_threads=args.threads,
+                pooled_connections=not args.no_pool,
+                rate=rate,
+                burst=burst,
+                http2_hosts=http2_hosts,
+                max_concurrency=args.concurrency,
+                text_pipeline=text_pipeline,
+                journal=journal
             )
         else:
             coordinator = NovelScraperCoordinator(
@@ -171,7 +382,12 @@ def main():
                 adapter=adapter,
                 progress_reporter=progress_reporter,
                 max_threads=args.threads,
-                delay_between_requests=args.delay
+                pooled_connections=not args.no_pool,
+                rate=rate,
+                burst=burst,
+                http2_hosts=http2_hosts,
+                text_pipeline=text_pipeline,
+                journal=journal
             )
         
         # Start scraping
@@ -181,6 +397,37 @@ def main():
             chapter_range=args.range,
             range_callback=range_callback
         )
+        # Stop the parse workers, if any
+        scrape_util.configure_parse_pool(0)
+        
+        cache = scrape_util.get_cache()
+        if cache:
+            stats = cache.stats()
+            logger.info(
+                f"HTTP cache: {stats['hits']} hits, {stats['revalidated']} revalidated (304), "
+                f"{stats['misses']} downloaded, {stats['bytes'] / 1024 / 1024:.1f} MB in {stats['entries']} entries"
+            )
+        transfer = scrape_util.transfer_stats()
+        if transfer.wire_bytes:
+            logger.info(
+                f"Transferred {transfer.wire_bytes / 1024 / 1024:.1f} MB for "
+                f"{transfer.decoded_bytes / 1024 / 1024:.1f} MB of pages ({transfer.ratio:.1f}x compression)"
+            )
+        if text_pipeline:
+            for name, stats in text_pipeline.stats().items():
+                logger.info(f"Text stage {name}: {stats['mb']:.1f} MB at {stats['mb_per_s']:.0f} MB/s")
+            for stage in text_pipeline.stages:
+                if isinstance(stage, BoilerplateStripper):
+                    for pattern, count in sorted(stage.hits().items(), key=lambda item: -item[1]):
+                        logger.info(f"Removed boilerplate {pattern!r} {count} times")
+        for host, count in scrape_util.block_stats().items():
+            logger.warning(f"{host} served {count} block or challenge pages; its request rate was lowered")
+        for name, stats in scrape_util.selector_stats().items():
+            if stats["learned_hits"] or stats["fallbacks"] or stats["misses"]:
+                logger.info(
+                    f"Selectors {name}: {stats['learned_hits']} learned hits, "
+                    f"{stats['fallbacks']} fallbacks, {stats['misses']} misses"
+                )
         
         # Check result
         if result.get("status") == "success":
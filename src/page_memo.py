@@ -0,0 +1,189 @@
+"""
+Request-scoped page memo with single-flight coalescing.
+
+Scrapers often fetch the same page more than once per run (the novel's main
+page for its info, its index pages and its structure; Quanben's list page
+and first chapter). While a run is active, the last few GET responses are
+memoized, and concurrent requests for a URL that is already being fetched
+wait for that fetch instead of sending their own. Each caller of a shared
+page gets its own response object, sharing only the body.
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class _Call:
+    """An in-flight fetch that other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class PageMemo:
+    """Memo of fetched pages for one run, shared by all worker threads and tasks"""
+
+    def __init__(self, max_entries: int = 8):
+        """
+        Initialize the memo.
+
+        Args:
+            max_entries: Number of responses kept; older ones are dropped first.
+                The pages fetched twice (novel page, index, first chapter) are
+                fetched close together at the start of a run, and chapter pages
+                only once, so a handful is enough; a larger memo only holds
+                chapters in memory
+        """
+        self.max_entries = max_entries
+        self.requests = 0
+        self.memo_hits = 0
+        self.coalesced = 0
+        self._pages: "OrderedDict[str, Any]" = OrderedDict()
+        self._inflight: Dict[str, _Call] = {}
+        self._inflight_async: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(url: str, cookies: Optional[Dict[str, str]] = None) -> str:
+        """Return the memo key of a request"""
+        if not cookies:
+            return url
+        return url + "\n" + "&".join(f"{k}={v}" for k, v in sorted(cookies.items()))
+
+    @property
+    def saved(self) -> int:
+        """Number of network requests avoided"""
+        return self.memo_hits + self.coalesced
+
+    def _remember(self, key: str, result: Any) -> None:
+        self._pages[key] = result
+        self._pages.move_to_end(key)
+        while len(self._pages) > self.max_entries:
+            self._pages.popitem(last=False)
+
+    def get(self, key: str, fetch: Callable[[], Any]) -> Any:
+        """
+        Return the memoized result for key, fetching it at most once.
+
+        Args:
+            key: Memo key, see key_for
+            fetch: Performs the request when the page is neither memoized nor in flight
+
+        Returns:
+            The fetched result, shared with every caller of the same key
+        """
+        with self._lock:
+            self.requests += 1
+            if key in self._pages:
+                self.memo_hits += 1
+                self._pages.move_to_end(key)
+                return self._pages[key]
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fetch()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+                if call.error is None:
+                    self._remember(key, call.result)
+            call.done.set()
+        return call.result
+
+    async def get_async(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Async variant of get; fetch is a coroutine function"""
+        with self._lock:
+            self.requests += 1
+            if key in self._pages:
+                self.memo_hits += 1
+                self._pages.move_to_end(key)
+                return self._pages[key]
+            future = self._inflight_async.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight_async[key] = asyncio.get_running_loop().create_future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return await asyncio.shield(future)
+
+        try:
+            result = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved in case no follower was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight_async[key]
+                if not future.cancelled() and future.exception() is None:
+                    self._remember(key, future.result())
+
+    def stats(self) -> Dict[str, int]:
+        """Return request, memo hit and coalescing counters"""
+        return {
+            "requests": self.requests,
+            "memo_hits": self.memo_hits,
+            "coalesced": self.coalesced,
+            "saved": self.saved,
+        }
+
+
+_active_memo: Optional[PageMemo] = None
+_active_runs = 0
+_memo_lock = threading.Lock()
+
+
+def get_active_memo() -> Optional[PageMemo]:
+    """Return the memo of the running scrape, or None outside of a run"""
+    return _active_memo
+
+
+def acquire_page_memo() -> PageMemo:
+    """
+    Start memoizing pages for a run.
+
+    Runs that overlap (several novels on one event loop) share the memo; it
+    is dropped when the last of them calls release_page_memo.
+    """
+    global _active_memo, _active_runs
+    with _memo_lock:
+        if _active_memo is None:
+            _active_memo = PageMemo()
+        _active_runs += 1
+        return _active_memo
+
+
+def release_page_memo() -> None:
+    """End a run started with acquire_page_memo"""
+    global _active_memo, _active_runs
+    with _memo_lock:
+        _active_runs = max(0, _active_runs - 1)
+        if _active_runs == 0:
+            _active_memo = None
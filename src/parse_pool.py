@@ -0,0 +1,109 @@
+"""
+Process pool for parsing and extraction.
+
+Fetching is I/O bound and scales with threads, but parsing a page and
+turning it into text hold the GIL, so past a handful of worker threads
+chapters are parsed one at a time. With a parse pool configured, the
+fetching thread hands the raw body to a worker process, which rebuilds the
+Response there, runs the scraper's extractor on it and sends back the
+compact chapter dict; the thread waits without holding the GIL.
+
+Extractors are sent to the workers by reference, so they must be
+module-level functions taking (response, url), such as
+scraper_syosetu.extract_chapter. Class-level state they use (compiled
+selectors, learned SelectorChain winners) lives on in each worker process;
+SelectorChain statistics only count extractions run in this process.
+"""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from response import Response
+
+Extractor = Callable[[Response, str], Dict[str, Any]]
+
+
+def _extract(extractor: Extractor,
+             url: str,
+             final_url: str,
+             status_code: int,
+             headers: Dict[str, str],
+             content: bytes,
+             default_encoding: Optional[str]) -> Dict[str, Any]:
+    """Runs in a worker process: rebuild the response and extract from it"""
+    return extractor(Response(final_url, status_code, headers, content, default_encoding=default_encoding), url)
+
+
+class ParsePool:
+    """Worker processes that run extractors on fetched responses"""
+
+    def __init__(self, workers: int):
+        """
+        Initialize the pool; worker processes are started on first use.
+
+        Args:
+            workers: Number of worker processes
+        """
+        self.workers = workers
+        # Spawned rather than forked: the pool is used from a process full of threads
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, extractor: Extractor, response: Response, url: str) -> Future:
+        """Start extractor(response, url) in a worker process"""
+        return self._executor.submit(_extract, extractor, url, response.url, response.status_code,
+                                     dict(response.headers), response.content, response.default_encoding)
+
+    def extract(self, extractor: Extractor, response: Response, url: str) -> Dict[str, Any]:
+        """Run extractor(response, url) in a worker process and wait for its result"""
+        return self.submit(extractor, response, url).result()
+
+    async def extract_async(self, extractor: Extractor, response: Response, url: str) -> Dict[str, Any]:
+        """Run extractor(response, url) in a worker process without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(extractor, response, url))
+
+    def close(self) -> None:
+        """Stop the worker processes"""
+        self._executor.shutdown()
+
+
+_parse_pool: Optional[ParsePool] = None
+
+
+def get_parse_pool() -> Optional[ParsePool]:
+    """Return the process-wide parse pool, or None if pages are parsed in the calling thread"""
+    return _parse_pool
+
+
+def configure_parse_pool(workers: int = 0) -> Optional[ParsePool]:
+    """
+    Replace the process-wide parse pool, stopping the previous one.
+
+    Args:
+        workers: Number of worker processes, 0 to parse in the calling thread
+
+    Returns:
+        The new pool, or None
+    """
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.close()
+    _parse_pool = ParsePool(workers) if workers > 0 else None
+    return _parse_pool
+
+
+def run_extractor(extractor: Extractor, response: Response, url: str) -> Dict[str, Any]:
+    """Run extractor(response, url) in the parse pool, or in this thread if there is none"""
+    pool = _parse_pool
+    if pool is None:
+        return extractor(response, url)
+    return pool.extract(extractor, response, url)
+
+
+async def run_extractor_async(extractor: Extractor, response: Response, url: str) -> Dict[str, Any]:
+    """Async variant of run_extractor; without a pool the extractor runs on the event loop"""
+    pool = _parse_pool
+    if pool is None:
+        return extractor(response, url)
+    return await pool.extract_async(extractor, response, url)
@@ -0,0 +1,159 @@
+"""
+Per-host token-bucket rate limiting for the shared transports.
+
+Every request reserves a token from its host's bucket before it is sent.
+A reservation never spins: the caller learns exactly how long it must wait
+for its token, so a site is driven at its configured rate no matter how many
+workers are fetching from it.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """Token bucket allowing `rate` requests per second with bursts of up to `burst`"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Initialize the bucket.
+
+        Args:
+            rate: Sustained requests per second
+            burst: Maximum number of requests that may be sent back to back
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Take one token and return how many seconds the caller must wait before using it.
+
+        Tokens may go negative; later callers then queue up behind earlier ones.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        """Block until a token is available"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """Wait without blocking the event loop until a token is available"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class HostRateLimiter:
+    """Keeps one token bucket per host"""
+
+    def __init__(self,
+                 rate: Optional[float] = None,
+                 burst: int = 1,
+                 host_limits: Optional[Dict[str, Tuple[float, int]]] = None):
+        """
+        Initialize the limiter.
+
+        Args:
+            rate: Default requests per second per host, None for no limit
+            burst: Default burst size per host
+            host_limits: Optional {host: (rate, burst)} overrides
+        """
+        self.rate = rate
+        self.burst = burst
+        self.host_limits = dict(host_limits or {})
+        self._buckets: Dict[str, Optional[TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> Optional[TokenBucket]:
+        """Return the bucket for the URL's host, or None if the host is not limited"""
+        host = urlsplit(url).netloc
+        try:
+            return self._buckets[host]
+        except KeyError:
+            pass
+        with self._lock:
+            if host not in self._buckets:
+                rate, burst = self.host_limits.get(host, (self.rate, self.burst))
+                self._buckets[host] = TokenBucket(rate, burst) if rate else None
+            return self._buckets[host]
+
+    def set_host_limit(self, host: str, rate: Optional[float], burst: int = 1) -> None:
+        """Change the limit of one host, rate=None removes it"""
+        with self._lock:
+            self.host_limits[host] = (rate, burst)
+            self._buckets[host] = TokenBucket(rate, burst) if rate else None
+
+    def acquire(self, url: str) -> None:
+        """Block until the URL's host allows another request"""
+        bucket = self.bucket(url)
+        if bucket is not None:
+            bucket.acquire()
+
+    async def acquire_async(self, url: str) -> None:
+        """Wait without blocking the event loop until the URL's host allows another request"""
+        bucket = self.bucket(url)
+        if bucket is not None:
+            await bucket.acquire_async()
+
+
+def limits_from_delay(delay: float, threads: int, burst: int = 1) -> Tuple[float, int]:
+    """
+    Convert a deprecated delay between requests to the limits it used to allow.
+
+    Each of the threads waited delay seconds after its request, so up to
+    threads requests went out at once, threads / delay per second.
+
+    Args:
+        delay: Seconds each thread waited between requests
+        threads: Number of worker threads
+        burst: Burst size asked for besides
+
+    Returns:
+        (rate, burst)
+    """
+    return threads / delay, max(burst, threads)
+
+
+_rate_limiter = HostRateLimiter()
+
+
+def get_rate_limiter() -> HostRateLimiter:
+    """Return the process-wide rate limiter"""
+    return _rate_limiter
+
+
+def configure_rate_limit(rate: Optional[float] = None,
+                         burst: int = 1,
+                         host_limits: Optional[Dict[str, Tuple[float, int]]] = None) -> HostRateLimiter:
+    """
+    Replace the process-wide rate limiter.
+
+    Args:
+        rate: Default requests per second per host, None for no limit
+        burst: Default burst size per host
+        host_limits: Optional {host: (rate, burst)} overrides
+
+    Returns:
+        The new limiter
+    """
+    global _rate_limiter
+    _rate_limiter = HostRateLimiter(rate, burst, host_limits)
+    return _rate_limiter
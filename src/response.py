@@ -0,0 +1,174 @@
+"""
+Lightweight response returned by scrape_util.fetch.
+
+Holds the status, headers and raw body of a response; the decoded text, the
+BeautifulSoup (or lxml) tree and the parsed JSON are only built when asked for, so JSON
+endpoints and error pages never pay for HTML tree construction.
+
+The body is decoded before it is parsed, with the charset from the
+Content-Type header, a <meta charset> (or XML declaration) sniffed from the
+first few KB, or the encoding the scraper declares for its site, so
+BeautifulSoup never has to guess it.
+"""
+
+import codecs
+import json as jsonlib
+import re
+from typing import Dict, Any, Optional, Tuple
+
+from bs4 import BeautifulSoup as Soup
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from lxml_engine import parse_html
+from parse_filter import ParseOnly
+
+# How much of the body is searched for a <meta charset>
+SNIFF_BYTES = 4096
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+_XML_ENCODING = re.compile(rb"""^\s*<\?xml[^>]+encoding\s*=\s*["']([A-Za-z0-9_.:-]+)""", re.IGNORECASE)
+
+# Sites that say GB2312 or GBK routinely serve characters only GB18030 has
+_SUPERSETS = {"gb2312": "gb18030", "gbk": "gb18030"}
+
+
+def normalize_charset(name: Optional[str]) -> Optional[str]:
+    """Return the Python codec for a charset label, or None if it is unknown"""
+    if not name:
+        return None
+    try:
+        codec = codecs.lookup(name.strip().strip("\"'")).name
+    except LookupError:
+        return None
+    return _SUPERSETS.get(codec, codec)
+
+
+def header_charset(headers) -> Optional[str]:
+    """Return the charset declared by a Content-Type header, or None"""
+    if "charset" not in headers.get("Content-Type", "").lower():
+        # requests falls back to ISO-8859-1 for text/*, which is never right for these sites
+        return None
+    return normalize_charset(get_encoding_from_headers(headers))
+
+
+def sniff_charset(content: bytes) -> Optional[str]:
+    """Return the charset declared by a BOM, an XML declaration or a <meta> tag near the start of the body"""
+    if content.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    head = content[:SNIFF_BYTES]
+    match = _XML_ENCODING.match(head) or _META_CHARSET.search(head)
+    if match is None:
+        return None
+    return normalize_charset(match.group(1).decode("ascii"))
+
+
+class Response:
+    """Status, headers and body of a fetched page, with lazily parsed views"""
+
+    __slots__ = ("url", "status_code", "headers", "content", "from_cache", "default_encoding",
+                 "_encoding", "_text", "_soups", "_tree", "_json")
+
+    def __init__(self,
+                 url: str,
+                 status_code: int,
+                 headers: Optional[Dict[str, str]],
+                 content: bytes,
+                 from_cache: bool = False,
+                 default_encoding: Optional[str] = None):
+        """
+        Initialize the response.
+
+        Args:
+            url: Final URL of the response
+            status_code: HTTP status
+            headers: Response headers
+            content: Decoded (decompressed) body
+            from_cache: Whether the body came from the disk cache
+            default_encoding: Charset the site is known to use, applied when
+                neither the header nor the page declares one
+        """
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.content = content
+        self.from_cache = from_cache
+        self.default_encoding = default_encoding
+        self._encoding: Optional[str] = None
+        self._text: Optional[str] = None
+        self._soups: Dict[Tuple[str, Optional[ParseOnly]], Soup] = {}
+        self._tree = None
+        self._json: Any = None
+
+    @classmethod
+    def from_requests(cls, response, default_encoding: Optional[str] = None) -> "Response":
+        """Wrap a requests.Response (or a cached one) whose body has been read"""
+        return cls(response.url, response.status_code, response.headers, response.content,
+                   getattr(response, "from_cache", False), default_encoding)
+
+    def copy(self, default_encoding: Optional[str] = None) -> "Response":
+        """Return a response sharing the body but none of the parsed views, for another caller to modify"""
+        return Response(self.url, self.status_code, self.headers, self.content, self.from_cache,
+                        default_encoding or self.default_encoding)
+
+    @property
+    def ok(self) -> bool:
+        """Whether the status is below 400"""
+        return self.status_code < 400
+
+    @property
+    def header_encoding(self) -> Optional[str]:
+        """Charset declared by the Content-Type header, or None"""
+        return header_charset(self.headers)
+
+    @property
+    def encoding(self) -> str:
+        """
+        Charset of the body: the Content-Type header's, else the one the page
+        declares in its first SNIFF_BYTES, else the scraper's default, else UTF-8.
+        """
+        if self._encoding is None:
+            self._encoding = (self.header_encoding
+                              or sniff_charset(self.content)
+                              or normalize_charset(self.default_encoding)
+                              or "utf-8")
+        return self._encoding
+
+    @property
+    def text(self) -> str:
+        """Body decoded with the response's charset"""
+        if self._text is None:
+            self._text = self.content.decode(self.encoding, errors="replace")
+        return self._text
+
+    def soup(self, features: str = "lxml", parse_only: Optional[ParseOnly] = None) -> Soup:
+        """
+        Return the body parsed by BeautifulSoup, built on first use and reused afterwards.
+        With parse_only, only the subtrees it names are built.
+        """
+        soup = self._soups.get((features, parse_only))
+        if soup is None:
+            strainer = parse_only.strainer() if parse_only is not None else None
+            # Hand over decoded text so BeautifulSoup skips its encoding detection
+            soup = self._soups[(features, parse_only)] = Soup(self.text, features=features, parse_only=strainer)
+        return soup
+
+    def tree(self):
+        """Return the body parsed by lxml.html, for scrapers using the lxml engine"""
+        if self._tree is None:
+            self._tree = parse_html(self.text)
+        return self._tree
+
+    def json(self) -> Any:
+        """Return the body parsed as JSON, parsed on first use"""
+        if self._json is None:
+            self._json = jsonlib.loads(self.content)
+        return self._json
+
+    def raise_for_status(self) -> None:
+        """Raise ValueError for 4xx and 5xx responses"""
+        if not self.ok:
+            raise ValueError(f"HTTP {self.status_code} for {self.url}")
+
+    def __repr__(self) -> str:
+        return f"<Response [{self.status_code}] {self.url}>"
@@ -0,0 +1,326 @@
+"""
+Bounded retries with capped exponential backoff, and a per-host circuit breaker.
+
+The transports run every request through run_with_retries (or its async
+twin). Transient failures - connection errors, timeouts and throttling or
+server-error statuses such as 429/503 - are retried up to the policy's
+attempt budget, waiting at least as long as the server's Retry-After asks.
+Failures are also recorded per host; once a host's recent error rate spikes
+its circuit opens and every worker pauses for that host until it cools down,
+instead of all of them hammering it in lockstep. Block and challenge pages
+(see block_detector) open the host's circuit right away and are retried
+once it closes, on a budget of their own: a site still blocking after its
+cooldown will not serve the page on the next attempts either.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Awaitable, Deque, Dict, Iterable, Optional, Tuple, Type
+from urllib.parse import urlsplit
+
+from block_detector import get_block_detector
+
+logger = logging.getLogger("scrape_util")
+
+
+class RetryError(Exception):
+    """Raised when a request still fails after the policy's attempt budget"""
+
+    def __init__(self, url: str, attempts: int, reason: str):
+        super().__init__(f"Giving up on {url} after {attempts} attempts: {reason}")
+        self.url = url
+        self.attempts = attempts
+        self.reason = reason
+
+
+class RetryPolicy:
+    """Capped exponential backoff with jitter and a max-attempts budget"""
+
+    def __init__(self,
+                 max_attempts: int = 5,
+                 base_delay: float = 1.0,
+                 max_delay: float = 60.0,
+                 jitter: bool = True,
+                 retry_statuses: Iterable[int] = (429, 500, 502, 503, 504),
+                 respect_retry_after: bool = True,
+                 max_retry_after: float = 300.0,
+                 block_retries: int = 1):
+        """
+        Initialize the policy.
+
+        Args:
+            max_attempts: Total attempts per request, including the first one
+            base_delay: Backoff before the first retry, doubled for each further retry
+            max_delay: Upper bound for the exponential backoff
+            jitter: Randomize each backoff between half and all of its value so
+                that workers that failed together do not retry together
+            retry_statuses: HTTP statuses that are retried instead of returned
+            respect_retry_after: Wait at least as long as the Retry-After header asks
+            max_retry_after: Upper bound applied to Retry-After values
+            block_retries: Retries after a block page, each once the host's circuit closes
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+        self.block_retries = max(0, block_retries)
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Return the delay before retrying after the given (1-based) failed attempt"""
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        if self.jitter:
+            delay = delay / 2 + random.uniform(0, delay / 2)
+        if retry_after is not None and self.respect_retry_after:
+            delay = max(delay, min(retry_after, self.max_retry_after))
+        return delay
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Parse a Retry-After header given either in seconds or as an HTTP date"""
+        if not value:
+            return None
+        value = value.strip()
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError, IndexError):
+            return None
+
+
+class CircuitBreaker:
+    """Pauses all requests to a host while its recent error rate is too high"""
+
+    def __init__(self,
+                 window: int = 20,
+                 failure_ratio: float = 0.5,
+                 min_requests: int = 6,
+                 cooldown: float = 30.0):
+        """
+        Initialize the breaker.
+
+        Args:
+            window: Number of recent outcomes tracked per host
+            failure_ratio: Failure ratio within the window that opens the circuit
+            min_requests: Outcomes needed in the window before the ratio is trusted
+            cooldown: Seconds the circuit stays open once tripped
+        """
+        self.window = window
+        self.failure_ratio = failure_ratio
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self._outcomes: Dict[str, Deque[bool]] = {}
+        self._open_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait_time(self, url: str) -> float:
+        """Return how long requests to the URL's host must still wait"""
+        open_until = self._open_until.get(urlsplit(url).netloc)
+        if open_until is None:
+            return 0.0
+        return max(0.0, open_until - time.monotonic())
+
+    def wait(self, url: str) -> None:
+        """Block while the host's circuit is open"""
+        delay = self.wait_time(url)
+        while delay > 0:
+            time.sleep(delay)
+            delay = self.wait_time(url)
+
+    async def wait_async(self, url: str) -> None:
+        """Wait without blocking the event loop while the host's circuit is open"""
+        delay = self.wait_time(url)
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self.wait_time(url)
+
+    def record_success(self, url: str) -> None:
+        """Record a successful request"""
+        self._record(urlsplit(url).netloc, True)
+
+    def record_failure(self, url: str, pause: Optional[float] = None) -> None:
+        """
+        Record a failed request.
+
+        Args:
+            url: URL of the failed request
+            pause: Optional time the server asked us to stay away (Retry-After);
+                the whole host is paused for at least that long
+        """
+        host = urlsplit(url).netloc
+        self._record(host, False)
+        if pause:
+            self.trip(host, pause)
+
+    def trip(self, host: str, duration: Optional[float] = None) -> None:
+        """Open the host's circuit for `duration` seconds (default: cooldown)"""
+        duration = self.cooldown if duration is None else duration
+        with self._lock:
+            open_until = time.monotonic() + duration
+            if open_until > self._open_until.get(host, 0.0):
+                self._open_until[host] = open_until
+                logger.warning(f"Pausing all requests to {host} for {duration:.1f}s")
+
+    def _record(self, host: str, success: bool) -> None:
+        with self._lock:
+            outcomes = self._outcomes.get(host)
+            if outcomes is None:
+                outcomes = self._outcomes[host] = deque(maxlen=self.window)
+            outcomes.append(success)
+            if len(outcomes) < self.min_requests:
+                return
+            failures = outcomes.count(False)
+            if failures / len(outcomes) < self.failure_ratio:
+                return
+            # Start over once the circuit opens so one spike trips it only once
+            outcomes.clear()
+        self.trip(host)
+
+
+_retry_policy = RetryPolicy()
+_circuit_breaker = CircuitBreaker()
+
+
+def get_retry_policy() -> RetryPolicy:
+    """Return the process-wide retry policy"""
+    return _retry_policy
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Return the process-wide circuit breaker"""
+    return _circuit_breaker
+
+
+def configure_retries(policy: Optional[RetryPolicy] = None,
+                      breaker: Optional[CircuitBreaker] = None) -> Tuple[RetryPolicy, CircuitBreaker]:
+    """
+    Replace the process-wide retry policy and/or circuit breaker.
+
+    Returns:
+        Tuple of (retry policy, circuit breaker) now in effect
+    """
+    global _retry_policy, _circuit_breaker
+    if policy is not None:
+        _retry_policy = policy
+    if breaker is not None:
+        _circuit_breaker = breaker
+    return _retry_policy, _circuit_breaker
+
+
+def _failure_reason(url: str,
+                    response: Any,
+                    policy: RetryPolicy,
+                    breaker: CircuitBreaker) -> Tuple[Optional[str], Optional[float], bool]:
+    """Classify a response; returns (failure reason or None, Retry-After seconds, block page)"""
+    if response.status_code not in policy.retry_statuses:
+        block = _block_reason(url, response)
+        if block is not None:
+            breaker.record_failure(url)
+            breaker.trip(urlsplit(url).netloc)
+            return f"Blocked ({block}, HTTP {response.status_code})", None, True
+        breaker.record_success(url)
+        return None, None, False
+    retry_after = policy.parse_retry_after(response.headers.get("Retry-After"))
+    pause = min(retry_after, policy.max_retry_after) if retry_after is not None and policy.respect_retry_after else None
+    breaker.record_failure(url, pause)
+    return f"HTTP {response.status_code}", retry_after, False
+
+
+def _block_reason(url: str, response: Any) -> Optional[str]:
+    """Return why a response is a block page, or None; streamed bodies are left to the caller"""
+    detector = get_block_detector()
+    if detector is None:
+        return None
+    # A requests.Response only holds its body in _content once it has been read into memory
+    content = getattr(response, "_content", None) if hasattr(response, "_content_consumed") else response.content
+    if not isinstance(content, bytes):
+        return None
+    block = detector.detect(url, response.headers, content)
+    if block is not None:
+        detector.record_block(url)
+    else:
+        detector.record_clean(url)
+    return block
+
+
+def run_with_retries(url: str,
+                     send: Callable[[], Any],
+                     retry_exceptions: Tuple[Type[BaseException], ...]) -> Any:
+    """
+    Call send() under the retry policy and circuit breaker.
+
+    Args:
+        url: URL being requested, used to pick the host's circuit
+        send: Sends the request once; returns an object with status_code and headers
+        retry_exceptions: Exception types that count as transient failures
+
+    Returns:
+        The first response whose status is not retryable
+
+    Raises:
+        RetryError: If the attempt budget, or the block page budget, is exhausted
+    """
+    policy, breaker = _retry_policy, _circuit_breaker
+    attempt = 0
+    blocks = 0
+    while True:
+        attempt += 1
+        breaker.wait(url)
+        retry_after = None
+        blocked = False
+        try:
+            response = send()
+        except retry_exceptions as e:
+            breaker.record_failure(url)
+            reason = f"{type(e).__name__}: {e}"
+        else:
+            reason, retry_after, blocked = _failure_reason(url, response, policy, breaker)
+            if reason is None:
+                return response
+            if hasattr(response, "close"):
+                response.close()
+        blocks += blocked
+        if attempt >= policy.max_attempts or blocks > policy.block_retries:
+            raise RetryError(url, attempt, reason)
+        delay = policy.backoff(attempt, retry_after)
+        logger.warning(f"{reason} for {url}, retrying in {delay:.1f}s ({attempt}/{policy.max_attempts})")
+        time.sleep(delay)
+
+
+async def run_with_retries_async(url: str,
+                                 send: Callable[[], Awaitable[Any]],
+                                 retry_exceptions: Tuple[Type[BaseException], ...]) -> Any:
+    """Async variant of run_with_retries; send() is a coroutine function"""
+    policy, breaker = _retry_policy, _circuit_breaker
+    attempt = 0
+    blocks = 0
+    while True:
+        attempt += 1
+        await breaker.wait_async(url)
+        retry_after = None
+        blocked = False
+        try:
+            response = await send()
+        except retry_exceptions as e:
+            breaker.record_failure(url)
+            reason = f"{type(e).__name__}: {e}"
+        else:
+            reason, retry_after, blocked = _failure_reason(url, response, policy, breaker)
+            if reason is None:
+                return response
+        blocks += blocked
+        if attempt >= policy.max_attempts or blocks > policy.block_retries:
+            raise RetryError(url, attempt, reason)
+        delay = policy.backoff(attempt, retry_after)
+        logger.warning(f"{reason} for {url}, retrying in {delay:.1f}s ({attempt}/{policy.max_attempts})")
+        await asyncio.sleep(delay)
@@ -1,10 +1,23 @@
 from abc import ABC, abstractmethod
-from time import sleep
 from enum import Enum
+import os
 import requests
 from bs4 import BeautifulSoup as Soup
 from types import FunctionType
-import threading
+from transport import get_transport, configure_transport, DEFAULT_HEADERS, DEFAULT_TIMEOUT, RETRY_EXCEPTIONS
+from rate_limiter import get_rate_limiter, configure_rate_limit
+from retry_policy import RetryPolicy, CircuitBreaker, RetryError, configure_retries, run_with_retries
+from async_transport import get_async_transport
+from http_cache import configure_cache, get_cache
+from page_memo import acquire_page_memo, release_page_memo
+from content_encoding import transfer_stats
+from block_detector import BlockDetector, configure_block_detection, get_block_detector
+from response import Response, header_charset
+import lxml_engine
+import selector_chain
+import stream_parser
+from parse_pool import configure_parse_pool, get_parse_pool, run_extractor, run_extractor_async
+from threading_utils import WorkQueueProcessor
 from selenium import webdriver
 from selenium.webdriver.firefox.firefox_profile import FirefoxProfile
 
@@ -20,61 +33,204 @@ class driver_type(Enum):
 
 class scrape_util():
     @staticmethod
-    def scrape_url(url, soup_features = "lxml", cookies={}, headers={}):
-        while True:
-            try:
-                if headers == {}:
-                    headers = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/39.0.2171.95 Safari/537.36'}
-                return Soup(requests.get(url, headers=headers, cookies=cookies, timeout=10).content, features=soup_features)
-            except requests.exceptions.ReadTimeout or requests.exceptions.ConnectTimeout or requests.exceptions.Timeout:
-                print("Timeout, we will try again in 3s!")
-                sleep(3)
-            except requests.exceptions.MissingSchema or requests.exceptions.InvalidJSONError as e:
-                print("Scrape_url falied with exception: {}".format(str(e)))
-                raise e
-            except Exception as e:
-                print("Ah, damn! {} happened! We will try again in 3s!".format(str(e)))
-                sleep(3)
+    def configure_transport(pool_size: int = 6, pooled: bool = True, http2_hosts = None):
+        """
+        Size the shared connection pool used by all helpers below.
+        pooled=False opens a fresh connection per request, for comparison.
+        Requests to http2_hosts are multiplexed over one HTTP/2 connection per host.
+        """
+        return configure_transport(pool_size=pool_size, pooled=pooled, http2_hosts=http2_hosts)
+
+    @staticmethod
+    def configure_rate_limit(rate = None, burst: int = 1, host_limits = None):
+        """
+        Limit every fetch to `rate` requests per second per host, with bursts of up to `burst`.
+        rate=None disables the limit; host_limits maps host -> (rate, burst) overrides.
+        """
+        return configure_rate_limit(rate=rate, burst=burst, host_limits=host_limits)
+
+    @staticmethod
+    def configure_retries(policy: RetryPolicy = None, breaker: CircuitBreaker = None):
+        """
+        Replace the retry policy (attempt budget, backoff, retryable statuses)
+        and/or the per-host circuit breaker shared by all helpers below.
+        """
+        return configure_retries(policy=policy, breaker=breaker)
+
+    @staticmethod
+    def configure_cache(directory: str = None, max_bytes: int = 512 * 1024 * 1024, ttl: float = None):
+        """
+        Enable the on-disk HTTP cache for GET requests (directory=None disables it).
+        Entries younger than ttl seconds are served offline, older ones are revalidated.
+        """
+        return configure_cache(directory, max_bytes=max_bytes, ttl=ttl)
+
+    @staticmethod
+    def configure_block_detection(detector: BlockDetector = None):
+        """
+        Replace the block-page detector that runs before pages are returned
+        (detector=None disables it); see block_detector for the signatures.
+        """
+        return configure_block_detection(detector)
+
+    @staticmethod
+    def block_stats():
+        """Block and challenge pages received so far, by host"""
+        detector = get_block_detector()
+        return detector.stats() if detector is not None else {}
+
+    @staticmethod
+    def get_cache():
+        return get_cache()
+
+    @staticmethod
+    def acquire_page_memo():
+        """
+        Memoize and coalesce GET requests until release_page_memo; returns the memo,
+        whose stats() report how many requests it saved.
+        """
+        return acquire_page_memo()
+
+    @staticmethod
+    def release_page_memo():
+        release_page_memo()
+
+    @staticmethod
+    def configure_parse_pool(workers: int = 0):
+        """
+        Run the extractors given to scrape_with in `workers` processes, so parsing
+        scales with cores instead of serializing on the GIL; 0 parses in the calling thread.
+        """
+        return configure_parse_pool(workers)
+
+    @staticmethod
+    def get_parse_pool():
+        return get_parse_pool()
+
+    @staticmethod
+    def fetch(url, cookies={}, headers={}, encoding = None) -> Response:
+        """
+        GET url and return a Response with its status, headers and raw body.
+        The soup (.soup()) and JSON (.json()) views are only built when asked for.
+        encoding is the site's charset, used when neither the header nor the page declares one.
+        """
+        return Response.from_requests(get_transport().get(url, headers=headers, cookies=cookies), encoding)
+
+    @staticmethod
+    async def fetch_async(url, cookies={}, headers={}, encoding = None) -> Response:
+        response = await get_async_transport().fetch("GET", url, headers=headers, cookies=cookies)
+        response.default_encoding = encoding
+        return response
+
+    @staticmethod
+    def make_request(url, method = "GET", params = None, json = None, cookies={}, headers={}, encoding = None) -> Response:
+        """Send a request (e.g. to a JSON API) and return its Response"""
+        if params:
+            # Fold the query into the URL so the page memo and the cache key on it
+            prepared = requests.models.PreparedRequest()
+            prepared.prepare_url(url, params)
+            url = prepared.url
+        response = get_transport().request(method, url, json=json, headers=headers, cookies=cookies)
+        return Response.from_requests(response, encoding)
+
+    @staticmethod
+    def scrape_url(url, soup_features = "lxml", cookies={}, headers={}, encoding = None, parse_only = None):
+        """parse_only (a parse_filter.ParseOnly) limits the soup to the subtrees the caller reads"""
+        response = scrape_util.fetch(url, cookies=cookies, headers=headers, encoding=encoding)
+        return response.soup(soup_features, parse_only)
+
+    @staticmethod
+    async def scrape_url_async(url, soup_features = "lxml", cookies={}, headers={}, encoding = None, parse_only = None):
+        response = await scrape_util.fetch_async(url, cookies=cookies, headers=headers, encoding=encoding)
+        return response.soup(soup_features, parse_only)
+
+    @staticmethod
+    def scrape_tree(url, cookies={}, headers={}, encoding = None):
+        """Like scrape_url, but parse with lxml.html; query the tree with an lxml_engine.LxmlEngine"""
+        return scrape_util.fetch(url, cookies=cookies, headers=headers, encoding=encoding).tree()
+
+    @staticmethod
+    async def scrape_tree_async(url, cookies={}, headers={}, encoding = None):
+        response = await scrape_util.fetch_async(url, cookies=cookies, headers=headers, encoding=encoding)
+        return response.tree()
+
+    @staticmethod
+    def scrape_with(url, extractor, cookies={}, headers={}, encoding = None):
+        """
+        Fetch url and return extractor(response, url), run in the parse pool if one is configured.
+        extractor must be a module-level function so it can be sent to a worker process.
+        """
+        response = scrape_util.fetch(url, cookies=cookies, headers=headers, encoding=encoding)
+        return run_extractor(extractor, response, url)
+
+    @staticmethod
+    async def scrape_with_async(url, extractor, cookies={}, headers={}, encoding = None):
+        response = await scrape_util.fetch_async(url, cookies=cookies, headers=headers, encoding=encoding)
+        return await run_extractor_async(extractor, response, url)
+
+    @staticmethod
+    def iter_decoded(url, cookies={}, headers={}, chunk_size: int = 16 * 1024):
+        """Yield the body of url decompressed chunk by chunk as it arrives, for incremental parsers"""
+        return get_transport().stream(url, headers=headers, cookies=cookies, chunk_size=chunk_size)
+
+    @staticmethod
+    def iter_parse(url, events=("end",), tags = None, cookies={}, headers={}, encoding = None):
+        """
+        Parse url with lxml while it downloads, yielding (event, element) pairs like lxml's iterparse.
+        tags limits the events to those tag names; encoding is the site's charset, as for fetch,
+        and like there the Content-Type header's charset and the page's own come first.
+        """
+        transport = get_transport()
+        response = transport.open_stream(url, headers=headers, cookies=cookies)
+        yield from stream_parser.iter_parse(transport.iter_body(response), events=events, tags=tags,
+                                            default_encoding=encoding,
+                                            header_encoding=header_charset(response.headers))
+
+    @staticmethod
+    def selector_stats():
+        """Learned-selector hits, fallbacks and misses of every SelectorChain, by chain name"""
+        return selector_chain.selector_stats()
+
+    @staticmethod
+    def transfer_stats():
+        """Bytes received on the wire and after decompression so far"""
+        return transfer_stats
 
     @staticmethod
     def retrive_stream(url, cookies={}, headers={}):
-        while True:
-            try:
-                if headers == {}:
-                    headers = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/39.0.2171.95 Safari/537.36'}
-                return requests.get(url=url, headers=headers, cookies=cookies, timeout=10, stream=True)
-            except requests.exceptions.ReadTimeout or requests.exceptions.ConnectTimeout or requests.exceptions.Timeout:
-                print("Timeout, we will try again in 3s!")
-                sleep(3)
-            except requests.exceptions.MissingSchema or requests.exceptions.InvalidJSONError as e:
-                print("Scrape_url falied with exception: {}".format(str(e)))
-                raise e
-            except Exception as e:
-                print("Ah, damn! {} happened! We will try again in 3s!".format(str(e)))
-                sleep(3)
+        return get_transport().get(url, headers=headers, cookies=cookies, stream=True)
 
     @staticmethod
     def write_stream(url, cookies={}, target_path="") -> bool:
         if target_path == "":
             return False
-        while True:
-            try:
-                headers = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/39.0.2171.95 Safari/537.36'}
-                resp = requests.get(url=url, headers=headers, cookies=cookies, timeout=10, stream=True)
+        transport = get_transport()
+
+        def download_once():
+            # The body is streamed after the request returns, so the whole
+            # download is one attempt: a connection dropped mid-file retries it
+            get_rate_limiter().acquire(url)
+            resp = transport.send("GET", url, cookies=cookies, stream=True)
+            if resp.status_code < 400:
                 with open(target_path, "wb") as file:
                     for chunk in resp.iter_content(chunk_size=512):
                         if chunk:
                             file.write(chunk)
+            return resp
+
+        try:
+            resp = run_with_retries(url, download_once, RETRY_EXCEPTIONS)
+        except (RetryError, requests.RequestException) as e:
+            # One file that cannot be fetched must not end the caller's run
+            print("Download of {} failed: {}".format(url, e))
+        else:
+            if resp.status_code < 400:
                 return True
-            except requests.exceptions.ReadTimeout or requests.exceptions.ConnectTimeout or requests.exceptions.Timeout:
-                print("Timeout, we will try again in 3s!")
-                sleep(3)
-            except requests.exceptions.MissingSchema or requests.exceptions.InvalidJSONError as e:
-                print("Scrape_url falied with exception: {}".format(str(e)))
-                raise e
-            except Exception as e:
-                print("Ah, damn! {} happened! We will try again in 3s!".format(str(e)))
-                sleep(3)
+            print("Download of {} failed with HTTP {}".format(url, resp.status_code))
+        # Do not leave the part an interrupted attempt wrote behind
+        if os.path.exists(target_path):
+            os.remove(target_path)
+        return False
 
     @staticmethod
     def make_webdriver(driver_type: driver_type, driver_path: str, driver_profile_path: str, headless = True):
@@ -108,51 +264,38 @@ class scrape_util():
 
     @staticmethod
     def get_session_cookies(url, headers={}):
-        while True:
-            try:
-                session = requests.Session()
-                if headers == {}:
-                    headers = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/39.0.2171.95 Safari/537.36'}
-                session.get(url, headers=headers, timeout=10)
-                return session.cookies.get_dict(), session
-            except requests.exceptions.ReadTimeout or requests.exceptions.ConnectTimeout or requests.exceptions.Timeout:
-                print("Timeout, we will try again in 3s!")
-                sleep(3)
-            except requests.exceptions.MissingSchema or requests.exceptions.InvalidJSONError as e:
-                print("Scrape_url falied with exception: {}".format(str(e)))
-                raise e
-            except Exception as e:
-                print("Ah, damn! {} happened! We will try again in 3s!".format(str(e)))
-                sleep(3)
+        # A dedicated session, so the caller gets exactly the cookies this site set
+        session = requests.Session()
+        if headers == {}:
+            headers = DEFAULT_HEADERS
+
+        def send_once():
+            get_rate_limiter().acquire(url)
+            return session.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
+
+        run_with_retries(url, send_once, RETRY_EXCEPTIONS)
+        return session.cookies.get_dict(), session
 
     @staticmethod
     def post_request(url, request={}, cookies={}, headers={}, soup_features = "lxml"):
-        while True:
-            try:
-                if headers == {}:
-                    headers = {'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/39.0.2171.95 Safari/537.36'}
-                return Soup(requests.post(url, json=request, headers=headers, cookies=cookies, timeout=10).content, features=soup_features)
-            except requests.exceptions.ReadTimeout or requests.exceptions.ConnectTimeout or requests.exceptions.Timeout:
-                print("Timeout, we will try again in 3s!")
-                sleep(3)
-            except requests.exceptions.MissingSchema or requests.exceptions.InvalidJSONError as e:
-                print("Scrape_url falied with exception: {}".format(str(e)))
-                raise e
-            except Exception as e:
-                print("Ah, damn! {} happened! We will try again in 3s!".format(str(e)))
-                sleep(3)
+        return Soup(get_transport().post(url, json=request, headers=headers, cookies=cookies).content, features=soup_features)
 
     @staticmethod
     def html_to_text(elem):
-        text = ''
+        if lxml_engine.is_lxml_element(elem):
+            return lxml_engine.html_to_text(elem)
+        # Collect the pieces and join once; repeated += is quadratic on long chapters
+        parts = []
+        append = parts.append
+        break_tags = lxml_engine.BREAK_TAGS
         for e in elem.descendants:
             if isinstance(e, str):
-                text += e.strip()
-            elif e.name in ['br',  'p', 'h1', 'h2', 'h3', 'h4','tr', 'th']:
-                text += '\n'
+                append(e.strip())
+            elif e.name in break_tags:
+                append('\n')
             elif e.name == 'li':
-                text += '\n- '
-        return text
+                append('\n- ')
+        return ''.join(parts)
 
     @staticmethod
     def divide_chunks(l, n):
@@ -229,17 +372,15 @@ class multi_thread_scrape():
         self.result_list = []
         
     def run(self):
-        scraping_list_chunked = scrape_util.divide_chunks(self.scraping_list, self.max_thread_num)
+        # Workers pick up the next URL as soon as they are done with one;
+        # chunk_handle still receives consecutive, finished URLs in order
         scraped_records = {}
-        for i, chunk in enumerate(scraping_list_chunked):
-            scrape_thread_list = []
-            for ii, url in enumerate(chunk):
-                thread = threading.Thread(target=self.scrape_handle, args=(url, i*self.max_thread_num+ii, scraped_records))
-                scrape_thread_list.append(thread)
-                thread.start()
-            for thread in scrape_thread_list:
-                thread.join()
-            self.result_list += self.chunk_handle(i*self.max_thread_num, chunk, scraped_records)
+        self.result_list += WorkQueueProcessor().process_in_parallel(
+            self.scraping_list,
+            lambda url, index: self.scrape_handle(url, index, scraped_records),
+            lambda chunk_start_index, chunk, _: self.chunk_handle(chunk_start_index, chunk, scraped_records),
+            self.max_thread_num,
+        )
 
     @abstractmethod
     def scrape_handle(self, url: str, index: int, scraped_records: dict[int, list[str]]):
@@ -1,7 +1,7 @@
 """
 Scraper implementation for 69shu.net
 """
-from typing import Dict, List, Any
+from typing import Dict, Iterator, List, Any
 import sys
 import os
 
@@ -10,10 +10,21 @@ sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__f
 
 from interfaces import NovelScraper
 from scrape_util import scrape_util
+from lxml_engine import LxmlEngine, element_text
 
 class Scraper69Shu(NovelScraper):
     """Scraper for 69shu.net novels"""
     
+    # Pages are GBK; most declare it, this covers the ones that do not
+    encoding = "gbk"
+    
+    # Watermarks and promo lines found in chapter text
+    boilerplate = ("69书吧", "69shu.net", "www.69shu.net", "ｗｗｗ．６９ｓｈｕ．ｎｅｔ")
+    boilerplate_lines = ("请记住本站域名", "天才一秒记住", "手机版阅读网址", "最新章节请到69书吧", "本章未完，请点击下一页继续阅读")
+    
+    # Chapter pages are parsed with lxml; selectors are compiled once for all instances
+    engine = LxmlEngine()
+    
     def __init__(self, **kwargs):
         """Initialize the scraper"""
         super().__init__(**kwargs)
@@ -30,7 +41,7 @@ class Scraper69Shu(NovelScraper):
     
     def get_novel_info(self, url: str) -> Dict[str, Any]:
         """Get basic novel information"""
-        page = scrape_util.scrape_url(url)
+        page = scrape_util.scrape_url(url, encoding=self.encoding)
         
         # Extract novel information
         try:
@@ -58,7 +69,7 @@ class Scraper69Shu(NovelScraper):
     
     def get_index_pages(self, url: str) -> List[str]:
         """Get list of index pages containing chapter links"""
-        page = scrape_util.scrape_url(url)
+        page = scrape_util.scrape_url(url, encoding=self.encoding)
         
         try:
             page_options = page.select('div.listpage')[0].find_all("option")
@@ -68,7 +79,7 @@ class Scraper69Shu(NovelScraper):
     
     def get_chapter_urls(self, index_url: str) -> List[str]:
         """Get list of chapter URLs from an index page"""
-        page = scrape_util.scrape_url(index_url)
+        page = scrape_util.scrape_url(index_url, encoding=self.encoding)
         
         try:
             chapter_elements = page.select("div.info_chapters ul.p2")[1].find_all("li")
@@ -76,16 +87,59 @@ class Scraper69Shu(NovelScraper):
         except Exception as e:
             raise ValueError(f"Failed to extract chapter URLs: {str(e)}")
     
+    def get_index_structure(self, url: str) -> List[Dict[str, Any]]:
+        """Get the chapters of the novel, in index order"""
+        return list(self.iter_index_structure(url))
+    
+    def iter_index_structure(self, url: str) -> Iterator[Dict[str, Any]]:
+        """Yield chapters as each index page downloads"""
+        for index_url in self.get_index_pages(url):
+            yield from self._iter_index_page(index_url)
+    
+    def _iter_index_page(self, index_url: str) -> Iterator[Dict[str, Any]]:
+        """Yield the chapters of one index page while it is parsed"""
+        # Chapters are the items of the second 'ul.p2' in 'div.info_chapters', the first lists the latest ones
+        chapter_list = None
+        lists_seen = 0
+        for event, element in scrape_util.iter_parse(index_url, events=("start", "end"), tags=("ul", "li"), encoding=self.encoding):
+            if event == "start":
+                if element.tag == "ul" and self.engine.matches(element, "div.info_chapters ul.p2"):
+                    lists_seen += 1
+                    if lists_seen == 2:
+                        chapter_list = element
+                continue
+            if element.tag != "li" or chapter_list is None or chapter_list not in element.iterancestors("ul"):
+                continue
+            try:
+                link = self.engine.select(element, "a")[0]
+                yield {
+                    "type": "chapter",
+                    "url": f"{self.base_url}{link.get('href')}",
+                    "title": element_text(link).strip()
+                }
+            except Exception as e:
+                raise ValueError(f"Failed to extract chapter URLs: {str(e)}")
+        
+        if chapter_list is None:
+            raise ValueError("Failed to extract chapter URLs: chapter list not found")
+    
     def get_chapter_content(self, chapter_url: str) -> Dict[str, Any]:
         """Get content from a chapter URL"""
-        page = scrape_util.scrape_url(chapter_url)
-        
+        return scrape_util.scrape_with(chapter_url, extract_chapter, encoding=self.encoding)
+    
+    async def get_chapter_content_async(self, chapter_url: str) -> Dict[str, Any]:
+        """Get content from a chapter URL without blocking the event loop on I/O"""
+        return await scrape_util.scrape_with_async(chapter_url, extract_chapter, encoding=self.encoding)
+    
+    @classmethod
+    def _parse_chapter_content(cls, page, chapter_url: str) -> Dict[str, Any]:
+        """Extract chapter title and text from a chapter page parsed by lxml"""
         try:
             # Extract chapter title
-            chapter_title = page.select("h2")[0].text.strip()
+            chapter_title = element_text(cls.engine.select(page, "h2")[0]).strip()
             
             # Extract chapter content
-            content_elem = page.select("div.novelcontent")[0]
+            content_elem = cls.engine.select(page, "div.novelcontent")[0]
             chapter_content = scrape_util.html_to_text(content_elem).strip()
             
             return {
@@ -94,4 +148,9 @@ class Scraper69Shu(NovelScraper):
                 "url": chapter_url
             }
         except Exception as e:
-            raise ValueError(f"Failed to extract chapter content: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Failed to extract chapter content: {str(e)}")
+
+
+def extract_chapter(response, chapter_url: str) -> Dict[str, Any]:
+    """Extract a chapter from its fetched page; module level so scrape_util's parse pool can run it"""
+    return Scraper69Shu._parse_chapter_content(response.tree(), chapter_url)
@@ -10,10 +10,21 @@ sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__f
 
 from interfaces import NovelScraper
 from scrape_util import scrape_util
+from parse_filter import ParseOnly
 
 class ScraperQuanben(NovelScraper):
     """Scraper for Quanben novels"""
     
+    # Pages are GBK; most declare it, this covers the ones that do not
+    encoding = "gbk"
+    
+    # Watermarks and promo lines found in chapter text
+    boilerplate = ("全本小说网", "quanben.io", "www.quanben.io", "ｗｗｗ．ｑｕａｎｂｅｎ．ｉｏ")
+    boilerplate_lines = ("请记住本站域名", "天才一秒记住", "手机版阅读网址", "全本小说网最新章节", "本章未完，请点击下一页继续阅读")
+    
+    # Chapter pages only need their headline and body
+    parse_only = ParseOnly("h1.headline", "div.articlebody")
+    
     def __init__(self, **kwargs):
         """Initialize the scraper"""
         super().__init__(**kwargs)
@@ -30,7 +41,7 @@ class ScraperQuanben(NovelScraper):
     
     def get_novel_info(self, url: str) -> Dict[str, Any]:
         """Get basic novel information"""
-        page = scrape_util.scrape_url(url, "xml")
+        page = scrape_util.scrape_url(url, "xml", encoding=self.encoding)
         
         try:
             # Extract novel information
@@ -74,7 +85,7 @@ class ScraperQuanben(NovelScraper):
     
     def get_chapter_urls(self, index_url: str) -> List[str]:
         """Get list of chapter URLs from an index page"""
-        page = scrape_util.scrape_url(index_url, "xml")
+        page = scrape_util.scrape_url(index_url, "xml", encoding=self.encoding)
         
         try:
             # For Quanben, we need to determine the pattern of chapter URLs
@@ -106,8 +117,15 @@ class ScraperQuanben(NovelScraper):
     
     def get_chapter_content(self, chapter_url: str) -> Dict[str, Any]:
         """Get content from a chapter URL"""
-        page = scrape_util.scrape_url(chapter_url)
-        
+        return scrape_util.scrape_with(chapter_url, extract_chapter, encoding=self.encoding)
+    
+    async def get_chapter_content_async(self, chapter_url: str) -> Dict[str, Any]:
+        """Get content from a chapter URL without blocking the event loop on I/O"""
+        return await scrape_util.scrape_with_async(chapter_url, extract_chapter, encoding=self.encoding)
+    
+    @classmethod
+    def _parse_chapter_content(cls, page, chapter_url: str) -> Dict[str, Any]:
+        """Extract chapter title and text from a parsed chapter page"""
         try:
             # Extract chapter title and content
             chapter_title = page.select("h1.headline")[0].text.strip() if page.select("h1.headline") else "Unknown Chapter"
@@ -124,4 +142,9 @@ class ScraperQuanben(NovelScraper):
                 "url": chapter_url
             }
         except Exception as e:
-            raise ValueError(f"Failed to extract chapter content: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Failed to extract chapter content: {str(e)}")
+
+
+def extract_chapter(response, chapter_url: str) -> Dict[str, Any]:
+    """Extract a chapter from its fetched page; module level so scrape_util's parse pool can run it"""
+    return ScraperQuanben._parse_chapter_content(response.soup("lxml", ScraperQuanben.parse_only), chapter_url)
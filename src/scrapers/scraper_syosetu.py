@@ -4,7 +4,8 @@ Scraper implementation for Syosetu (Japanese novel site)
 
 import os
 import sys
-from typing import Any, Dict, List
+from typing import Any, Dict, Generator, Iterator, List
+from urllib.parse import urlsplit
 
 # Add correct path for imports
 sys.path.append(
@@ -13,11 +14,35 @@ sys.path.append(
 
 from interfaces import NovelScraper
 from scrape_util import scrape_util
+from lxml_engine import LxmlEngine, element_text
+from selector_chain import SelectorChain
 
 
 class ScraperSyosetu(NovelScraper):
     """Scraper for Syosetu (Japanese novel site)"""
 
+    # Chapter pages are parsed with lxml; selectors are compiled once for all instances
+    engine = LxmlEngine()
+
+    # Old and new page layouts; each chain learns which one the host serves
+    author_chain = SelectorChain(
+        "syosetu.author",
+        "div.novel_writername a",
+        "div.novel_writername",
+        "div.p-novel__author a",
+        "div.p-novel__author",
+        ".p-eplist__author",
+    )
+    chapter_link_chain = SelectorChain(
+        "syosetu.chapter_links", "a.subtitle", "a.p-eplist__subtitle", "dl.novel_sublist2 a"
+    )
+    chapter_title_chain = SelectorChain(
+        "syosetu.chapter_title", ".novel_subtitle", ".p-novel__subtitle", "h1.novel_title", "h2.novel_subtitle"
+    )
+    chapter_content_chain = SelectorChain(
+        "syosetu.chapter_content", "#novel_honbun", "#novel_color", ".novel_view", ".p-novel__body", ".p-novel_main"
+    )
+
     def __init__(self, **kwargs):
         """Initialize the scraper"""
         super().__init__(**kwargs)
@@ -51,26 +76,11 @@ class ScraperSyosetu(NovelScraper):
                 )
 
             # Extract author
-            author_selectors = [
-                "div.novel_writername a",
-                "div.novel_writername",
-                "div.p-novel__author a",
-                "div.p-novel__author",
-                ".p-eplist__author",
-            ]
-            
-            author = "Unknown Author"
-            for selector in author_selectors:
-                elements = page.select(selector)
-                if elements:
-                    author_text = elements[0].text.strip()
-                    # Clean up common prefixes
-                    for prefix in ["作者：", "作者:", "Author:", "Author："]:
-                        if author_text.startswith(prefix):
-                            author_text = author_text[len(prefix):].strip()
-                    if author_text:
-                        author = author_text
-                        break
+            # An element left empty once its prefix is removed does not count
+            author_elem = self.author_chain.select_one(
+                page, urlsplit(url).netloc, predicate=lambda elem: bool(self._author_text(elem))
+            )
+            author = self._author_text(author_elem) if author_elem is not None else "Unknown Author"
 
             # Extract description
             description_elem = page.select("div#novel_ex")
@@ -90,6 +100,16 @@ class ScraperSyosetu(NovelScraper):
         except Exception as e:
             raise ValueError(f"Failed to extract novel info: {str(e)}")
 
+    @staticmethod
+    def _author_text(author_elem) -> str:
+        """Author name in an element, without its label"""
+        author_text = author_elem.text.strip()
+        # Clean up common prefixes
+        for prefix in ["作者：", "作者:", "Author:", "Author："]:
+            if author_text.startswith(prefix):
+                author_text = author_text[len(prefix):].strip()
+        return author_text
+
     def get_index_pages(self, url: str) -> List[str]:
         """Get list of index pages containing chapter links"""
         page = scrape_util.scrape_url(url, "html.parser")
@@ -116,11 +136,7 @@ class ScraperSyosetu(NovelScraper):
         page = scrape_util.scrape_url(index_url, "html.parser")
 
         try:
-            chapter_links = (
-                page.select("a.subtitle")
-                or page.select("a.p-eplist__subtitle")
-                or page.select("dl.novel_sublist2 a")
-            )
+            chapter_links = self.chapter_link_chain.select(page, urlsplit(index_url).netloc)
 
             return [
                 f"{self.base_url}{link['href']}"
@@ -132,95 +148,98 @@ class ScraperSyosetu(NovelScraper):
 
     def get_index_structure(self, url: str) -> List[Dict[str, Any]]:
         """Get the hierarchical structure of the novel (parts and chapters)"""
-        index_pages = self.get_index_pages(url)
-        structure = []
-
-        for index_url in index_pages:
-            page = scrape_util.scrape_url(index_url, "html.parser")
-            
-            # Find all potential index items (chapters and parts)
-            # In Syosetu, parts are 'div.chapter_title' and chapters are 'dl.novel_sublist2'
-            # Or in the newer layout, they might be different
-            
-            # Use a more general approach: iterate through children of the index box
-            index_box = page.select_one("div.index_box") or page.select_one("div.p-eplist")
-            
-            if not index_box:
-                # Fallback to the old method if we can't find the container
-                chapter_urls = self.get_chapter_urls(index_url)
-                for curl in chapter_urls:
-                    structure.append({"type": "chapter", "url": curl, "title": ""})
+        return list(self.iter_index_structure(url))
+
+    def iter_index_structure(self, url: str) -> Iterator[Dict[str, Any]]:
+        """Yield parts and chapters as each index page downloads; the first page tells how many follow"""
+        last_page = yield from self._iter_index_page(url)
+
+        if url.endswith("/"):
+            url = url[:-1]
+        for i in range(last_page - 1):
+            yield from self._iter_index_page(f"{url}/?p={i + 2}")
+
+    def _iter_index_page(self, index_url: str) -> Generator[Dict[str, Any], None, int]:
+        """Yield the parts and chapters of one index page while it is parsed; returns the pager's last page"""
+        last_page = 0
+        has_index_box = False
+
+        # In Syosetu, parts are 'div.chapter_title' and chapters are 'dl.novel_sublist2'
+        # in the children of 'div.index_box'; the newer layout uses 'div.p-eplist'
+        for _, element in scrape_util.iter_parse(index_url, tags=("a", "div", "dl")):
+            classes = element.get("class", "").split()
+            if element.tag == "a":
+                if "c-pager__item--last" in classes and self.engine.matches(element, "div.c-pager a"):
+                    try:
+                        last_page = int(element.get("href").split("=")[-1])
+                    except Exception as e:
+                        raise ValueError(f"Failed to extract index pages: {str(e)}")
+                continue
+
+            if element.tag == "div" and ("index_box" in classes or "p-eplist" in classes):
+                has_index_box = True
+                continue
+
+            parent = element.getparent()
+            parent_classes = parent.get("class", "").split() if parent is not None and parent.tag == "div" else []
+            if "index_box" not in parent_classes and "p-eplist" not in parent_classes:
                 continue
 
-            for element in index_box.children:
-                if element.name == "div" and ("chapter_title" in element.get("class", []) or "p-eplist__chapter-title" in element.get("class", [])):
-                    structure.append({
-                        "type": "volume",
-                        "title": element.text.strip()
-                    })
-                elif element.name == "dl" and ("novel_sublist2" in element.get("class", [])):
-                    link = element.select_one("a")
-                    if link and "href" in link.attrs:
-                        structure.append({
-                            "type": "chapter",
-                            "url": f"{self.base_url}{link['href']}",
-                            "title": link.text.strip()
-                        })
-                elif element.name == "div" and ("p-eplist__sublist" in element.get("class", [])):
-                    link = element.select_one("a.p-eplist__subtitle")
-                    if link and "href" in link.attrs:
-                        structure.append({
-                            "type": "chapter",
-                            "url": f"{self.base_url}{link['href']}",
-                            "title": link.text.strip()
-                        })
-
-        return structure
+            if element.tag == "div" and ("chapter_title" in classes or "p-eplist__chapter-title" in classes):
+                yield {
+                    "type": "volume",
+                    "title": element_text(element).strip()
+                }
+            elif (element.tag == "dl" and "novel_sublist2" in classes) or (element.tag == "div" and "p-eplist__sublist" in classes):
+                link = self.engine.select_one(element, "a" if element.tag == "dl" else "a.p-eplist__subtitle")
+                if link is not None and link.get("href") is not None:
+                    yield {
+                        "type": "chapter",
+                        "url": f"{self.base_url}{link.get('href')}",
+                        "title": element_text(link).strip()
+                    }
+
+        if not has_index_box:
+            # Fallback to the old method if we can't find the container
+            for curl in self.get_chapter_urls(index_url):
+                yield {"type": "chapter", "url": curl, "title": ""}
+
+        return last_page
 
     def get_chapter_content(self, chapter_url: str) -> Dict[str, Any]:
         """Get content from a chapter URL"""
-        page = scrape_util.scrape_url(chapter_url)
+        return scrape_util.scrape_with(chapter_url, extract_chapter)
+
+    async def get_chapter_content_async(self, chapter_url: str) -> Dict[str, Any]:
+        """Get content from a chapter URL without blocking the event loop on I/O"""
+        return await scrape_util.scrape_with_async(chapter_url, extract_chapter)
 
+    @classmethod
+    def _parse_chapter_content(cls, page, chapter_url: str) -> Dict[str, Any]:
+        """Extract chapter title and text from a chapter page parsed by lxml"""
         try:
-            # Try multiple possible selectors for chapter title
-            title_selectors = [
-                ".novel_subtitle",
-                ".p-novel__subtitle",
-                "h1.novel_title",
-                "h2.novel_subtitle",
-            ]
+            host = urlsplit(chapter_url).netloc
 
+            # Try multiple possible selectors for chapter title
             chapter_title = ""
-            for selector in title_selectors:
-                elements = page.select(selector)
-                if elements:
-                    chapter_title = elements[0].text.strip()
-                    break
+            title_element = cls.chapter_title_chain.select_one(page, host)
+            if title_element is not None:
+                chapter_title = element_text(title_element).strip()
 
             # If still no title found, try to get it from the URL or page title
             if not chapter_title:
                 # Try to get from page title
-                title_element = page.select("title")
-                if title_element:
-                    full_title = title_element[0].text.strip()
+                title_element = cls.engine.select_one(page, "title")
+                if title_element is not None:
+                    full_title = element_text(title_element).strip()
                     if " - " in full_title:
                         chapter_title = full_title.split(" - ")[1]
 
             # Try multiple possible selectors for chapter content
-            content_selectors = [
-                "#novel_honbun",
-                "#novel_color",
-                ".novel_view",
-                ".p-novel__body",
-                ".p-novel_main",
-            ]
-
             chapter_content = ""
-            for selector in content_selectors:
-                elements = page.select(selector)
-                if elements:
-                    chapter_content = scrape_util.html_to_text(elements[0])
-                    break
+            content_element = cls.chapter_content_chain.select_one(page, host)
+            if content_element is not None:
+                chapter_content = scrape_util.html_to_text(content_element)
 
             if not chapter_title or not chapter_content:
                 raise ValueError("Could not find chapter title or content")
@@ -232,3 +251,8 @@ class ScraperSyosetu(NovelScraper):
             }
         except Exception as e:
             raise ValueError(f"Failed to extract chapter content: {str(e)}")
+
+
+def extract_chapter(response, chapter_url: str) -> Dict[str, Any]:
+    """Extract a chapter from its fetched page; module level so scrape_util's parse pool can run it"""
+    return ScraperSyosetu._parse_chapter_content(response.tree(), chapter_url)
@@ -2,7 +2,6 @@
 Scraper implementation for Ximalaya audio novels
 """
 from typing import Dict, List, Any
-import json
 import sys
 import os
 
@@ -31,7 +30,8 @@ class ScraperXimalaya(AudioNovelScraper):
     
     def get_novel_info(self, url: str) -> Dict[str, Any]:
         """Get basic novel information"""
-        page = scrape_util.scrape_url(url)
+        # Visit the album page first, as a browser would; its body is not needed
+        scrape_util.fetch(url)
         
         try:
             # Extract album ID from URL
@@ -39,7 +39,7 @@ class ScraperXimalaya(AudioNovelScraper):
             
             # Get album info from the API
             album_api_url = f"{self.base_url}/revision/album/v1/getAlbumDetailInfo?albumId={album_id}"
-            album_data = json.loads(scrape_util.scrape_url(album_api_url).text)
+            album_data = scrape_util.fetch(album_api_url).json()
             
             title = album_data.get("data", {}).get("mainInfo", {}).get("albumTitle", "Unknown Title")
             author = album_data.get("data", {}).get("anchorInfo", {}).get("anchorName", "Unknown Author")
@@ -83,9 +83,9 @@ class ScraperXimalaya(AudioNovelScraper):
             # API has pagination; we need to keep requesting until no more tracks
             while True:
                 api_url = f"{self.base_url}/revision/album/v1/getTracksList?albumId={album_id}&pageNum={page_number}&sort=1&pageSize=30"
-                response = scrape_util.scrape_url(api_url)
+                response = scrape_util.fetch(api_url)
                 
-                tracks = json.loads(response.text).get("data", {}).get("tracks", [])
+                tracks = response.json().get("data", {}).get("tracks", [])
                 if not tracks:
                     break
                     
@@ -106,8 +106,9 @@ class ScraperXimalaya(AudioNovelScraper):
         try:
             # Get track details from API
             api_url = f"{self.base_url}/tracks/{chapter_url}.json"
-            response = scrape_util.scrape_url(api_url, cookies=self.authentication_cookies)
-            metadata = json.loads(response.text)
+            response = scrape_util.fetch(api_url, cookies=self.authentication_cookies)
+            response.raise_for_status()
+            metadata = response.json()
             
             audio_url = metadata.get("play_path", "")
             title = metadata.get("title", f"Chapter_{chapter_url}")
@@ -0,0 +1,137 @@
+"""
+Selector fallback chains that learn which selector a site uses.
+
+Scrapers try several selectors in order because sites change layouts, but
+a given site (or novel) almost always matches the same one. A SelectorChain
+remembers the selector that matched for a key (a host or a novel) and tries
+it first on later pages. When it misses, the remaining candidates are
+evaluated in a single traversal of the page instead of one per selector.
+Works on BeautifulSoup pages and on lxml trees.
+"""
+
+import threading
+from typing import Callable, Dict, Any, List, Optional
+
+from lxml_engine import LxmlEngine, is_lxml_element
+
+_engine = LxmlEngine()
+
+# Every chain, by name, so their statistics can be reported together
+_chains: Dict[str, "SelectorChain"] = {}
+_chains_lock = threading.Lock()
+
+
+class SelectorChain:
+    """
+    Ordered fallback selectors with a learned winner per key.
+
+    Without a learned winner the result is the one trying the selectors in
+    order would give. Once a selector has won for a key it is preferred for
+    that key, even on a page where an earlier candidate would also match.
+    """
+
+    def __init__(self, name: str, *selectors: str):
+        """
+        Initialize the chain.
+
+        Args:
+            name: Name the chain's statistics are reported under
+            *selectors: Candidate CSS selectors, most preferred first
+        """
+        self.name = name
+        self.selectors = selectors
+        self.learned_hits = 0
+        self.fallbacks = 0
+        self.misses = 0
+        self.wins: Dict[str, int] = {selector: 0 for selector in selectors}
+        self._winners: Dict[Optional[str], str] = {}
+        self._lock = threading.Lock()
+        with _chains_lock:
+            _chains[name] = self
+
+    def select_one(self,
+                   page: Any,
+                   key: Optional[str] = None,
+                   predicate: Optional[Callable[[Any], bool]] = None) -> Optional[Any]:
+        """
+        Return the first element matched by the chain, or None.
+
+        Args:
+            page: BeautifulSoup page or lxml tree
+            key: What the learned selector is remembered for, e.g. the host
+            predicate: Test the first element of a selector must pass, e.g. having
+                text; when it fails the next selector is tried
+        """
+        matches = self._select(page, key, first_only=True, predicate=predicate)
+        return matches[0] if matches else None
+
+    def select(self, page: Any, key: Optional[str] = None) -> List[Any]:
+        """Return every element matched by the winning selector, or an empty list"""
+        return self._select(page, key, first_only=False)
+
+    def _select(self,
+                page: Any,
+                key: Optional[str],
+                first_only: bool,
+                predicate: Optional[Callable[[Any], bool]] = None) -> List[Any]:
+        lxml = is_lxml_element(page)
+        winner = self._winners.get(key)
+        if winner is not None:
+            matches = self._run(page, winner, lxml)
+            if matches and (predicate is None or predicate(matches[0])):
+                with self._lock:
+                    self.learned_hits += 1
+                    self.wins[winner] += 1
+                return matches
+
+        # One traversal for every remaining candidate; the union comes back in
+        # document order, so the first match of each candidate is easy to find
+        candidates = [selector for selector in self.selectors if selector != winner]
+        union = self._run(page, ", ".join(candidates), lxml)
+        chosen = None
+        for selector in candidates:
+            first = next((element for element in union if self._matches(element, selector, lxml)), None)
+            if first is not None and (predicate is None or predicate(first)):
+                chosen = selector
+                break
+
+        with self._lock:
+            if chosen is None:
+                self.misses += 1
+                return []
+            self.fallbacks += 1
+            self.wins[chosen] += 1
+            self._winners[key] = chosen
+        if first_only:
+            return [next(element for element in union if self._matches(element, chosen, lxml))]
+        return [element for element in union if self._matches(element, chosen, lxml)]
+
+    @staticmethod
+    def _run(page: Any, selector: str, lxml: bool) -> List[Any]:
+        if lxml:
+            return _engine.select(page, selector)
+        return page.select(selector)
+
+    @staticmethod
+    def _matches(element: Any, selector: str, lxml: bool) -> bool:
+        if lxml:
+            return _engine.matches(element, selector)
+        return element.css.match(selector)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return how often the learned selector hit, the chain fell back or nothing matched"""
+        with self._lock:
+            return {
+                "learned_hits": self.learned_hits,
+                "fallbacks": self.fallbacks,
+                "misses": self.misses,
+                "wins": {selector: count for selector, count in self.wins.items() if count},
+                "learned": dict(self._winners),
+            }
+
+
+def selector_stats() -> Dict[str, Dict[str, Any]]:
+    """Return the statistics of every chain, by name"""
+    with _chains_lock:
+        chains = list(_chains.values())
+    return {chain.name: chain.stats() for chain in chains}
@@ -0,0 +1,73 @@
+"""
+Incremental parsing of pages while they download.
+
+Index pages listing hundreds of chapters take a while to arrive. Instead of
+waiting for the whole body, iter_parse feeds each chunk to lxml's
+HTMLPullParser as it comes in and yields elements as soon as their end tag
+has been parsed, so callers can act on the first entries while the rest of
+the page is still on the wire.
+"""
+
+import codecs
+from itertools import chain
+from typing import Iterable, Iterator, Optional, Sequence, Tuple
+
+from lxml import etree
+
+from response import SNIFF_BYTES, normalize_charset, sniff_charset
+
+
+def iter_parse(chunks: Iterable[bytes],
+               events: Sequence[str] = ("end",),
+               tags: Optional[Sequence[str]] = None,
+               default_encoding: Optional[str] = None,
+               header_encoding: Optional[str] = None) -> Iterator[Tuple[str, etree._Element]]:
+    """
+    Parse an HTML body chunk by chunk, yielding parser events like lxml's iterparse.
+
+    The charset is chosen in Response.encoding's order: header_encoding, then
+    one sniffed from the first SNIFF_BYTES of the body, then default_encoding,
+    then UTF-8.
+    An element from an "end" event is complete, with all its descendants;
+    its ancestors and following siblings are not yet.
+
+    Args:
+        chunks: Decoded (decompressed) body chunks, e.g. from scrape_util.iter_decoded
+        events: Parser events to report, "start" and/or "end"
+        tags: Tag names to report events for, None for every tag
+        default_encoding: Charset the site is known to use
+        header_encoding: Charset of the Content-Type header, see response.header_charset
+
+    Returns:
+        Iterator of (event, element) pairs
+    """
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= SNIFF_BYTES:
+            break
+    encoding = (normalize_charset(header_encoding)
+                or sniff_charset(head)
+                or normalize_charset(default_encoding)
+                or "utf-8")
+
+    # Decode here rather than in libxml2, so charsets are read exactly as Response.text reads them
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    parser = etree.HTMLPullParser(events=events, tag=tags)
+    fed = False
+    for chunk in chain((head,), chunks):
+        text = decoder.decode(chunk)
+        if text:
+            parser.feed(text)
+            fed = True
+            yield from parser.read_events()
+    text = decoder.decode(b"", final=True)
+    if text:
+        parser.feed(text)
+        fed = True
+    if not fed:
+        # An empty body has no elements; lxml would raise for it
+        return
+    parser.close()
+    yield from parser.read_events()
@@ -0,0 +1,281 @@
+"""
+Text post-processing of scraped chapters.
+
+A TextPipeline runs a chapter's content through a list of TextStages
+between get_chapter_content and the adapter, in the coordinator's worker
+threads. Stages compile their rules once, when they are created, and are
+then shared by every thread; each stage handles a chapter in one pass. The
+pipeline measures how much text each stage has processed and how fast.
+"""
+
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Tuple
+
+
+class TextStage(ABC):
+    """One transformation of chapter text"""
+
+    # Name the stage's statistics are reported under
+    name = "stage"
+
+    @abstractmethod
+    def apply(self, text: str) -> str:
+        """Return the transformed text"""
+        pass
+
+
+# Characters that take no space and only get in the way of readers and search
+ZERO_WIDTH = "\u200b\u200c\u200d\u2060\ufeff\u00ad"
+
+# Line breaks str.splitlines knows besides "\n" ("\r\n" is one too)
+LINE_BREAKS = "\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+# Every other character str.split treats as a space (ideographic and no-break ones included)
+SPACES = "".join(char for char in map(chr, range(0x3001))
+                 if char.isspace() and char not in LINE_BREAKS and char not in "\n ")
+
+
+class Normalizer(TextStage):
+    """
+    Folds full-width ASCII, drops zero-width characters, unifies newlines and
+    collapses runs of spaces and blank lines.
+
+    Every single-character rule is compiled into one translation table,
+    applied with a single str.translate call; only the rules spanning
+    several characters (\r\n, runs of spaces and of blank lines) are
+    compiled regexes. The table is a list indexed by code point rather than
+    str.maketrans' dict: str.translate looks up every character of the
+    text, and indexing a list is about three times faster on CJK text.
+    Characters past its end are left as they are.
+    """
+
+    name = "normalize"
+
+    def __init__(self,
+                 fold_alphanumerics: bool = True,
+                 fold_punctuation: bool = False,
+                 strip_zero_width: bool = True,
+                 collapse_spaces: bool = True,
+                 max_blank_lines: int = 1):
+        """
+        Initialize the normalizer.
+
+        Args:
+            fold_alphanumerics: Turn full-width letters and digits into ASCII ones
+            fold_punctuation: Also turn full-width punctuation (，！？ ...) into ASCII;
+                off by default since it is the normal punctuation of Chinese text
+            strip_zero_width: Remove zero-width spaces, joiners, BOMs and soft hyphens
+            collapse_spaces: Turn every run of spaces (ideographic and no-break
+                ones included) into one space and strip lines; paragraph indents go too
+            max_blank_lines: Longest run of blank lines kept
+        """
+        self.collapse_spaces = collapse_spaces
+        self.max_blank_lines = max_blank_lines
+        mapping: Dict[str, str] = {char: "\n" for char in LINE_BREAKS}
+        for code in range(0xFF01, 0xFF5F):
+            char = chr(code - 0xFEE0)
+            if char.isalnum() and fold_alphanumerics or not char.isalnum() and fold_punctuation:
+                mapping[chr(code)] = char
+        if strip_zero_width:
+            mapping.update({char: "" for char in ZERO_WIDTH})
+        if collapse_spaces:
+            mapping.update({char: " " for char in SPACES})
+        translation = str.maketrans(mapping)
+        self.table: List[Any] = list(range(max(translation) + 1))
+        for code, replacement in translation.items():
+            self.table[code] = replacement
+        # \r\n is one line break, even with removed characters in between;
+        # a lone \r is one too, in the table
+        self._crlf = re.compile("\r[%s]*\n" % ZERO_WIDTH if strip_zero_width else "\r\n")
+        # Spaces around a line break go, other runs of spaces become one
+        self._line_spaces = re.compile(r" *\n *")
+        self._spaces = re.compile(r" {2,}")
+        self._blank_lines = re.compile("\n{%d,}" % (max_blank_lines + 2))
+
+    def apply(self, text: str) -> str:
+        if "\r" in text:
+            text = self._crlf.sub("\n", text)
+        text = text.translate(self.table)
+        if self.collapse_spaces:
+            text = self._spaces.sub(" ", self._line_spaces.sub("\n", text)).strip(" \n")
+        else:
+            text = text.strip("\n")
+        return self._blank_lines.sub("\n" * (self.max_blank_lines + 1), text)
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """Regex matching any of the words, shaped as their prefix trie"""
+    trie: Dict[str, Any] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = None
+    return _trie_node_regex(trie)
+
+
+def _trie_node_regex(node: Dict[str, Any]) -> str:
+    branches = [re.escape(char) + _trie_node_regex(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    regex = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        # A word ends here; the longer words are tried first
+        regex = "(?:" + regex + ")?"
+    return regex
+
+
+def _cut(text: str, spans: List[Tuple[int, int]]) -> str:
+    """Text without the (start, end) spans, which are in order and do not overlap"""
+    if not spans:
+        return text
+    pieces = []
+    position = 0
+    for start, end in spans:
+        pieces.append(text[position:start])
+        position = end
+    pieces.append(text[position:])
+    return "".join(pieces)
+
+
+class BoilerplateStripper(TextStage):
+    """
+    Removes the watermarks and promo lines a site injects into chapter text.
+
+    Literal patterns are cut out of the text; line patterns take the whole
+    line they appear on with them. Each kind is compiled into a single
+    regex shaped as its prefix trie, so a chapter is scanned once for the
+    line patterns and once for the literals whatever the number of
+    patterns, where one scan per pattern grows with every pattern added.
+    Lines go first, so a literal overlapping a line pattern cannot hide it;
+    among literals, at each position the longest pattern wins.
+    """
+
+    name = "boilerplate"
+
+    def __init__(self, patterns: Iterable[str] = (), line_patterns: Iterable[str] = ()):
+        """
+        Initialize the stripper.
+
+        Args:
+            patterns: Strings removed wherever they appear
+            line_patterns: Strings whose whole line is removed
+        """
+        self.patterns: Tuple[str, ...] = tuple(dict.fromkeys(pattern for pattern in patterns if pattern))
+        self.line_patterns: Tuple[str, ...] = tuple(dict.fromkeys(pattern for pattern in line_patterns if pattern))
+        self._regex = re.compile(_trie_regex(self.patterns)) if self.patterns else None
+        self._line_regex = re.compile(_trie_regex(self.line_patterns)) if self.line_patterns else None
+        self._hits: Dict[str, int] = {word: 0 for word in self.patterns + self.line_patterns}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_scraper(cls, scraper) -> "BoilerplateStripper":
+        """Stripper for the patterns a scraper declares"""
+        return cls(scraper.boilerplate, scraper.boilerplate_lines)
+
+    def apply(self, text: str) -> str:
+        hits: Dict[str, int] = {}
+        if self._line_regex is not None:
+            text = _cut(text, self._line_spans(text, hits))
+        if self._regex is not None:
+            text = _cut(text, self._literal_spans(text, hits))
+        if hits:
+            with self._lock:
+                for pattern, count in hits.items():
+                    self._hits[pattern] += count
+        return text
+
+    def _line_spans(self, text: str, hits: Dict[str, int]) -> List[Tuple[int, int]]:
+        """(start, end) of the lines holding a line pattern, newline included"""
+        spans: List[Tuple[int, int]] = []
+        search = self._line_regex.search
+        position = 0
+        while True:
+            match = search(text, position)
+            if match is None:
+                return spans
+            pattern = match.group()
+            hits[pattern] = hits.get(pattern, 0) + 1
+            start = text.rfind("\n", 0, match.start()) + 1
+            end = text.find("\n", match.end())
+            end = len(text) if end < 0 else end + 1
+            spans.append((start, end))
+            # The rest of the line goes with it
+            position = end
+
+    def _literal_spans(self, text: str, hits: Dict[str, int]) -> List[Tuple[int, int]]:
+        """(start, end) of the literal patterns"""
+        spans: List[Tuple[int, int]] = []
+        for match in self._regex.finditer(text):
+            pattern = match.group()
+            hits[pattern] = hits.get(pattern, 0) + 1
+            spans.append(match.span())
+        return spans
+
+    def hits(self) -> Dict[str, int]:
+        """Return how many times each pattern was removed, for the patterns seen at least once"""
+        with self._lock:
+            return {pattern: count for pattern, count in self._hits.items() if count}
+
+
+class TextPipeline:
+    """Runs chapter content through a sequence of stages and keeps per-stage statistics"""
+
+    def __init__(self, *stages: TextStage):
+        """
+        Initialize the pipeline.
+
+        Args:
+            *stages: Stages applied in order
+        """
+        self.stages: List[TextStage] = list(stages)
+        self._bytes: Dict[str, int] = {stage.name: 0 for stage in self.stages}
+        self._seconds: Dict[str, float] = {stage.name: 0.0 for stage in self.stages}
+        self.chapters = 0
+        self._lock = threading.Lock()
+
+    def add(self, stage: TextStage) -> "TextPipeline":
+        """Append a stage, returns the pipeline"""
+        self.stages.append(stage)
+        with self._lock:
+            self._bytes.setdefault(stage.name, 0)
+            self._seconds.setdefault(stage.name, 0.0)
+        return self
+
+    def apply(self, text: str) -> str:
+        """Run text through every stage"""
+        size = len(text.encode("utf-8"))
+        timings = []
+        for stage in self.stages:
+            start = time.perf_counter()
+            text = stage.apply(text)
+            timings.append(time.perf_counter() - start)
+        with self._lock:
+            self.chapters += 1
+            for stage, elapsed in zip(self.stages, timings):
+                self._bytes[stage.name] += size
+                self._seconds[stage.name] += elapsed
+        return text
+
+    def process(self, chapter: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the chapter dict with its content run through the pipeline"""
+        if not self.stages or not chapter.get("content"):
+            return chapter
+        chapter = dict(chapter)
+        chapter["content"] = self.apply(chapter["content"])
+        return chapter
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return the MB processed, the time spent and the throughput of each stage"""
+        with self._lock:
+            return {
+                name: {
+                    "mb": self._bytes[name] / 1024 / 1024,
+                    "seconds": self._seconds[name],
+                    "mb_per_s": self._bytes[name] / 1024 / 1024 / self._seconds[name] if self._seconds[name] else 0.0,
+                }
+                for name in self._bytes
+            }
@@ -1,13 +1,19 @@
+import logging
+import queue
 import threading
-from typing import List, Dict, Any, Callable, Optional
+import time
+from itertools import islice
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple
 from abc import ABC, abstractmethod
 
+logger = logging.getLogger("threading_utils")
+
 class ThreadingManager(ABC):
     """Abstract base class for threading managers"""
     
     @abstractmethod
     def process_in_parallel(self, 
-                          items: List[Any], 
+                          items: Iterable[Any], 
                           process_func: Callable[[Any, int], Any],
                           chunk_handler: Optional[Callable[[int, List[Any], Dict[int, Any]], List[Any]]] = None,
                           max_threads: int = 6) -> List[Any]:
@@ -18,15 +24,18 @@ class BatchProcessor(ThreadingManager):
     """Processes items in batches using multiple threads"""
     
     def process_in_parallel(self, 
-                          items: List[Any], 
+                          items: Iterable[Any], 
                           process_func: Callable[[Any, int], Any],
                           chunk_handler: Optional[Callable[[int, List[Any], Dict[int, Any]], List[Any]]] = None,
                           max_threads: int = 6) -> List[Any]:
         """
-        Process a list of items in parallel using multiple threads.
+        Process items in parallel using multiple threads.
+        
+        Items may come from a generator: each chunk starts as soon as its
+        items are available, without waiting for the rest.
         
         Args:
-            items: List of items to process
+            items: Items to process
             process_func: Function to process each item, takes (item, index) and returns result
             chunk_handler: Optional function to handle batch results, takes (chunk_start_index, chunk, results_dict)
             max_threads: Maximum number of threads to use
@@ -74,9 +83,202 @@ class BatchProcessor(ThreadingManager):
         """Worker function for each thread"""
         results[index] = process_func(item, index)
     
-    def _divide_chunks(self, items: List[Any], chunk_size: int) -> List[List[Any]]:
-        """Divide a list into chunks of specified size"""
-        chunks = []
-        for i in range(0, len(items), chunk_size):
-            chunks.append(items[i:i + chunk_size])
-        return chunks
\ No newline at end of file
+    def _divide_chunks(self, items: Iterable[Any], chunk_size: int) -> Iterator[List[Any]]:
+        """Divide items into chunks of specified size, taking each chunk as its items arrive"""
+        items = iter(items)
+        chunk = list(islice(items, chunk_size))
+        while chunk:
+            yield chunk
+            chunk = list(islice(items, chunk_size))
+
+
+class WorkQueueProcessor(ThreadingManager):
+    """Processes items on a fixed set of worker threads fed from a queue"""
+    
+    def process_in_parallel(self, 
+                          items: Iterable[Any], 
+                          process_func: Callable[[Any, int], Any],
+                          chunk_handler: Optional[Callable[[int, List[Any], Dict[int, Any]], List[Any]]] = None,
+                          max_threads: int = 6,
+                          item_handler: Optional[Callable[[int, float], None]] = None) -> List[Any]:
+        """
+        Process items in parallel on max_threads worker threads.
+        
+        A worker takes the next item as soon as it is done with one, so a slow
+        item only holds up its own thread instead of a whole chunk, and
+        threads are started once rather than per item. Results are handed to
+        chunk_handler in order, in runs of consecutive finished items; a run
+        ends at the first item still being processed. Items may come from a
+        generator, which is read as threads become free.
+        
+        Args:
+            items: Items to process
+            process_func: Function to process each item, takes (item, index) and returns result
+            chunk_handler: Optional function to handle results in order, takes (chunk_start_index, chunk, results_dict);
+                an item whose process_func raised is in the chunk but not in results_dict
+            max_threads: Number of worker threads
+            item_handler: Optional function called as each item finishes, in any order,
+                with (index, seconds spent processing it)
+            
+        Returns:
+            List of processed results
+        """
+        result_list = []
+        for chunk_start, chunk, results in self._iter_runs(items, process_func, max_threads, None, item_handler):
+            if chunk_handler:
+                result_list.extend(chunk_handler(chunk_start, chunk, results))
+            else:
+                result_list.extend(results[i] for i in range(chunk_start, chunk_start + len(chunk)) if i in results)
+        return result_list
+    
+    def iter_in_order(self,
+                      items: Iterable[Any],
+                      process_func: Callable[[Any, int], Any],
+                      max_threads: int = 6,
+                      window: Optional[int] = None,
+                      item_handler: Optional[Callable[[int, float], None]] = None) -> Iterator[Tuple[Any, Any]]:
+        """
+        Process items in parallel and yield (item, result) pairs in order as they complete.
+        
+        At most window items are held between the oldest one not yet yielded
+        and the newest one started: when a slow item holds up the order, or
+        the caller is slow to take results, no more items are started. Memory
+        is bounded by the window whatever the number of items.
+        
+        Args:
+            items: Items to process
+            process_func: Function to process each item, takes (item, index) and returns result
+            max_threads: Number of worker threads
+            window: Most items started but not yet yielded, 4 * max_threads by default
+            item_handler: Optional function called as each item finishes, in any order,
+                with (index, seconds spent processing it)
+            
+        Returns:
+            Iterator of (item, result) pairs; items whose process_func raised are skipped
+        """
+        window = max(window or 4 * max_threads, max_threads)
+        for chunk_start, chunk, results in self._iter_runs(items, process_func, max_threads, window, item_handler):
+            for index, item in enumerate(chunk, chunk_start):
+                if index in results:
+                    yield item, results[index]
+    
+    def _iter_runs(self,
+                   items: Iterable[Any],
+                   process_func: Callable[[Any, int], Any],
+                   max_threads: int,
+                   window: Optional[int],
+                   item_handler: Optional[Callable[[int, float], None]]) -> Iterator[Tuple[int, List[Any], Dict[int, Any]]]:
+        """Run the workers, yielding (chunk_start, chunk, results) for each run of consecutive finished items"""
+        tasks = queue.Queue()
+        finished = queue.Queue()
+        results: Dict[int, Any] = {}
+        workers = [
+            threading.Thread(target=self._worker, args=(tasks, finished, process_func, results), daemon=True)
+            for _ in range(max_threads)
+        ]
+        for worker in workers:
+            worker.start()
+        
+        # Items handed to the workers and not yet yielded, by index
+        pending: Dict[int, Any] = {}
+        done = set()
+        handed_over = 0
+        
+        def wait_for_item() -> Optional[Tuple[int, List[Any]]]:
+            """Wait for an item to finish, return the run it completes, if any"""
+            nonlocal handed_over
+            index, elapsed = finished.get()
+            done.add(index)
+            if item_handler:
+                item_handler(index, elapsed)
+            start = end = handed_over
+            while end in done:
+                done.remove(end)
+                end += 1
+            if end == start:
+                return None
+            handed_over = end
+            return start, [pending.pop(i) for i in range(start, end)]
+        
+        def runs(wait_while: Callable[[], bool]) -> Iterator[Tuple[int, List[Any], Dict[int, Any]]]:
+            while wait_while():
+                run = wait_for_item()
+                if run is not None:
+                    chunk_start, chunk = run
+                    yield chunk_start, chunk, results
+                    for i in range(chunk_start, chunk_start + len(chunk)):
+                        results.pop(i, None)
+        
+        try:
+            for index, item in enumerate(items):
+                # Wait for a free thread, and for the order to catch up with the window
+                yield from runs(lambda: len(pending) - len(done) >= max_threads
+                                or window is not None and index - handed_over >= window)
+                pending[index] = item
+                tasks.put((index, item))
+            yield from runs(lambda: bool(pending))
+        finally:
+            # Closed early: drop the items not started yet, so nothing runs
+            # once the caller has moved on, and wait for the ones in flight
+            while True:
+                try:
+                    tasks.get_nowait()
+                except queue.Empty:
+                    break
+            for _ in workers:
+                tasks.put(None)
+            for worker in workers:
+                worker.join()
+    
+    @staticmethod
+    def _worker(tasks: queue.Queue, finished: queue.Queue, process_func: Callable, results: Dict[int, Any]) -> None:
+        """Worker thread: process items until told to stop"""
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            index, item = task
+            start = time.perf_counter()
+            try:
+                results[index] = process_func(item, index)
+            except Exception:
+                logger.exception(f"Processing item {index} failed")
+            finished.put((index, time.perf_counter() - start))
+
+
+_DONE = object()
+
+
+def iter_in_background(items: Iterable[Any]) -> Iterator[Any]:
+    """
+    Consume an iterable on a background thread and yield its items as they arrive.
+    
+    Used to keep reading a streamed page at full speed while the caller is
+    busy with the items already received. An exception raised by the
+    iterable is re-raised to the caller.
+    
+    Args:
+        items: Iterable to consume, typically a generator doing I/O
+        
+    Returns:
+        Iterator over the same items, in order
+    """
+    received = queue.Queue()
+    
+    def produce() -> None:
+        try:
+            for item in items:
+                received.put((item, None))
+        except BaseException as e:
+            received.put((_DONE, e))
+        else:
+            received.put((_DONE, None))
+    
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        item, error = received.get()
+        if item is _DONE:
+            if error is not None:
+                raise error
+            return
+        yield item
\ No newline at end of file
@@ -0,0 +1,319 @@
+"""
+HTTP transport shared by every scrape_util helper.
+
+A single requests.Session is kept per process so that connections to a host
+are pooled and kept alive between chapters instead of paying a new TCP/TLS
+handshake for each request. Hosts that opt into HTTP/2 are served by the
+multiplexing backend in http2_transport instead.
+"""
+
+import threading
+from typing import Dict, Any, Iterable, Iterator, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from rate_limiter import get_rate_limiter
+from retry_policy import run_with_retries
+from http_cache import get_cache
+from page_memo import get_active_memo
+from content_encoding import with_accept_encoding, iter_decoded
+from http2_transport import Http2Backend, HTTP2_RETRY_EXCEPTIONS, resolve_http2_hosts
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_10_1) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/39.0.2171.95 Safari/537.36'
+}
+
+DEFAULT_TIMEOUT = 10
+
+# Size of the raw chunks read from the socket and handed to the decoder
+CHUNK_SIZE = 16 * 1024
+
+# Transient failures worth retrying; everything else (invalid URLs, ...) is raised at once
+RETRY_EXCEPTIONS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+) + HTTP2_RETRY_EXCEPTIONS
+
+
+def _copy_response(response: requests.Response) -> requests.Response:
+    """Return a response sharing the read body but not the headers or other attributes"""
+    copy = requests.Response()
+    copy.__dict__.update(response.__dict__)
+    copy.headers = CaseInsensitiveDict(response.headers)
+    return copy
+
+
+class HttpTransport:
+    """Pooled, keep-alive HTTP transport, with HTTP/2 for the hosts that opt in"""
+
+    def __init__(self,
+                 pool_size: int = 6,
+                 pooled: bool = True,
+                 max_hosts: int = 10,
+                 http2_hosts: Optional[Iterable[str]] = None):
+        """
+        Initialize the transport.
+
+        Args:
+            pool_size: Maximum number of kept-alive connections per host,
+                normally the coordinator's max_threads
+            pooled: If False every request uses a fresh connection, which is
+                only useful to compare against the pooled throughput
+            max_hosts: Number of per-host pools to keep around
+            http2_hosts: Hosts whose requests are multiplexed over one HTTP/2
+                connection instead of the HTTP/1.1 pool; ignored if httpx[http2]
+                is not installed
+        """
+        self.pool_size = max(1, pool_size)
+        self.pooled = pooled
+        self.max_hosts = max_hosts
+        self.http2_hosts = resolve_http2_hosts(http2_hosts)
+        self._session = self._make_session()
+        self._http2 = Http2Backend() if self.http2_hosts else None
+
+    def _make_session(self) -> requests.Session:
+        """Create a session whose adapters hold one pool of pool_size connections per host"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.max_hosts,
+            pool_maxsize=self.pool_size,
+            pool_block=False
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def request(self,
+                method: str,
+                url: str,
+                headers: Optional[Dict[str, str]] = None,
+                cookies: Optional[Dict[str, str]] = None,
+                timeout: float = DEFAULT_TIMEOUT,
+                **kwargs: Any) -> requests.Response:
+        """
+        Send a request through the shared pool.
+
+        Each attempt waits for the host's circuit breaker and rate limiter;
+        transient errors and retryable statuses are retried under the
+        process-wide RetryPolicy.
+
+        Args:
+            method: HTTP method
+            url: Target URL
+            headers: Request headers, the default User-Agent is used if empty
+            cookies: Request cookies
+            timeout: Request timeout in seconds
+            **kwargs: Passed through to requests (stream, json, params, ...)
+
+        Returns:
+            The requests.Response
+
+        Raises:
+            RetryError: If the request still fails after the policy's attempt budget
+        """
+        memo = get_active_memo()
+        if memo is not None and method == "GET" and not kwargs.get("stream"):
+            # Pages fetched earlier in this run, or being fetched right now, are shared
+            response = memo.get(
+                memo.key_for(url, cookies),
+                lambda: self._fetch(method, url, headers, cookies, timeout, **kwargs)
+            )
+            # Every caller gets its own response to modify
+            return _copy_response(response)
+        return self._fetch(method, url, headers, cookies, timeout, **kwargs)
+
+    def _fetch(self, method, url, headers, cookies, timeout, **kwargs) -> requests.Response:
+        """Fetch through the disk cache (if enabled) under the retry policy"""
+        cache = get_cache()
+        if cache is not None and method == "GET" and not kwargs.get("stream"):
+            return self._cached_get(cache, url, headers, cookies, timeout, **kwargs)
+
+        def send_once() -> requests.Response:
+            get_rate_limiter().acquire(url)
+            return self.send(method, url, headers=headers, cookies=cookies, timeout=timeout, **kwargs)
+
+        return run_with_retries(url, send_once, RETRY_EXCEPTIONS)
+
+    def _cached_get(self, cache, url, headers, cookies, timeout, **kwargs) -> requests.Response:
+        """GET through the disk cache: serve fresh entries, revalidate stale ones"""
+        key = cache.key_for(url, headers, cookies)
+        entry = cache.lookup(key)
+        if entry is not None and entry.is_fresh(cache.ttl):
+            cache.count("hits")
+            return entry.to_response()
+
+        request_headers = dict(headers or DEFAULT_HEADERS)
+        if entry is not None:
+            request_headers = cache.conditional_headers(entry, request_headers)
+
+        def send_once() -> requests.Response:
+            get_rate_limiter().acquire(url)
+            return self.send("GET", url, headers=request_headers, cookies=cookies, timeout=timeout, **kwargs)
+
+        response = run_with_retries(url, send_once, RETRY_EXCEPTIONS)
+        if response.status_code == 304 and entry is not None:
+            cache.count("revalidated")
+            cache.refresh(entry)
+            return entry.to_response()
+        cache.count("misses")
+        if response.status_code == 200:
+            cache.store(key, response.url or url, response.status_code, response.headers, response.content)
+        return response
+
+    def send(self,
+             method: str,
+             url: str,
+             headers: Optional[Dict[str, str]] = None,
+             cookies: Optional[Dict[str, str]] = None,
+             timeout: float = DEFAULT_TIMEOUT,
+             **kwargs: Any) -> requests.Response:
+        """
+        Send a request right away, without consulting the rate limiter.
+
+        Unless stream=True is passed, the body is read and decompressed here
+        and the response's content is the decoded body. With stream=True the
+        body is left to the caller and decoded by requests as usual.
+        """
+        if kwargs.pop("stream", False):
+            return self._open_raw(method, url, self._headers(headers, negotiate=False), cookies, timeout, **kwargs)
+        response = self.open(method, url, headers=headers, cookies=cookies, timeout=timeout, **kwargs)
+        response._content = b"".join(self.iter_body(response))
+        response._content_consumed = True
+        return response
+
+    def open(self,
+             method: str,
+             url: str,
+             headers: Optional[Dict[str, str]] = None,
+             cookies: Optional[Dict[str, str]] = None,
+             timeout: float = DEFAULT_TIMEOUT,
+             **kwargs: Any) -> requests.Response:
+        """Send a request advertising every decodable compression, leaving the raw body unread"""
+        return self._open_raw(method, url, self._headers(headers, negotiate=True), cookies, timeout, **kwargs)
+
+    def http2_backend(self, url: str) -> Optional[Http2Backend]:
+        """Return the HTTP/2 backend if the URL's host uses it, else None"""
+        if self._http2 is not None and urlsplit(url).hostname in self.http2_hosts:
+            return self._http2
+        return None
+
+    def _open_raw(self, method, url, headers, cookies, timeout, **kwargs) -> requests.Response:
+        """Send on the host's HTTP/2 connection or through the HTTP/1.1 pool"""
+        http2 = self.http2_backend(url)
+        if http2 is not None:
+            return http2.open(method, url, headers, cookies=cookies, timeout=timeout, **kwargs)
+        if not self.pooled:
+            # Unpooled mode: the server closes the connection after every
+            # response, so each request pays a fresh TCP/TLS handshake
+            headers["Connection"] = "close"
+        return self._session.request(method, url, headers=headers, cookies=cookies,
+                                     timeout=timeout, stream=True, **kwargs)
+
+    @staticmethod
+    def iter_body(response: requests.Response, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Yield the body of a response from open() decoded chunk by chunk as it arrives.
+
+        The Content-Encoding and Content-Length headers are dropped once the
+        body is decoded, since they no longer describe it.
+        """
+        content_encoding = response.headers.pop("Content-Encoding", None)
+        if content_encoding:
+            response.headers.pop("Content-Length", None)
+        try:
+            yield from iter_decoded(response.raw.stream(chunk_size, decode_content=False), content_encoding)
+        finally:
+            # The body is consumed (or abandoned): hand the connection back to the pool
+            response._content_consumed = True
+            response.close()
+
+    def stream(self,
+               url: str,
+               headers: Optional[Dict[str, str]] = None,
+               cookies: Optional[Dict[str, str]] = None,
+               timeout: float = DEFAULT_TIMEOUT,
+               chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        GET a URL and yield its decoded body as it arrives, for incremental consumers.
+
+        Connecting is retried under the retry policy; once the body has
+        started arriving, errors are raised to the caller.
+        """
+        response = self.open_stream(url, headers=headers, cookies=cookies, timeout=timeout)
+        yield from self.iter_body(response, chunk_size)
+
+    def open_stream(self,
+                    url: str,
+                    headers: Optional[Dict[str, str]] = None,
+                    cookies: Optional[Dict[str, str]] = None,
+                    timeout: float = DEFAULT_TIMEOUT) -> requests.Response:
+        """
+        GET a URL under the retry policy and return the response with its body
+        unread, for callers that need the headers before iter_body.
+        """
+        def send_once() -> requests.Response:
+            get_rate_limiter().acquire(url)
+            return self.open("GET", url, headers=headers, cookies=cookies, timeout=timeout)
+
+        return run_with_retries(url, send_once, RETRY_EXCEPTIONS)
+
+    def _headers(self, headers: Optional[Dict[str, str]], negotiate: bool) -> Dict[str, str]:
+        """Return the headers to send: defaults and compression negotiation"""
+        headers = dict(headers or DEFAULT_HEADERS)
+        if negotiate:
+            headers = with_accept_encoding(headers)
+        return headers
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        """Send a GET request"""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        """Send a POST request"""
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        """Close all pooled connections"""
+        self._session.close()
+        if self._http2 is not None:
+            self._http2.close()
+
+
+_transport: Optional[HttpTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> HttpTransport:
+    """Return the process-wide transport, creating a default one on first use"""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = HttpTransport()
+    return _transport
+
+
+def configure_transport(pool_size: int = 6,
+                        pooled: bool = True,
+                        http2_hosts: Optional[Iterable[str]] = None) -> HttpTransport:
+    """
+    Replace the process-wide transport.
+
+    Args:
+        pool_size: Maximum number of kept-alive connections per host
+        pooled: Whether connections are pooled and reused
+        http2_hosts: Hosts that are fetched over a multiplexed HTTP/2 connection
+
+    Returns:
+        The new transport
+    """
+    global _transport
+    with _transport_lock:
+        if _transport is not None:
+            _transport.close()
+        _transport = HttpTransport(pool_size=pool_size, pooled=pooled, http2_hosts=http2_hosts)
+    return _transport
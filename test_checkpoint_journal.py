@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the checkpoint journal and resuming with it.
+"""
+
+import sys
+import os
+import json
+
+# Add the src directory to the Python path so the flat module imports resolve
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from coordinator import NovelScraperCoordinator
+from async_coordinator import AsyncNovelScraperCoordinator
+from adapters.text_file_adapter import TextFileAdapter
+from checkpoint_journal import CheckpointJournal, journal_path
+from novel_scraper_cli import create_journal, parse_args
+from fake_scraper import FakeScraper, chapter
+
+CHAPTERS = 30
+STRUCTURE = [{"type": "volume", "title": "Volume"}] + [chapter(i) for i in range(CHAPTERS)]
+
+
+def write_journal(path, count):
+    journal = CheckpointJournal(path, resume=False)
+    for i in range(count):
+        journal.record(i, f"u{i}", FakeScraper.content(f"u{i}"))
+    journal.close()
+
+
+def test_torn_last_line_is_truncated(tmp_path):
+    path = journal_path(str(tmp_path), "novel")
+    write_journal(path, 3)
+    size = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b'{"index": 3, "url": "u3", "sha')
+    journal = CheckpointJournal(path)
+    assert len(journal) == 3 and "u3" not in journal
+    assert os.path.getsize(path) == size
+    # New entries follow the last complete line
+    journal.record(3, "u3", {"content": "again"})
+    journal.close()
+    assert CheckpointJournal(path).get("u3") == {"content": "again"}
+
+
+def test_damaged_entry_is_not_served(tmp_path):
+    path = journal_path(str(tmp_path), "novel")
+    write_journal(path, 2)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data.replace("中文正文 u0".encode("utf-8"), "中文正文 uX".encode("utf-8"), 1))
+    journal = CheckpointJournal(path)
+    assert journal.get("u0") is None
+    assert journal.get("u1") == FakeScraper.content("u1")
+    assert journal.resumed == 1
+
+
+def test_resume_downloads_only_missing_chapters(tmp_path):
+    path = journal_path(str(tmp_path), "novel")
+    write_journal(path, 12)
+    scraper = FakeScraper(STRUCTURE)
+    journal = CheckpointJournal(path)
+    adapter = TextFileAdapter({"file_path": str(tmp_path / "resumed")})
+    result = NovelScraperCoordinator(scraper, adapter, max_threads=4, journal=journal).scrape_novel("novel")
+    assert result["status"] == "success" and result["chapters_saved"] == CHAPTERS
+    assert sorted(scraper.fetched) == sorted(f"u{i}" for i in range(12, CHAPTERS))
+    assert journal.resumed == 12
+    # A completed run discards its journal
+    assert not os.path.exists(path)
+
+    adapter = TextFileAdapter({"file_path": str(tmp_path / "fresh")})
+    NovelScraperCoordinator(FakeScraper(STRUCTURE), adapter, max_threads=4).scrape_novel("novel")
+    with open(tmp_path / "resumed.txt", encoding="utf-8") as resumed, \
+            open(tmp_path / "fresh.txt", encoding="utf-8") as fresh:
+        assert resumed.read() == fresh.read()
+
+
+def journal_numbers(path):
+    """Chapter number each URL is recorded with"""
+    with open(path, encoding="utf-8") as f:
+        return {entry["url"]: entry["index"] for entry in map(json.loads, f)}
+
+
+def test_coordinators_record_chapter_numbers(tmp_path):
+    """Both coordinators record a chapter's number among the chapters, not its position among the items"""
+    failing = {"u3", "u17"}
+    expected = {f"u{i}": i for i in range(CHAPTERS) if f"u{i}" not in failing}
+    for coordinator in (NovelScraperCoordinator, AsyncNovelScraperCoordinator):
+        path = journal_path(str(tmp_path), coordinator.__name__)
+        journal = CheckpointJournal(path, resume=False)
+        adapter = TextFileAdapter({"file_path": str(tmp_path / coordinator.__name__)})
+        coordinator(FakeScraper(STRUCTURE, failing), adapter, max_threads=4, journal=journal).scrape_novel("novel")
+        journal.close()
+        assert journal_numbers(path) == expected
+
+
+def test_sync_coordinator_resumes_an_async_journal(tmp_path):
+    path = journal_path(str(tmp_path), "novel")
+    journal = CheckpointJournal(path, resume=False)
+    adapter = TextFileAdapter({"file_path": str(tmp_path / "interrupted")})
+    AsyncNovelScraperCoordinator(FakeScraper(STRUCTURE, {"u3", "u17"}), adapter, journal=journal).scrape_novel("novel")
+    journal.close()
+    # The failed chapters keep the journal for a resumed run
+    assert len(CheckpointJournal(path)) == CHAPTERS - 2
+
+    scraper = FakeScraper(STRUCTURE)
+    journal = CheckpointJournal(path)
+    adapter = TextFileAdapter({"file_path": str(tmp_path / "resumed")})
+    result = NovelScraperCoordinator(scraper, adapter, max_threads=4, journal=journal).scrape_novel("novel")
+    assert result["status"] == "success" and result["chapters_saved"] == CHAPTERS
+    assert sorted(scraper.fetched) == ["u17", "u3"]
+    assert journal.resumed == CHAPTERS - 2
+    assert not os.path.exists(path)
+
+    adapter = TextFileAdapter({"file_path": str(tmp_path / "fresh")})
+    NovelScraperCoordinator(FakeScraper(STRUCTURE), adapter, max_threads=4).scrape_novel("novel")
+    with open(tmp_path / "resumed.txt", encoding="utf-8") as resumed, \
+            open(tmp_path / "fresh.txt", encoding="utf-8") as fresh:
+        assert resumed.read() == fresh.read()
+
+
+def test_resume_false_starts_over(tmp_path):
+    path = journal_path(str(tmp_path), "novel")
+    write_journal(path, 2)
+    assert len(CheckpointJournal(path, resume=False)) == 0
+
+
+def test_cli_journal_is_opt_in(tmp_path, monkeypatch):
+    args = ["novel_scraper_cli", "https://ncode.syosetu.com/n0000a/", "--scraper", "syosetu"]
+    monkeypatch.setattr(sys, "argv", args)
+    assert create_journal(parse_args()) is None
+    monkeypatch.setattr(sys, "argv", [*args, "--journal-dir", str(tmp_path)])
+    journal = create_journal(parse_args())
+    assert os.path.dirname(journal.path) == str(tmp_path)
+    journal.discard()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Offline tests for ChineseConverter, against a small fixture dictionary.
+"""
+
+import sys
+import os
+
+import pytest
+
+# Add the src directory to the Python path so the flat module imports resolve
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from chinese_converter import ChineseConverter, load_dictionary
+
+CHARACTERS = {"发": "發 髮", "头": "頭", "干": "幹 乾 干", "净": "淨", "后": "後 后", "现": "現", "丝": "絲"}
+PHRASES = {"头发": "頭髮", "头发丝": "頭髮絲", "发现": "發現", "一干": "一干", "一干二净": "一乾二淨", "皇后": "皇后"}
+
+
+@pytest.fixture(params=[False, True], ids=["exact", "windowed"])
+def converter(request, tmp_path):
+    for name, entries in (("STCharacters.txt", CHARACTERS), ("STPhrases.txt", PHRASES)):
+        with open(tmp_path / name, "w", encoding="utf-8") as f:
+            f.write("# fixture\n")
+            f.writelines(f"{key}\t{value}\n" for key, value in entries.items())
+    return ChineseConverter(str(tmp_path), windowed=request.param)
+
+
+def test_load_dictionary_keeps_the_first_candidate(converter):
+    assert load_dictionary(converter.paths[0])["发"] == "發"
+    assert "# fixture" not in load_dictionary(converter.paths[0])
+
+
+def test_phrase_beats_its_characters(converter):
+    # Character by character 头发 would be 頭發
+    assert converter.apply("头发") == "頭髮"
+    assert converter.apply("他发现头发白了") == "他發現頭髮白了"
+
+
+def test_longest_phrase_wins(converter):
+    assert converter.apply("一干二净") == "一乾二淨"
+    assert converter.apply("一干人") == "一干人"
+    assert converter.apply("一根头发丝") == "一根頭髮絲"
+
+
+def test_phrase_keeps_characters_the_table_would_change(converter):
+    assert converter.apply("皇后之后") == "皇后之後"
+
+
+def test_text_without_phrases_goes_through_the_table(converter):
+    assert converter.apply("干净") == "幹淨"
+    assert converter.apply("") == ""
+    assert converter.apply("abc 123") == "abc 123"
+
+
+def test_missing_dictionary_is_an_error(tmp_path):
+    with pytest.raises(ValueError):
+        ChineseConverter(str(tmp_path))
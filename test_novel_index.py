@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Offline tests for NovelIndex.
+"""
+
+import sys
+import os
+import random
+
+# Add the src directory to the Python path so the flat module imports resolve
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from novel_index import NovelIndex
+
+
+def reference_select(structure, start, end):
+    """The original URL-based selection, kept as the expected output"""
+    chapter_urls = [item["url"] for item in structure if item["type"] == "chapter"]
+    selected_chapter_urls = chapter_urls[start:end]
+    new_structure = []
+    current_part = None
+    for item in structure:
+        if item["type"] in ("volume", "part"):
+            current_part = item
+        elif item["type"] == "chapter":
+            if item["url"] in selected_chapter_urls:
+                if current_part:
+                    new_structure.append(current_part)
+                    current_part = None
+                new_structure.append(item)
+    return new_structure
+
+
+def reference_merge(structure, downloaded_chapters):
+    """The original URL-based merge, kept as the expected output"""
+    merged = []
+    for item in structure:
+        if item["type"] == "chapter":
+            if item["url"] in downloaded_chapters:
+                merged.append({**item, **downloaded_chapters[item["url"]]})
+        else:
+            merged.append(item)
+    return merged
+
+
+def random_structure(rng):
+    """Chapters with unique URLs under volumes and parts, some empty, some chapters before any heading"""
+    structure = []
+    for i in range(rng.randint(0, 60)):
+        roll = rng.random()
+        if roll < 0.08:
+            structure.append({"type": "volume", "title": f"Volume {i}"})
+        elif roll < 0.15:
+            structure.append({"type": "part", "title": f"Part {i}"})
+        else:
+            structure.append({"type": "chapter", "url": f"u{i}", "title": f"Chapter {i}"})
+    return structure
+
+
+def test_select_matches_reference():
+    rng = random.Random(0)
+    for _ in range(300):
+        structure = random_structure(rng)
+        index = NovelIndex(structure)
+        start = rng.randint(0, len(index) + 1)
+        end = rng.randint(start, len(index) + 2)
+        assert index.select(start, end).items == reference_select(structure, start, end)
+
+
+def test_merge_matches_reference():
+    rng = random.Random(1)
+    for _ in range(300):
+        structure = random_structure(rng)
+        index = NovelIndex(structure)
+        contents = [
+            {"content": f"text {url}"} if rng.random() < 0.8 else None for url in index.chapter_urls()
+        ]
+        downloaded = {url: content for url, content in zip(index.chapter_urls(), contents) if content}
+        assert index.merge(contents) == reference_merge(structure, downloaded)
+
+
+def test_merge_leaves_the_structure_alone():
+    structure = [{"type": "volume", "title": "V"}, {"type": "chapter", "url": "u0", "title": "c"}]
+    merged = NovelIndex(structure).merge([{"content": "text"}])
+    assert merged[1] == {"type": "chapter", "url": "u0", "title": "c", "content": "text"}
+    assert "content" not in structure[1]
+
+
+def test_part_lookup():
+    structure = [
+        {"type": "chapter", "url": "u0", "title": "prologue"},
+        {"type": "volume", "title": "V1"},
+        {"type": "part", "title": "P1"},
+        {"type": "chapter", "url": "u1", "title": "c1"},
+        {"type": "volume", "title": "empty"},
+        {"type": "volume", "title": "V2"},
+        {"type": "chapter", "url": "u2", "title": "c2"},
+    ]
+    index = NovelIndex(structure)
+    assert len(index) == 3 and index.part_count() == 4
+    assert index.chapter_urls() == ["u0", "u1", "u2"]
+    assert index.part_of(0) is None
+    assert index.part_of(1)["title"] == "P1"
+    assert index.part_of(2)["title"] == "V2"
+    assert [item["title"] for item in index.select(1, 3).items] == ["P1", "c1", "V2", "c2"]
+
+
+def test_chapters_sharing_a_url_stay_apart():
+    structure = [{"type": "chapter", "url": "same", "title": f"c{i}"} for i in range(3)]
+    index = NovelIndex(structure)
+    assert [item["title"] for item in index.select(1, 2).items] == ["c1"]
+    assert [item["content"] for item in index.merge([{"content": str(i)} for i in range(3)])] == ["0", "1", "2"]
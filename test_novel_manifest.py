@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Offline tests for incremental updates: the manifest and --update.
+"""
+
+import sys
+import os
+import json
+
+import pytest
+
+# Add the src directory to the Python path so the flat module imports resolve
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from coordinator import NovelScraperCoordinator
+from adapters.text_file_adapter import TextFileAdapter
+from novel_manifest import MANIFEST_VERSION, NovelManifest
+from novel_scraper_cli import parse_args
+from fake_scraper import FakeScraper, chapter
+
+ARGS = ["https://ncode.syosetu.com/n0000a/", "--scraper", "syosetu"]
+
+
+def scrape(path, structure, update):
+    """Scrape structure into path.txt; returns the scraper, the result and the file's bytes"""
+    scraper = FakeScraper(structure)
+    adapter = TextFileAdapter({"file_path": path, "update": update})
+    result = NovelScraperCoordinator(scraper, adapter, max_threads=4).scrape_novel("novel")
+    assert result["status"] == "success", result
+    with open(path + ".txt", "rb") as file:
+        return scraper, result, file.read()
+
+
+def test_manifest_round_trip(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = NovelManifest([{"url": "u0", "offset": 0}], size=10)
+    manifest.add({"url": "u1", "offset": 5})
+    manifest.add({"url": "u0", "offset": 1})
+    manifest.save(path)
+    loaded = NovelManifest.load(path)
+    assert len(loaded) == 2 and "u1" in loaded
+    assert list(loaded.chapters.values()) == [{"url": "u0", "offset": 1}, {"url": "u1", "offset": 5}]
+    assert loaded.fields == {"size": 10}
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_unusable_manifest_is_ignored(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    assert NovelManifest.load(path) is None
+    with open(path, "w") as file:
+        file.write("{")
+    assert NovelManifest.load(path) is None
+    with open(path, "w") as file:
+        json.dump({"version": MANIFEST_VERSION + 1, "chapters": []}, file)
+    assert NovelManifest.load(path) is None
+
+
+def test_update_keeps_saved_chapters(tmp_path):
+    """An update downloads the new chapters only and writes what a full download would"""
+    first = [{"type": "volume", "title": "V1"}] + [chapter(i) for i in range(10)]
+    scraper, _, _ = scrape(str(tmp_path / "updated"), first, update=False)
+    assert len(scraper.fetched) == 10
+
+    # Chapters appended in a new volume, and one inserted mid-index
+    grown = first[:6] + [chapter(99)] + first[6:] + [{"type": "volume", "title": "V2"}] + \
+        [chapter(i) for i in range(10, 13)]
+    scraper, result, updated = scrape(str(tmp_path / "updated"), grown, update=True)
+    assert sorted(scraper.fetched) == ["u10", "u11", "u12", "u99"]
+    assert result["chapters_saved"] == 14 and result["chapters_added"] == 4
+    _, _, fresh = scrape(str(tmp_path / "fresh"), grown, update=False)
+    assert updated == fresh
+
+    # Nothing new: nothing downloaded, file unchanged
+    scraper, _, again = scrape(str(tmp_path / "updated"), grown, update=True)
+    assert scraper.fetched == [] and again == fresh
+
+
+def test_update_after_file_changed_downloads_everything(tmp_path):
+    path = str(tmp_path / "novel")
+    structure = [chapter(i) for i in range(5)]
+    scrape(path, structure, update=False)
+    with open(path + ".txt", "ab") as file:
+        file.write(b"edited")
+    scraper, _, _ = scrape(path, structure, update=True)
+    assert len(scraper.fetched) == 5
+
+
+@pytest.mark.parametrize("selection", [["--max-chapters", "5"], ["--range", "3-"], ["--interactive"]])
+def test_update_rejects_chapter_selection(selection):
+    """--update with a chapter selection would drop the saved chapters outside it"""
+    with pytest.raises(SystemExit):
+        parse_args([*ARGS, "--update", *selection])
+    assert parse_args([*ARGS, *selection]).update is False
+
+
+def test_update_alone_is_accepted():
+    assert parse_args([*ARGS, "--update"]).update is True
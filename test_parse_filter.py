@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Offline tests for ParseOnly and the strainer it builds.
+"""
+
+import sys
+import os
+
+import pytest
+from bs4 import BeautifulSoup as Soup
+
+# Add the src directory to the Python path so the flat module imports resolve
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from parse_filter import ParseOnly
+from response import Response
+
+CHAPTER_PAGE = """<html><head><title>第一章 - 全本小说网</title></head><body>
+<div class="header"><h1 class="logo">全本小说网</h1></div>
+<div class="wrapper"><h1 class="headline">第一章</h1>
+<div id="main" class="articlebody content"><p>第一段</p><p>第二段<b>加粗</b></p></div></div>
+<div class="articlebody-ad">广告</div><div class="comments"><p>评论</p></div>
+</body></html>"""
+
+
+@pytest.mark.parametrize("selector, rule", [
+    ("div", ("div", None, frozenset())),
+    ("DIV", ("div", None, frozenset())),
+    (".articlebody", (None, None, frozenset({"articlebody"}))),
+    ("#main", (None, "main", frozenset())),
+    (" h1.headline ", ("h1", None, frozenset({"headline"}))),
+    ("div#main.articlebody.content", ("div", "main", frozenset({"articlebody", "content"}))),
+])
+def test_parse_selector(selector, rule):
+    assert ParseOnly._parse(selector) == rule
+
+
+@pytest.mark.parametrize("selector", ["", "  ", "div p", "div > p", "a[href]", "p:first-child", "div,p", "#"])
+def test_unsupported_selector_is_rejected(selector):
+    with pytest.raises(ValueError):
+        ParseOnly(selector)
+
+
+def test_matches():
+    parse_only = ParseOnly("h1.headline", "div#main.articlebody")
+    assert parse_only.matches("h1", {"class": ["headline", "big"]})
+    assert parse_only.matches("h1", {"class": "big headline"})
+    assert not parse_only.matches("h1", {"class": ["logo"]})
+    assert not parse_only.matches("h2", {"class": ["headline"]})
+    assert parse_only.matches("div", {"id": "main", "class": ["articlebody", "content"]})
+    assert not parse_only.matches("div", {"class": ["articlebody"]})
+    assert not parse_only.matches("div", {"id": "main"})
+
+
+def test_strainer_builds_only_the_wanted_subtrees():
+    parse_only = ParseOnly("h1.headline", "div.articlebody")
+    soup = Soup(CHAPTER_PAGE, features="lxml", parse_only=parse_only.strainer())
+    assert [tag.name for tag in soup.find_all(recursive=False)] == ["h1", "div"]
+    assert soup.select_one("h1.headline").text == "第一章"
+    # The wanted subtree is kept whole, the rest of the page is not built
+    assert soup.select_one("div.articlebody").decode() == \
+        Soup(CHAPTER_PAGE, features="lxml").select_one("div.articlebody").decode()
+    assert "广告" not in soup.decode() and "评论" not in soup.decode() and soup.title is None
+    assert parse_only.strainer() is parse_only.strainer()
+
+
+def test_strainer_searches_a_built_soup():
+    parse_only = ParseOnly("h1.headline")
+    soup = Soup(CHAPTER_PAGE, features="lxml")
+    assert [tag.text for tag in soup.find_all(parse_only.strainer())] == ["第一章"]
+
+
+def test_response_soup_with_parse_only():
+    response = Response("http://example.com/1", 200, {"Content-Type": "text/html; charset=utf-8"},
+                        CHAPTER_PAGE.encode("utf-8"))
+    parse_only = ParseOnly("div.articlebody")
+    filtered = response.soup("lxml", parse_only)
+    assert filtered is response.soup("lxml", parse_only)
+    assert filtered.select_one("div.articlebody p b").text == "加粗"
+    assert response.soup("lxml") is not filtered and response.soup("lxml").title is not None
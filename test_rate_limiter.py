@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the per-host rate limiter.
+"""
+
+import sys
+import os
+
+# Add the src directory to the Python path so the flat module imports resolve
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import rate_limiter
+from rate_limiter import limits_from_delay
+from coordinator import NovelScraperCoordinator
+from adapters.text_file_adapter import TextFileAdapter
+from fake_scraper import FakeScraper
+
+
+def test_limits_from_delay():
+    assert limits_from_delay(2.0, 4) == (2.0, 4)
+    assert limits_from_delay(0.5, 3, burst=8) == (6.0, 8)
+
+
+def test_coordinator_delay_matches_the_cli_conversion(tmp_path, monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_rate_limiter", rate_limiter.HostRateLimiter())
+    adapter = TextFileAdapter({"file_path": str(tmp_path / "novel")})
+    coordinator = NovelScraperCoordinator(FakeScraper([]), adapter, max_threads=6, delay_between_requests=1.5)
+    assert (coordinator.rate, coordinator.burst) == limits_from_delay(1.5, 6)
+    limiter = rate_limiter.get_rate_limiter()
+    assert (limiter.rate, limiter.burst) == (4.0, 6)
+    # An explicit rate wins over the deprecated delay
+    coordinator = NovelScraperCoordinator(FakeScraper([]), adapter, max_threads=6, delay_between_requests=1.5,
+                                          rate=2.0)
+    assert (coordinator.rate, coordinator.burst) == (2.0, 1)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Offline tests for retries, the circuit breaker and block pages, against a local server.
+"""
+
+import sys
+import os
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+# Add the src directory to the Python path so the flat module imports resolve
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+import block_detector
+import rate_limiter
+import retry_policy
+from scrape_util import scrape_util
+from retry_policy import CircuitBreaker, RetryError, RetryPolicy, run_with_retries
+from block_detector import BlockDetector
+from adapters.audio_file_adapter import AudioFileAdapter
+
+CHALLENGE = b"<html><head><title>Just a moment...</title></head><body></body></html>"
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Answers each path with the (status, headers, body) the test set for it, counting requests"""
+
+    protocol_version = "HTTP/1.1"
+    routes = {}
+    requests = []
+
+    def do_GET(self):
+        Handler.requests.append(self.path)
+        status, headers, body = Handler.routes.get(self.path, (200, {"Content-Type": "text/plain"}, b"ok"))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Base URL of a local server; retries are fast and the breaker short while it runs"""
+    Handler.routes = {}
+    Handler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True).start()
+    monkeypatch.setattr(retry_policy, "_retry_policy", RetryPolicy(max_attempts=3, base_delay=0.01, jitter=False))
+    monkeypatch.setattr(retry_policy, "_circuit_breaker", CircuitBreaker(cooldown=0.05))
+    monkeypatch.setattr(block_detector, "_block_detector", BlockDetector())
+    monkeypatch.setattr(rate_limiter, "_rate_limiter", rate_limiter.HostRateLimiter())
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_fetch_gives_up_on_a_persistent_status(server):
+    Handler.routes["/busy"] = (503, {"Retry-After": "0"}, b"busy")
+    with pytest.raises(RetryError) as error:
+        scrape_util.fetch(server + "/busy")
+    assert error.value.attempts == 3 and error.value.reason == "HTTP 503"
+    assert Handler.requests == ["/busy"] * 3
+
+
+def test_fetch_gives_up_on_repeated_block_pages(server):
+    Handler.routes["/blocked"] = (403, {"Content-Type": "text/html"}, CHALLENGE)
+    with pytest.raises(RetryError) as error:
+        scrape_util.fetch(server + "/blocked")
+    assert "Cloudflare challenge" in error.value.reason
+    assert Handler.requests == ["/blocked"] * 2
+
+def test_write_stream_returns_false_when_retries_run_out(server, tmp_path):
+    Handler.routes["/track"] = (503, {}, b"busy")
+    target = str(tmp_path / "track.mp3")
+    assert scrape_util.write_stream(server + "/track", target_path=target) is False
+    assert Handler.requests == ["/track"] * 3
+    assert not os.path.exists(target)
+
+
+def test_failed_track_keeps_the_other_files(server, tmp_path):
+    """A track that cannot be downloaded is counted, not a reason to delete the folder"""
+    Handler.routes["/bad"] = (503, {}, b"busy")
+    folder = str(tmp_path / "novel")
+    chapters = [{"url": f"u{i}", "title": f"Chapter {i}", "audio_url": server + path}
+                for i, path in enumerate(["/good0", "/bad", "/good2"])]
+    result = AudioFileAdapter({"folder_path": folder}).process_novel_stream({"title": "T"}, chapters)
+    assert result["status"] == "success"
+    assert result["successful_downloads"] == 2 and result["failed_downloads"] == 1
+    assert sorted(os.listdir(folder)) == ["Chapter 0.mp3", "Chapter 2.mp3", "manifest.json"]
+
+
+def test_adapter_error_keeps_downloaded_files(server, tmp_path):
+    folder = str(tmp_path / "novel")
+
+    def chapters():
+        yield {"url": "u0", "title": "Chapter 0", "audio_url": server + "/good0"}
+        raise RuntimeError("index went away")
+
+    result = AudioFileAdapter({"folder_path": folder}).process_novel_stream({"title": "T"}, chapters())
+    assert result["status"] == "error"
+    assert sorted(os.listdir(folder)) == ["Chapter 0.mp3", "manifest.json"]
+
+
+class FakeClock:
+    """Stands in for time.monotonic and time.sleep; sleeping moves the clock and is recorded"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(time, "sleep", clock.sleep)
+    return clock
+
+
+@pytest.fixture
+def retries(monkeypatch):
+    """Install a retry policy and breaker for the test, with a fresh rate limiter and detector"""
+    monkeypatch.setattr(rate_limiter, "_rate_limiter", rate_limiter.HostRateLimiter())
+    monkeypatch.setattr(block_detector, "_block_detector", BlockDetector())
+
+    def configure(breaker=None, **policy):
+        policy.setdefault("jitter", False)
+        monkeypatch.setattr(retry_policy, "_retry_policy", RetryPolicy(**policy))
+        monkeypatch.setattr(retry_policy, "_circuit_breaker", breaker or CircuitBreaker())
+    return configure
+
+
+def responses(*answers):
+    """send() returning each (status, headers, body) in turn, then the last one again; counts calls"""
+    calls = []
+
+    def send():
+        status, headers, body = answers[min(len(calls), len(answers) - 1)]
+        calls.append(status)
+        return SimpleNamespace(status_code=status, headers=headers, content=body)
+    return send, calls
+
+
+def test_gives_up_after_max_attempts(clock, retries):
+    retries(max_attempts=3, base_delay=1.0)
+    send, calls = responses((503, {}, b""))
+    with pytest.raises(RetryError) as error:
+        run_with_retries("http://a.example/x", send, ())
+    assert error.value.attempts == 3 and len(calls) == 3
+    # Exponential backoff between the attempts
+    assert clock.sleeps == [1.0, 2.0]
+
+
+def test_transient_exceptions_are_retried_then_raised(clock, retries):
+    retries(max_attempts=2)
+    attempts = []
+
+    def send():
+        attempts.append(1)
+        raise ConnectionError("reset")
+    with pytest.raises(RetryError) as error:
+        run_with_retries("http://a.example/x", send, (ConnectionError,))
+    assert len(attempts) == 2 and "ConnectionError" in error.value.reason
+
+
+def test_parse_retry_after():
+    parse = RetryPolicy.parse_retry_after
+    assert parse("120") == 120.0
+    assert parse(" 1.5 ") == 1.5
+    assert parse("-3") == 0.0
+    assert 28 <= parse(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert parse(formatdate(time.time() - 30, usegmt=True)) == 0.0
+    assert parse("soon") is None
+    assert parse(None) is None
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("7", 7.0),
+    (None, 7.0),
+    ("1000", 300.0),
+])
+def test_retry_after_is_waited(clock, retries, header, expected):
+    """The retry waits Retry-After, in seconds or as a date, capped at max_retry_after"""
+    retries(base_delay=0.01)
+    if header is None:
+        header = formatdate(time.time() + 7, usegmt=True)
+    start = clock.now
+    send, calls = responses((429, {"Retry-After": header}, b""), (200, {}, b"ok"))
+    assert run_with_retries("http://a.example/x", send, ()).status_code == 200
+    assert calls == [429, 200]
+    assert expected - 1 <= clock.now - start <= expected + 0.1
+
+
+def test_breaker_pauses_only_the_failing_host(clock, retries):
+    breaker = CircuitBreaker(window=4, min_requests=4, failure_ratio=0.5, cooldown=30.0)
+    retries(breaker=breaker, max_attempts=4, base_delay=0.01)
+    send, calls = responses((503, {}, b""))
+    with pytest.raises(RetryError):
+        run_with_retries("http://a.example/x", send, ())
+    assert breaker.wait_time("http://a.example/y") == pytest.approx(30.0, abs=0.1)
+    assert breaker.wait_time("http://b.example/y") == 0.0
+
+    # Another host is served without waiting for the open circuit
+    start = clock.now
+    send, calls = responses((200, {}, b"ok"))
+    run_with_retries("http://b.example/x", send, ())
+    assert clock.now == start
+    # The failing host waits it out
+    run_with_retries("http://a.example/x", send, ())
+    assert clock.now - start == pytest.approx(30.0, abs=0.1)
+
+
+@pytest.mark.parametrize("block_retries", [0, 1, 2])
+def test_block_pages_use_their_own_budget(clock, retries, block_retries):
+    retries(max_attempts=10, base_delay=0.01, block_retries=block_retries,
+            breaker=CircuitBreaker(cooldown=5.0))
+    send, calls = responses((403, {"Content-Type": "text/html"}, CHALLENGE))
+    with pytest.raises(RetryError) as error:
+        run_with_retries("http://a.example/x", send, ())
+    assert len(calls) == block_retries + 1
+    assert "Cloudflare challenge" in error.value.reason
+    # Each retry waited for the host's cooldown
+    assert clock.now - 1000.0 >= 5.0 * block_retries
+
+
+def test_block_budget_is_separate_from_status_retries(clock, retries):
+    retries(max_attempts=5, base_delay=0.01, block_retries=1, breaker=CircuitBreaker(cooldown=5.0))
+    send, calls = responses((503, {}, b""), (503, {}, b""), (403, {"Content-Type": "text/html"}, CHALLENGE),
+                            (200, {"Content-Type": "text/html"}, b"<html>chapter</html>"))
+    assert run_with_retries("http://a.example/x", send, ()).status_code == 200
+    assert calls == [503, 503, 403, 200]
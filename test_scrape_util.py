@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Offline tests for scrape_util helpers.
+"""
+
+import sys
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Add the src directory to the Python path so the flat module imports resolve
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from bs4 import BeautifulSoup as Soup
+from lxml import html
+
+import stream_parser
+from scrape_util import scrape_util
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_syosetu_novel.txt")
+
+EDGE_CASES = (
+    "<div id='body'>lead<!-- note --><p>one<br/>two</p><ul><li>a</li><li>b<i>x</i>tail</li></ul>"
+    "<table><tr><th>h</th><td> d </td></tr></table><h3>  </h3> end &amp; more\n</div>"
+)
+
+
+def reference_html_to_text(elem):
+    """The original string-concatenating implementation, kept as the expected output"""
+    text = ''
+    for e in elem.descendants:
+        if isinstance(e, str):
+            text += e.strip()
+        elif e.name in ['br',  'p', 'h1', 'h2', 'h3', 'h4','tr', 'th']:
+            text += '\n'
+        elif e.name == 'li':
+            text += '\n- '
+    return text
+
+
+def fixture_page():
+    with open(FIXTURE_PATH, encoding="utf-8") as file:
+        lines = file.read().splitlines()
+    return "<div id='body'>{}</div>".format("".join(f"<p>{line}<br/>{line}</p>" for line in lines))
+
+
+def test_html_to_text_matches_reference():
+    """html_to_text output is unchanged on edge cases and on a fixture-sized chapter"""
+    for page in (EDGE_CASES, fixture_page()):
+        body = Soup(page, features="lxml").select_one("#body")
+        assert scrape_util.html_to_text(body) == reference_html_to_text(body)
+
+
+def test_html_to_text_lxml_matches_soup():
+    """lxml elements give the same text as their BeautifulSoup counterparts"""
+    for page in (EDGE_CASES, fixture_page()):
+        soup_body = Soup(page, features="lxml").select_one("#body")
+        lxml_body = html.document_fromstring(page).get_element_by_id("body")
+        assert scrape_util.html_to_text(lxml_body) == reference_html_to_text(soup_body)
+
+
+# The header says GBK; the page's meta tag claims UTF-8, as pages copied between sites do
+GBK_PAGE = "<html><head><meta charset='utf-8'><title>第一章</title></head><body><p>中文正文</p></body></html>"
+
+
+class GbkHandler(BaseHTTPRequestHandler):
+    """Serves GBK_PAGE encoded as GBK with the Content-Type the path names"""
+
+    protocol_version = "HTTP/1.1"
+    content_types = {"/header": "text/html; charset=GBK", "/meta": "text/html"}
+
+    def do_GET(self):
+        body = GBK_PAGE.encode("gbk")
+        self.send_response(200)
+        self.send_header("Content-Type", self.content_types[self.path])
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def gbk_server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), GbkHandler)
+    threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def streamed_title(url, encoding=None):
+    return next(element.text for _, element in scrape_util.iter_parse(url, tags=("title",), encoding=encoding))
+
+
+def test_iter_parse_prefers_the_header_charset(gbk_server):
+    """Streamed parsing decodes like fetch: the header's charset beats the page's meta tag"""
+    assert "<title>第一章</title>" in scrape_util.fetch(gbk_server + "/header").text
+    assert streamed_title(gbk_server + "/header") == "第一章"
+    assert streamed_title(gbk_server + "/header", encoding="big5") == "第一章"
+
+
+def test_iter_parse_without_header_charset_uses_the_page():
+    """Header, then BOM, then meta, then the default"""
+    def title(body, **kwargs):
+        events = stream_parser.iter_parse([body], tags=("title",), **kwargs)
+        return next(element.text for _, element in events)
+
+    page = "<html><head><meta charset='gbk'><title>第一章</title></head></html>"
+    assert title(page.encode("gbk"), default_encoding="utf-8") == "第一章"
+    assert title(b"\xef\xbb\xbf" + page.encode("utf-8"), default_encoding="gbk") == "第一章"
+    assert title(page.encode("gbk"), header_encoding="gbk", default_encoding="utf-8") == "第一章"
+    plain = "<html><head><title>第一章</title></head></html>".encode("gbk")
+    assert title(plain, default_encoding="gbk") == "第一章"
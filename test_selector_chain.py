@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Offline tests for SelectorChain, on BeautifulSoup pages and lxml trees.
+"""
+
+import sys
+import os
+
+import pytest
+from bs4 import BeautifulSoup as Soup
+from lxml import html
+
+# Add the src directory to the Python path so the flat module imports resolve
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from lxml_engine import is_lxml_element
+from selector_chain import SelectorChain, selector_stats
+
+OLD_LAYOUT = "<div class='title'>Old</div><div class='novel_subtitle'>Subtitle</div><p>text</p>"
+NEW_LAYOUT = "<h1 class='p-title'>New</h1><div class='novel_subtitle'>Subtitle</div>"
+BOTH_LAYOUTS = "<div class='title'>Old</div><h1 class='p-title'>New</h1>"
+
+
+def text_of(element):
+    return element.text_content() if is_lxml_element(element) else element.text
+
+
+@pytest.fixture(params=["soup", "lxml"])
+def parse(request):
+    if request.param == "soup":
+        return lambda page: Soup(page, features="lxml")
+    return html.document_fromstring
+
+
+def test_without_a_winner_the_first_matching_selector_wins(parse):
+    chain = SelectorChain("test.order", "div.title", "h1.p-title")
+    assert text_of(chain.select_one(parse(BOTH_LAYOUTS), "a.example")) == "Old"
+    assert text_of(chain.select_one(parse(NEW_LAYOUT), "b.example")) == "New"
+
+
+def test_learned_winner_is_tried_first_for_its_host(parse):
+    chain = SelectorChain("test.learn", "div.title", "h1.p-title")
+    assert text_of(chain.select_one(parse(NEW_LAYOUT), "a.example")) == "New"
+    assert chain.stats()["learned"] == {"a.example": "h1.p-title"}
+    # The host's winner is preferred even where an earlier candidate matches too
+    assert text_of(chain.select_one(parse(BOTH_LAYOUTS), "a.example")) == "New"
+    # Another host still goes by the order
+    assert text_of(chain.select_one(parse(BOTH_LAYOUTS), "b.example")) == "Old"
+    stats = chain.stats()
+    assert (stats["learned_hits"], stats["fallbacks"], stats["misses"]) == (1, 2, 0)
+    assert stats["wins"] == {"div.title": 1, "h1.p-title": 2}
+
+
+def test_falls_back_when_the_learned_selector_stops_matching(parse):
+    chain = SelectorChain("test.fallback", "div.title", "h1.p-title")
+    chain.select_one(parse(NEW_LAYOUT), "a.example")
+    # The site went back to the old layout
+    assert text_of(chain.select_one(parse(OLD_LAYOUT), "a.example")) == "Old"
+    assert chain.stats()["learned"] == {"a.example": "div.title"}
+    assert chain.select_one(parse("<p>nothing</p>"), "a.example") is None
+    stats = chain.stats()
+    assert (stats["learned_hits"], stats["fallbacks"], stats["misses"]) == (0, 2, 1)
+    # A miss keeps the last winner
+    assert stats["learned"] == {"a.example": "div.title"}
+
+
+def test_predicate_falls_through_to_the_next_selector(parse):
+    chain = SelectorChain("test.predicate", "div.author", "span.author")
+    page = parse("<div class='author'> </div><span class='author'>Name</span>")
+    has_text = lambda element: bool(text_of(element).strip())
+    assert text_of(chain.select_one(page, "a.example", predicate=has_text)) == "Name"
+    assert chain.stats()["learned"] == {"a.example": "span.author"}
+    # A learned winner failing the predicate falls back too
+    page = parse("<div class='author'>Other</div><span class='author'></span>")
+    assert text_of(chain.select_one(page, "a.example", predicate=has_text)) == "Other"
+    assert chain.select_one(parse("<div class='author'></div>"), "a.example", predicate=has_text) is None
+
+
+def test_select_returns_every_match_of_the_winner_in_document_order(parse):
+    chain = SelectorChain("test.select", "a.subtitle", "dl.sublist a")
+    page = parse("<dl class='sublist'><a href='1'>1</a></dl><p><dl class='sublist'><a href='2'>2</a></dl></p>")
+    assert [text_of(link) for link in chain.select(page, "a.example")] == ["1", "2"]
+    assert chain.select(parse("<p></p>"), "a.example") == []
+
+
+def test_stats_are_reported_by_name():
+    chain = SelectorChain("test.stats", "div.title")
+    chain.select_one(Soup(OLD_LAYOUT, features="lxml"))
+    assert selector_stats()["test.stats"]["learned"] == {None: "div.title"}
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the text pipeline stages.
+"""
+
+import sys
+import os
+
+# Add the src directory to the Python path so the flat module imports resolve
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from text_pipeline import BoilerplateStripper, Normalizer
+
+NOISY = "　　第１章　ＡＢＣ１２３，好！\r\n\r\n\r\n\r\n二\u200b行\xa0\xa0尾  \r三\u3000\u3000\n\n\n\n四\r\u200b\n"
+
+
+def test_normalizer_unifies_line_breaks():
+    normalizer = Normalizer(collapse_spaces=False, max_blank_lines=3)
+    assert normalizer.apply("a\r\nb\rc\u2028d\x85e\r\n\r\nf") == "a\nb\nc\nd\ne\n\nf"
+    # A zero-width character between \r and \n does not make two line breaks
+    assert normalizer.apply("a\r\u200b\nb") == "a\nb"
+
+
+def test_normalizer_folds_full_width_alphanumerics_only():
+    assert Normalizer().apply("ＡＢＣ１２３，！") == "ABC123，！"
+    assert Normalizer(fold_punctuation=True).apply("ＡＢＣ１２３，！") == "ABC123,!"
+    assert Normalizer(fold_alphanumerics=False).apply("ＡＢＣ１２３") == "ＡＢＣ１２３"
+
+
+def test_normalizer_collapses_spaces_and_blank_lines():
+    assert Normalizer().apply(NOISY) == "第1章 ABC123，好！\n\n二行 尾\n三\n\n四"
+    assert Normalizer(max_blank_lines=0).apply(NOISY) == "第1章 ABC123，好！\n二行 尾\n三\n四"
+    assert Normalizer(max_blank_lines=2).apply("a\n\n\n\n\nb\n\n\nc") == "a\n\n\nb\n\n\nc"
+
+
+def test_normalizer_is_idempotent():
+    for normalizer in (Normalizer(), Normalizer(fold_punctuation=True, max_blank_lines=0),
+                       Normalizer(collapse_spaces=False), Normalizer(strip_zero_width=False)):
+        once = normalizer.apply(NOISY)
+        assert normalizer.apply(once) == once
+
+
+def test_stripper_spans_are_leftmost_longest():
+    stripper = BoilerplateStripper(["ab", "abc", "bcd", "广告", "广告词"])
+    # At each position the longest pattern wins; an overlapping one starting inside it is not matched
+    assert stripper._literal_spans("xabcdab广告词广告", {}) == [(1, 4), (5, 7), (7, 10), (10, 12)]
+    assert stripper.apply("xabcdab广告词广告") == "xd"
+
+
+def test_stripper_counts_hits_per_pattern():
+    stripper = BoilerplateStripper(["广告", "广告词"], ["请收藏"])
+    assert stripper.hits() == {}
+    assert stripper.apply("一广告二广告词三广告\n请收藏本站\n四") == "一二三\n四"
+    stripper.apply("广告")
+    assert stripper.hits() == {"广告": 3, "广告词": 1, "请收藏": 1}
+
+
+def test_stripper_removes_whole_lines_before_literals():
+    stripper = BoilerplateStripper(["本站"], ["本站网址", "请收藏"])
+    text = "第一段\n请收藏本站网址\n记住本站网址！\n本站说明\n最后"
+    spans = stripper._line_spans(text, {})
+    assert [text[start:end] for start, end in spans] == ["请收藏本站网址\n", "记住本站网址！\n"]
+    # A literal inside a line pattern does not keep the rest of the line
+    assert stripper.apply(text) == "第一段\n说明\n最后"
+    assert stripper.hits() == {"本站": 1, "本站网址": 1, "请收藏": 1}
+
+
+def test_stripper_line_pattern_on_the_last_line():
+    stripper = BoilerplateStripper(line_patterns=["(本章完)"])
+    assert stripper.apply("正文\n(本章完)") == "正文\n"
+    assert stripper.apply("(本章完)") == ""
+
+
+def test_stripper_without_patterns_is_a_no_op():
+    stripper = BoilerplateStripper(["", ""])
+    assert stripper.patterns == () and stripper.apply("广告") == "广告"
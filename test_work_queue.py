@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Offline tests for WorkQueueProcessor.
+"""
+
+import sys
+import os
+import random
+import threading
+import time
+
+# Add the src directory to the Python path so the flat module imports resolve
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+
+from threading_utils import WorkQueueProcessor
+
+
+def jittered(x, index):
+    """Double x after a random short sleep, so items finish out of order; 13 fails"""
+    time.sleep(random.random() * 0.005)
+    if x == 13:
+        raise RuntimeError("boom")
+    return x * 2
+
+
+def test_process_in_parallel_keeps_order_and_drops_failed_items():
+    assert WorkQueueProcessor().process_in_parallel(range(50), jittered, max_threads=6) == \
+        [x * 2 for x in range(50) if x != 13]
+
+
+def test_chunk_handler_gets_consecutive_runs():
+    """Runs cover every item once, in order; a failed item is in its chunk but not in the results"""
+    runs = []
+
+    def chunk_handler(chunk_start, chunk, results):
+        runs.append((chunk_start, list(chunk), 13 in results))
+        return [results[i] for i in range(chunk_start, chunk_start + len(chunk)) if i in results]
+
+    out = WorkQueueProcessor().process_in_parallel((x for x in range(40)), jittered, chunk_handler, 4)
+    assert out == [x * 2 for x in range(40) if x != 13]
+    assert [item for _, chunk, _ in runs for item in chunk] == list(range(40))
+    position = 0
+    for chunk_start, chunk, failed_in_results in runs:
+        assert chunk_start == position
+        assert not failed_in_results
+        position += len(chunk)
+
+
+def test_iter_in_order_yields_in_order_and_skips_failed_items():
+    pairs = list(WorkQueueProcessor().iter_in_order(range(60), jittered, max_threads=3, window=6))
+    assert pairs == [(x, x * 2) for x in range(60) if x != 13]
+
+
+def test_iter_in_order_bounds_items_ahead_of_the_consumer():
+    """No item starts window or more positions after the last one the caller took"""
+    window = 6
+    taken = [0]
+    ahead = []
+
+    def process(x, index):
+        ahead.append(index - taken[0])
+        # Every tenth item is slow and holds up the order
+        time.sleep(0.03 if index % 10 == 0 else 0.001)
+        return x
+
+    for item, result in WorkQueueProcessor().iter_in_order(range(60), process, max_threads=3, window=window):
+        assert item == result == taken[0]
+        taken[0] += 1
+        # A slow consumer must not let the workers run ahead either
+        if item % 15 == 0:
+            time.sleep(0.02)
+    assert taken[0] == 60
+    assert max(ahead) < window
+
+
+def test_closing_iter_in_order_drains_the_queue():
+    """Once closed, the items not started yet never run and the workers are gone"""
+    threads = threading.active_count()
+    started = []
+
+    def process(x, index):
+        started.append(index)
+        time.sleep(0.01)
+        return x
+
+    results = WorkQueueProcessor().iter_in_order(iter(range(1000)), process, max_threads=4, window=8)
+    assert next(results) == (0, 0)
+    results.close()
+    count = len(started)
+    assert count <= 8 + 4
+    assert threading.active_count() == threads
+    time.sleep(0.05)
+    assert len(started) == count